@@ -4,6 +4,7 @@ import pathlib
 import florasat.config.command as config_command
 import florasat.statistics.command as statistics_command
 import florasat.scenario.command as scenario_command
+import florasat.replot.command as replot_command
 
 
 def generate_parser() -> argparse.ArgumentParser:
@@ -14,6 +15,7 @@ def generate_parser() -> argparse.ArgumentParser:
     config_command.generate_config_subparser(subparsers)
     statistics_command.generate_statistics_subparser(subparsers)
     scenario_command.generate_scenario_subparser(subparsers)
+    replot_command.generate_replot_subparser(subparsers)
     return parser
 
 
@@ -27,5 +29,7 @@ def run_command(args):
             config_command.handle_run(args)
         case "scenario":
             scenario_command.handle_run(args)
+        case "replot":
+            replot_command.handle_run(args)
         case cmd:
             raise RuntimeError(f"Unrecognized command: {cmd}")
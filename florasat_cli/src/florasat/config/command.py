@@ -9,6 +9,8 @@ config_name = ".florasat_config.toml"
 
 raw_config = """florasat_results_path = "~/omnetpp-6.0.1/samples/florasat/simulations/routing/results"
 routes_path = "./routes"
+satellites_path = "./satellites"
+stats_path = "./stats"
 results_path = "./results"
 runs = 4
 """
@@ -0,0 +1,109 @@
+from pathlib import Path
+import sys
+from typing import List
+
+from florasat.statistics.renderer import (
+    finish_export_queue,
+    start_export_queue,
+    write_figure,
+)
+from florasat.statistics.figure_data import read_figure
+
+fig_suffix = ".fig.json"
+
+
+def generate_replot_subparser(subparsers):
+    replot_parser = subparsers.add_parser(
+        "replot",
+        help="Regenerate figures from data exported by statistics --export-data",
+    )
+
+    replot_parser.add_argument(
+        "paths",
+        help=f"Exported figure specs ({fig_suffix}) or directories searched for them",
+        type=Path,
+        nargs="+",
+    )
+
+    replot_parser.add_argument(
+        "--size",
+        help="Font size",
+        dest="size",
+        type=int,
+        required=False,
+    )
+
+    replot_parser.add_argument(
+        "--width",
+        help="Figure width in pixels",
+        dest="width",
+        type=int,
+        required=False,
+    )
+
+    replot_parser.add_argument(
+        "--height",
+        help="Figure height in pixels",
+        dest="height",
+        type=int,
+        required=False,
+    )
+
+    replot_parser.add_argument(
+        "--format",
+        help="Output format. Defaults to pdf.",
+        dest="format",
+        type=str,
+        default="pdf",
+        required=False,
+    )
+
+    replot_parser.add_argument(
+        "--render-jobs",
+        help="Number of worker processes exporting figures in the background. Defaults to 0.",
+        dest="render_jobs",
+        type=int,
+        default=0,
+        required=False,
+    )
+
+
+def handle_run(args):
+    fig_paths: List[Path] = []
+    for path in args.paths:
+        if path.is_dir():
+            fig_paths.extend(sorted(path.rglob(f"*{fig_suffix}")))
+        elif path.name.endswith(fig_suffix):
+            fig_paths.append(path)
+        else:
+            print(f"X Failure: {path} is no directory or {fig_suffix} file...")
+            sys.exit(1)
+
+    if len(fig_paths) == 0:
+        print("X Failure: Nothing to do, no exported figures found...")
+        sys.exit(1)
+
+    if args.render_jobs > 0:
+        start_export_queue(args.render_jobs)
+
+    for fig_path in fig_paths:
+        fig = read_figure(fig_path)
+        if args.size is not None:
+            fig.update_layout(font=dict(size=args.size))
+        if args.width is not None:
+            fig.update_layout(width=args.width)
+        if args.height is not None:
+            fig.update_layout(height=args.height)
+        file_path = fig_path.with_name(
+            fig_path.name[: -len(fig_suffix)] + f".{args.format}"
+        )
+        print("Replot", fig_path, "->", file_path)
+        write_figure(fig, file_path)
+
+    failures = finish_export_queue()
+    if len(failures) > 0:
+        print("")
+        print(f"X Failed to export {len(failures)} figures:")
+        for file_path, error in failures:
+            print("\t", file_path, "\t", error)
+        sys.exit(1)
@@ -1,13 +1,16 @@
 import os
 from typing import List, Tuple
 import pandas as pd
-from florasat_statistics import load_routes
 
 from florasat.statistics.utils import (
+    DELIVERED_NORMAL,
     Config,
     get_route_dump_file,
-    load_simulation_paths,
+    join_on_pid,
+    map_runs,
     plot_cdf,
+    read_route_lengths,
+    request_stats_run,
 )
 
 
@@ -18,25 +21,31 @@ def analyze_distances(config: Config):
             for alg in config.algorithms:
                 print("\t", f"Working on {alg}/{cstl}/{sim_name}")
                 # Load all runs
-                run_dfs = []
-                for run in range(0, config.runs):
-                    (stats_path, _, _) = load_simulation_paths(
-                        config, cstl, sim_name, alg, run
-                    )
-                    (_, file_path) = get_route_dump_file(
-                        config, cstl, sim_name, alg, run
+                requests = [
+                    request_stats_run(
+                        config,
+                        cstl,
+                        sim_name,
+                        alg,
+                        run,
+                        columns=["pid"],
+                        filters=DELIVERED_NORMAL,
                     )
+                    for run in range(0, config.runs)
+                ]
+                routes_fps = [
+                    str(get_route_dump_file(config, cstl, sim_name, alg, run)[1])
+                    for run in range(0, config.runs)
+                ]
+                print("\t", "Load", routes_fps)
+                run_lengths = map_runs(config, read_route_lengths, routes_fps)
 
-                    print("\t", "Load", file_path)
-                    routes = load_routes(str(file_path))
-                    distances = list(map(lambda r: r.length, routes))
-
-                    print("\t", "Load stats dataframe")
-                    df = pd.read_csv(stats_path)
-
-                    df["distance"] = distances
+                run_dfs = []
+                for request, route_lengths in zip(requests, run_lengths):
+                    df = request()
 
-                    df = df.loc[(df["dropReason"] == 99) & (df["type"] == "N")]
+                    df = join_on_pid(df, route_lengths, ["length"])
+                    df = df.rename(columns={"length": "distance"})
 
                     run_dfs.append(df)
 
@@ -47,4 +56,4 @@ def analyze_distances(config: Config):
             file_path = config.results_path.joinpath(cstl).joinpath(sim_name)
             os.makedirs(file_path, exist_ok=True)
             file_path = file_path.joinpath(f"distance.cdf.pdf")
-            plot_cdf(plot_dfs, "distance", file_path, "Distance[km]", mean=True, mean_unit="km")
+            plot_cdf(plot_dfs, "distance", file_path, "Distance[km]", mean=True, mean_unit="km", max_points=config.max_points)
@@ -2,35 +2,65 @@ import os
 from typing import List, Tuple
 import pandas as pd
 
+from florasat.statistics.sketch import DDSketch, merge_sketches
+from florasat.statistics.streaming import e2e_delay_counts
 from florasat.statistics.utils import (
+    E2E_DELAY_COLUMNS,
     Config,
-    load_stats,
+    DELIVERED_NORMAL,
+    e2e_delay_ms,
+    iter_stats,
+    load_metric_sketch,
     plot_cdf,
+    plot_cdf_histograms,
+    plot_cdf_sketches,
 )
 
 
 def analyze_e2edelay(config: Config):
     for cstl in config.cstl:
         for sim_name in config.sim_name:
+            if config.sketch is not None:
+                sketches: List[Tuple[str, DDSketch]] = []
+                for alg in config.algorithms:
+                    print("\t", f"Working on {alg}/{cstl}/{sim_name}")
+                    run_sketches = [
+                        load_metric_sketch(config, cstl, sim_name, alg, run, "e2e-delay")
+                        for run in range(0, config.runs)
+                    ]
+                    sketches.append((alg, merge_sketches(run_sketches)))
+                file_path = config.results_path.joinpath(cstl).joinpath(sim_name)
+                os.makedirs(file_path, exist_ok=True)
+                file_path = file_path.joinpath(f"e2e-delay.cdf.pdf")
+                plot_cdf_sketches(sketches, file_path, "E2E Delay[ms]", mean=True, mean_unit="ms")
+                continue
+
+            if config.streaming:
+                histograms: List[Tuple[str, pd.Series]] = []
+                for alg in config.algorithms:
+                    print("\t", f"Working on {alg}/{cstl}/{sim_name}")
+                    histograms.append(
+                        (alg, e2e_delay_counts(config, cstl, sim_name, alg))
+                    )
+                file_path = config.results_path.joinpath(cstl).joinpath(sim_name)
+                os.makedirs(file_path, exist_ok=True)
+                file_path = file_path.joinpath(f"e2e-delay.cdf.pdf")
+                plot_cdf_histograms(histograms, file_path, "E2E Delay[ms]", mean=True, mean_unit="ms", max_points=config.max_points)
+                continue
+
             named_dfs: List[Tuple[str, pd.DataFrame]] = []
-            for alg in config.algorithms:
+            runs = iter_stats(
+                config,
+                [(cstl, sim_name, alg) for alg in config.algorithms],
+                columns=E2E_DELAY_COLUMNS,
+                filters=DELIVERED_NORMAL,
+            )
+            for alg, df in zip(config.algorithms, runs):
                 print("\t", f"Working on {alg}/{cstl}/{sim_name}")
-                # Load all runs
-                df = load_stats(config, cstl, sim_name, alg)
                 # Concat runs
                 df = pd.concat(df)
-                # Filter for delivered and Normal packets
-                df = df.loc[(df["dropReason"] == 99) & (df["type"] == "N")]
-
-                df["e2e-delay"] = (
-                    (
-                        df["queueDelay"]
-                        + df["procDelay"]
-                        + df["transDelay"]
-                        + df["propDelay"]
-                    )
-                    * 1000
-                ).round()
+
+                df["e2e-delay"] = e2e_delay_ms(df)
 
                 # add to data
                 named_dfs.append((alg, df))
@@ -39,4 +69,4 @@ def analyze_e2edelay(config: Config):
             file_path = config.results_path.joinpath(cstl).joinpath(sim_name)
             os.makedirs(file_path, exist_ok=True)
             file_path = file_path.joinpath(f"e2e-delay.cdf.pdf")
-            plot_cdf(named_dfs, "e2e-delay", file_path, "E2E Delay[ms]", mean=True, mean_unit="ms", percent_01_low=True, percent_1_low=True)
+            plot_cdf(named_dfs, "e2e-delay", file_path, "E2E Delay[ms]", mean=True, mean_unit="ms", percent_01_low=True, percent_1_low=True, max_points=config.max_points)
@@ -2,25 +2,41 @@ import os
 from typing import List, Tuple
 import pandas as pd
 
+from florasat.statistics.streaming import hop_counts
 from florasat.statistics.utils import (
     Config,
-    load_stats,
+    DELIVERED_NORMAL,
+    iter_stats,
     plot_cdf,
+    plot_cdf_histograms,
 )
 
 
 def analyze_hopcounts(config: Config):
     for cstl in config.cstl:
         for sim_name in config.sim_name:
+            if config.streaming:
+                histograms: List[Tuple[str, pd.Series]] = []
+                for alg in config.algorithms:
+                    print("\t", f"Working on {alg}/{cstl}/{sim_name}")
+                    histograms.append((alg, hop_counts(config, cstl, sim_name, alg)))
+                file_path = config.results_path.joinpath(cstl).joinpath(sim_name)
+                os.makedirs(file_path, exist_ok=True)
+                file_path = file_path.joinpath(f"hopcount.cdf.pdf")
+                plot_cdf_histograms(histograms, file_path, "Hops", mean=True, max_points=config.max_points)
+                continue
+
             named_dfs: List[Tuple[str, pd.DataFrame]] = []
-            for alg in config.algorithms:
+            runs = iter_stats(
+                config,
+                [(cstl, sim_name, alg) for alg in config.algorithms],
+                columns=["hops"],
+                filters=DELIVERED_NORMAL,
+            )
+            for alg, df in zip(config.algorithms, runs):
                 print("\t", f"Working on {alg}/{cstl}/{sim_name}")
-                # Load all runs
-                df = load_stats(config, cstl, sim_name, alg)
                 # Concat runs
                 df = pd.concat(df)
-                # Filter for delivered and Normal packets
-                df = df.loc[(df["dropReason"] == 99) & (df["type"] == "N")]
                 # add to data
                 named_dfs.append((alg, df))
 
@@ -30,4 +46,4 @@ def analyze_hopcounts(config: Config):
             file_path = config.results_path.joinpath(cstl).joinpath(sim_name)
             os.makedirs(file_path, exist_ok=True)
             file_path = file_path.joinpath(f"hopcount.cdf.pdf")
-            plot_cdf(named_dfs, "hops", file_path, "Hops", mean=True)
+            plot_cdf(named_dfs, "hops", file_path, "Hops", mean=True, max_points=config.max_points)
@@ -1,3 +1,4 @@
+import itertools
 from math import ceil
 import os
 import time
@@ -7,41 +8,53 @@ import pandas as pd
 from plotly.subplots import make_subplots
 import plotly.graph_objects as go
 
-from florasat.statistics.utils import Config, apply_default, load_stats
+from florasat.statistics.downsample import lttb
+from florasat.statistics.streaming import delivered_dropped_counts
+from florasat.statistics.utils import Config, apply_default, iter_stats
+from florasat.statistics.renderer import write_figure
 
 
 def analyze_packetloss(config: Config):
     for cstl in config.cstl:
         for sim_name in config.sim_name:
             plot_dfs: List[Tuple[str, pd.DataFrame]] = []
-            for alg in config.algorithms:
-                print("\t", f"Working on {alg}/{cstl}/{sim_name}...")
-                # Load all runs
-                df = load_stats(config, cstl, sim_name, alg)
-                # Concat runs
-                df = pd.concat(df)
-
-                print("\t", "Process data...")
-                df["created"] = df["created"].round(1)
-                df["recorded"] = df["recorded"].round()
-
-                delivered = (
-                    df.loc[df["dropReason"] == 99]
-                    .groupby("recorded")["recorded"]
-                    .count()
-                    .pipe(pd.DataFrame)
-                    .rename(columns={"recorded": "rcvd"})
+            if config.streaming:
+                runs = itertools.repeat(None)
+            else:
+                runs = iter_stats(
+                    config,
+                    [(cstl, sim_name, alg) for alg in config.algorithms],
+                    columns=["created", "recorded", "dropReason"],
                 )
+            for alg, df in zip(config.algorithms, runs):
+                print("\t", f"Working on {alg}/{cstl}/{sim_name}...")
+                if df is None:
+                    df = delivered_dropped_counts(config, cstl, sim_name, alg)
+                else:
+                    # Concat runs
+                    df = pd.concat(df)
+
+                    print("\t", "Process data...")
+                    df["created"] = df["created"].round(1)
+                    df["recorded"] = df["recorded"].round()
+
+                    delivered = (
+                        df.loc[df["dropReason"] == 99]
+                        .groupby("recorded")["recorded"]
+                        .count()
+                        .pipe(pd.DataFrame)
+                        .rename(columns={"recorded": "rcvd"})
+                    )
 
-                dropped = (
-                    df.loc[df["dropReason"] != 99]
-                    .groupby("recorded")["recorded"]
-                    .count()
-                    .pipe(pd.DataFrame)
-                    .rename(columns={"recorded": "dropped"})
-                )
+                    dropped = (
+                        df.loc[df["dropReason"] != 99]
+                        .groupby("recorded")["recorded"]
+                        .count()
+                        .pipe(pd.DataFrame)
+                        .rename(columns={"recorded": "dropped"})
+                    )
 
-                df = delivered.join(dropped).reset_index()
+                    df = delivered.join(dropped).reset_index()
 
                 max_val = df["recorded"].max()
 
@@ -79,11 +92,16 @@ def analyze_packetloss(config: Config):
             for name, df in plot_dfs:
                 color = colors.pop(0)
                 position = positions.pop(0)
+                (x, y) = lttb(
+                    df.recorded,
+                    df["packetloss"].ewm(span=3000, adjust=False).mean(),
+                    config.max_points,
+                )
                 fig.add_trace(
                     go.Scatter(
                         name=name,
-                        x=df.recorded,
-                        y=df["packetloss"].ewm(span=3000, adjust=False).mean(),
+                        x=x,
+                        y=y,
                         mode="lines",
                         line=dict(color=color)
                     )
@@ -111,4 +129,4 @@ def analyze_packetloss(config: Config):
             os.makedirs(file_path, exist_ok=True)
             file_path = file_path.joinpath(f"packetloss.sum.pdf")
             apply_default(fig)
-            fig.write_image(file_path, engine="kaleido")
+            write_figure(fig, file_path)
@@ -0,0 +1,140 @@
+import json
+import os
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from florasat.statistics.utils import Config, apply_default, get_occupancy_file
+from florasat.statistics.renderer import write_figure
+
+# columns of the rendered heatmap, time bins are averaged down to this
+max_heatmap_columns = 500
+
+
+def load_occupancy(
+    config: Config, cstl: str, sim_name: str, alg: str
+) -> Tuple[List[np.memmap], np.ndarray, float]:
+    """Memory-mapped occupancy matrices of all runs with their satellite ids."""
+    matrices: List[np.memmap] = []
+    sat_ids: Optional[np.ndarray] = None
+    bin_width: Optional[float] = None
+    for run in range(0, config.runs):
+        _, file_path, meta_path = get_occupancy_file(config, cstl, sim_name, alg, run)
+        print("\t", "\t", "Map:", file_path)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if sat_ids is None:
+            sat_ids = np.array(meta["sat_ids"])
+            bin_width = meta["bin_width"]
+        elif (
+            not np.array_equal(sat_ids, meta["sat_ids"])
+            or bin_width != meta["bin_width"]
+        ):
+            raise Exception(f"Occupancy of run {run} does not match run 0: {file_path}")
+        matrices.append(np.load(file_path, mmap_mode="r"))
+    assert sat_ids is not None and bin_width is not None
+    return (matrices, sat_ids, bin_width)
+
+
+def mean_rows(matrices: List[np.memmap], rows: slice, bin_count: int) -> np.ndarray:
+    """Mean over all runs of the given satellite rows."""
+    return sum(m[rows, :bin_count].astype(np.float64) for m in matrices) / len(matrices)
+
+
+def analyze_queue_heatmap(config: Config, top_k: int):
+    for cstl in config.cstl:
+        for sim_name in config.sim_name:
+            for alg in config.algorithms:
+                print("\t", f"Working on {alg}/{cstl}/{sim_name}")
+                matrices, sat_ids, bin_width = load_occupancy(
+                    config, cstl, sim_name, alg
+                )
+                bin_count = min(m.shape[1] for m in matrices)
+                group = max(1, -(-bin_count // max_heatmap_columns))
+                columns = -(-bin_count // group)
+
+                # one pass over the satellites in blocks of rows
+                heatmap = np.empty((len(sat_ids), columns))
+                sat_means = np.empty(len(sat_ids))
+                hot_values = np.empty(0)
+                hot_cells = np.empty(0, dtype=np.int64)
+                block = max(1, 4_000_000 // bin_count)
+                for begin in range(0, len(sat_ids), block):
+                    rows = slice(begin, begin + block)
+                    occupancy = mean_rows(matrices, rows, bin_count)
+                    sat_means[rows] = occupancy.mean(axis=1)
+                    padded = np.pad(
+                        occupancy,
+                        ((0, 0), (0, columns * group - bin_count)),
+                        constant_values=np.nan,
+                    )
+                    heatmap[rows] = np.nanmean(
+                        padded.reshape(len(occupancy), columns, group), axis=2
+                    )
+                    # keep the top_k cells seen so far
+                    flat = occupancy.ravel()
+                    k = min(top_k, len(flat))
+                    candidates = np.argpartition(flat, len(flat) - k)[len(flat) - k :]
+                    hot_values = np.concatenate([hot_values, flat[candidates]])
+                    hot_cells = np.concatenate(
+                        [hot_cells, candidates + begin * bin_count]
+                    )
+                    best = np.argsort(hot_values)[::-1][:top_k]
+                    hot_values, hot_cells = (hot_values[best], hot_cells[best])
+
+                ########## Report hotspots ##########
+                hot_sats = np.argsort(sat_means)[::-1][:top_k]
+                print("\t", f"Top {top_k} satellites by mean queue size:")
+                for rank, sat in enumerate(hot_sats, 1):
+                    print(
+                        "\t",
+                        "\t",
+                        f"{rank}.",
+                        "Sat",
+                        sat_ids[sat],
+                        "\t",
+                        round(sat_means[sat], 3),
+                    )
+
+                cell_sats, cell_bins = np.divmod(hot_cells, bin_count)
+                intervals = pd.DataFrame(
+                    {
+                        "sat_id": sat_ids[cell_sats],
+                        "start": cell_bins * bin_width,
+                        "end": (cell_bins + 1) * bin_width,
+                        "queueSize": hot_values,
+                    }
+                )
+                print("\t", f"Top {top_k} intervals by mean queue size:")
+                print(intervals.to_string(index=False))
+
+                file_path = config.results_path.joinpath(cstl).joinpath(sim_name)
+                os.makedirs(file_path, exist_ok=True)
+                pd.DataFrame(
+                    {"sat_id": sat_ids[hot_sats], "queueSize": sat_means[hot_sats]}
+                ).to_csv(
+                    file_path.joinpath(f"queue-hotspots.{alg}.satellites.csv"),
+                    index=False,
+                )
+                intervals.to_csv(
+                    file_path.joinpath(f"queue-hotspots.{alg}.intervals.csv"),
+                    index=False,
+                )
+
+                ########## Plot data ##########
+                print("\t", "Create plot...")
+                fig = go.Figure(
+                    go.Heatmap(
+                        x=np.arange(columns) * group * bin_width,
+                        y=sat_ids,
+                        z=heatmap,
+                        colorscale="Viridis",
+                        colorbar=dict(title="Queue size"),
+                    )
+                )
+                fig.update_xaxes(title_text="Time (s)")
+                fig.update_yaxes(title_text="Satellite")
+                print("\t", "Write plot to file...")
+                apply_default(fig, size=18, width=1000, height=600)
+                write_figure(fig, file_path.joinpath(f"queue-heatmap.{alg}.pdf"))
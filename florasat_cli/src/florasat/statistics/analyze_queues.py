@@ -1,10 +1,8 @@
-import itertools
-from math import floor
 import os
 from typing import List, Tuple
 import numpy as np
 import pandas as pd
-from florasat_statistics import load_sat_stats
+from florasat_statistics import load_sat_stats_arrays
 from plotly.subplots import make_subplots
 import plotly.graph_objects as go
 
@@ -13,7 +11,29 @@ from florasat.statistics.utils import (
     apply_default,
     get_sats_dump_file,
     load_simulation_paths,
+    map_runs,
 )
+from florasat.statistics.renderer import write_figure
+
+
+def load_queue_sizes(file_path: str) -> pd.DataFrame:
+    """
+    Mean queue size over all satellite states of a run per 100ms slot. Slot k
+    holds the states whose start rounds to the timestamp k / 10.
+    """
+    print("\t", "Load", file_path)
+    sats = load_sat_stats_arrays(file_path)
+
+    print("\t", "Preprocess-data")
+    # same rounding as Series.round(1), in double precision
+    slots = np.rint(sats["start"].astype(np.float64) * 10).astype(np.int64)
+    counts = np.bincount(slots)
+    sums = np.bincount(slots, weights=sats["qs"])
+    present = np.flatnonzero(counts)
+
+    return pd.DataFrame(
+        {"slot": present, "queueSize": sums[present] / counts[present]}
+    )
 
 
 def analyze_queues(config: Config):
@@ -23,89 +43,57 @@ def analyze_queues(config: Config):
             for alg in config.algorithms:
                 print("\t", f"Working on {alg}/{cstl}/{sim_name}")
                 # Load all runs
-                run_dfs: List[pd.DataFrame] = []
+                file_paths: List[str] = []
                 for run in range(0, config.runs):
-                    (stats_path, _, _) = load_simulation_paths(
-                        config, cstl, sim_name, alg, run
-                    )
+                    load_simulation_paths(config, cstl, sim_name, alg, run)
                     (_, file_path) = get_sats_dump_file(
                         config, cstl, sim_name, alg, run
                     )
+                    file_paths.append(str(file_path))
+                run_dfs = map_runs(config, load_queue_sizes, file_paths)
 
-                    print("\t", "Load", file_path)
-                    satellites = load_sat_stats(str(file_path))
-
-                    df = pd.DataFrame(columns=["id", "timestamp", "queueSize"])
-
-                    print("\t", "Preprocess-data")
-
-                    for sat in satellites:
-                        id = sat.sat_id
-                        entries = [[id, entry.start, entry.qs] for entry in sat.entries]
-
-                        df = pd.concat(
-                            [pd.DataFrame(entries, columns=df.columns), df],
-                            ignore_index=True,
-                        )
-
-                    df["timestamp"] = df["timestamp"].round(1)
-
-                    df = (
-                        df.groupby(["timestamp"])["queueSize"]
-                        .mean()
-                        .pipe(pd.DataFrame)
-                        .reset_index()
-                    )
-
-                    run_dfs.append(df)
-
-                # fill with prev numbers
-                ## find max
-                max_val = 0
-                for df in run_dfs:
-                    max_val = max(max_val, df["timestamp"].max())
+                # every run covers all slots up to the last full second of the longest run
+                max_slot = max(df["slot"].max() for df in run_dfs)
+                slot_count = (max_slot // 10 + 1) * 10
 
-                processed_dfs = []
+                # fill with prev numbers and average over runs
+                sums = np.zeros(slot_count)
+                counts = np.zeros(slot_count)
                 for df in run_dfs:
-                    float_list = []
-                    for i in range(0, floor(max_val) + 1):
-                        for x in range(0, 10):
-                            float_list.append(round(i + round(x / 10, 1), 1))
-
-                    df = (
-                        df.set_index("timestamp")
-                        .reindex(float_list, fill_value=np.NaN)
-                        .fillna(method="ffill")
+                    queue_sizes = np.full(slot_count, np.nan)
+                    queue_sizes[df["slot"].values] = df["queueSize"].values
+                    known = ~np.isnan(queue_sizes)
+                    last_known = np.maximum.accumulate(
+                        np.where(known, np.arange(slot_count), 0)
+                    )
+                    queue_sizes = queue_sizes[last_known]
+                    known = ~np.isnan(queue_sizes)
+                    sums[known] += queue_sizes[known]
+                    counts[known] += 1
+
+                with np.errstate(invalid="ignore"):
+                    df = pd.DataFrame(
+                        {
+                            "timestamp": np.arange(slot_count) / 10,
+                            "queueSize": sums / counts,
+                        }
                     )
-                    # df = df.reindex(indicies, fill_value=np.NaN).fillna(method="ffill")
-                    processed_dfs.append(df)
-
-                df = pd.concat(processed_dfs)
-
-                df = (
-                    df.groupby(["timestamp"])["queueSize"]
-                    .mean()
-                    .pipe(pd.DataFrame)
-                    .reset_index()
-                )
 
-                df = (
-                    df.groupby(pd.cut(df["timestamp"], 250, right=True))["queueSize"]
-                    .mean()
-                    .reset_index()
+                binned = df.groupby(
+                    pd.cut(df["timestamp"], 250, right=True), observed=False
+                )["queueSize"].mean()
+
+                # step plot, every bin contributes its start and end point
+                bins = binned.index.categories
+                df = pd.DataFrame(
+                    {
+                        "timestamp": np.column_stack(
+                            [np.maximum(0.0, bins.left + 0.001), bins.right]
+                        ).ravel(),
+                        "queueSize": np.repeat(binned.values, 2),
+                    }
                 )
 
-                entries = []
-                for index, row in df.iterrows():
-                    start = max(0.0, row.timestamp.left + 0.001)
-                    end = row.timestamp.right
-                    queue_size = row.queueSize
-
-                    entries.append([start, queue_size])
-                    entries.append([end, queue_size])
-
-                df = pd.DataFrame(entries, columns=["timestamp", "queueSize"])
-
                 plot_dfs.append((alg, df))
 
             ########## Plot data ##########
@@ -137,4 +125,4 @@ def analyze_queues(config: Config):
             os.makedirs(file_path, exist_ok=True)
             file_path = file_path.joinpath(f"queues.comparison.pdf")
             apply_default(fig, size=18)
-            fig.write_image(file_path, engine="kaleido")
+            write_figure(fig, file_path)
@@ -1,3 +1,4 @@
+import itertools
 from math import ceil, floor
 import os
 from typing import List, Tuple
@@ -12,8 +13,12 @@ from scipy import signal
 from florasat.statistics.utils import (
     Config,
     apply_default,
-    load_stats,
+    DELIVERED_NORMAL,
+    iter_stats,
 )
+from florasat.statistics.downsample import lttb
+from florasat.statistics.streaming import delivered_size_counts
+from florasat.statistics.renderer import write_figure
 
 
 def analyze_throughput(config: Config):
@@ -22,25 +27,33 @@ def analyze_throughput(config: Config):
             plot_dfs: List[Tuple[str, pd.DataFrame]] = []
             # old_max = 0
             # traffics: List[pd.DataFrame] = []
-            for alg in config.algorithms:
-                print("\t", f"Working on {alg}/{cstl}/{sim_name}")
-                # Load all runs
-                df = load_stats(config, cstl, sim_name, alg)
-                # Concat runs
-                df = pd.concat(df)
-
-                df["created"] = df["created"].round(1)
-                df["recorded"] = df["recorded"].round()
-
-                df = df.loc[(df["type"] == "N") & (df["dropReason"] == 99)]
-
-                df = (
-                    df.groupby(["recorded", "size"])["recorded"]
-                    .count()
-                    .pipe(pd.DataFrame)
-                    .rename(columns={"recorded": "count"})
-                    .reset_index()
+            if config.streaming:
+                runs = itertools.repeat(None)
+            else:
+                runs = iter_stats(
+                    config,
+                    [(cstl, sim_name, alg) for alg in config.algorithms],
+                    columns=["created", "recorded", "size"],
+                    filters=DELIVERED_NORMAL,
                 )
+            for alg, df in zip(config.algorithms, runs):
+                print("\t", f"Working on {alg}/{cstl}/{sim_name}")
+                if df is None:
+                    df = delivered_size_counts(config, cstl, sim_name, alg)
+                else:
+                    # Concat runs
+                    df = pd.concat(df)
+
+                    df["created"] = df["created"].round(1)
+                    df["recorded"] = df["recorded"].round()
+
+                    df = (
+                        df.groupby(["recorded", "size"])["recorded"]
+                        .count()
+                        .pipe(pd.DataFrame)
+                        .rename(columns={"recorded": "count"})
+                        .reset_index()
+                    )
 
                 df["count"] = df["count"] / config.runs
                 df["datarate"] = (df["size"] * df["count"]) / 1000 / 1000
@@ -120,6 +133,11 @@ def analyze_throughput(config: Config):
                 color = colors.pop(0)
                 position = positions.pop(0)
                 # print(df.tail(20))
+                (x, y) = lttb(
+                    df["recorded"],
+                    df["datarate"].ewm(span=3000, adjust=False).mean(),
+                    config.max_points,
+                )
                 fig.add_trace(
                     # go.Scatter(
                     #     name=name,
@@ -130,8 +148,8 @@ def analyze_throughput(config: Config):
                     # ),
                     go.Scatter(
                         name=name,
-                        x=df["recorded"],
-                        y=df["datarate"].ewm(span=3000, adjust=False).mean(),
+                        x=x,
+                        y=y,
                     ),
                 )
 
@@ -166,4 +184,4 @@ def analyze_throughput(config: Config):
             os.makedirs(file_path, exist_ok=True)
             file_path = file_path.joinpath(f"throughput.comparison.pdf")
             apply_default(fig, size=22)
-            fig.write_image(file_path, engine="kaleido")
+            write_figure(fig, file_path)
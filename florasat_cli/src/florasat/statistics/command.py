@@ -1,7 +1,12 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import replace
+from functools import partial
+import multiprocessing
 import os
 from pathlib import Path
 import sys
-from typing import Any
+import traceback
+from typing import Any, Callable, List, Optional
 
 import tomli
 from florasat.statistics.analyze_distances import analyze_distances
@@ -13,7 +18,20 @@ from florasat.statistics.preprocess_routes import preprocess_routes
 from florasat.statistics.create_drop_heatmap import create_drop_heatmap
 from florasat.statistics.analyze_e2edelay import analyze_e2edelay
 from florasat.statistics import utils
+from florasat.statistics.dataset_cache import DatasetCache
+from florasat.statistics.renderer import (
+    configure_export,
+    finish_export_queue,
+    start_export_queue,
+)
+from florasat.statistics.manifest import Manifest, manifest_file_name
+from florasat.statistics.scheduler import Scheduler, Task
+from florasat.statistics import streaming
+from florasat.statistics.sketch import default_relative_accuracy
 from florasat.statistics.preprocess_satellites import preprocess_satellites
+from florasat.statistics.preprocess_stats import preprocess_stats
+from florasat.statistics.preprocess_occupancy import preprocess_occupancy
+from florasat.statistics.analyze_queue_heatmap import analyze_queue_heatmap
 from florasat.statistics.analyze_queues import analyze_queues
 from florasat.statistics.analyze_throughput import analyze_throughput
 from florasat.statistics.paramstudy_altitude import paramstudy_altitude
@@ -25,6 +43,18 @@ from florasat.statistics.compare_congestion_scenarios import (
 )
 from florasat.statistics.compare_queuing_delay import compare_queuing_delay
 
+# Default memory ceiling of the dataset cache in MiB
+default_cache_size = 4096
+default_chunk_size = 1_000_000
+default_max_points = 2000
+default_occupancy_bin_width = 0.1
+default_top_k = 10
+
+routes_hint = (
+    "Are routes preprocessed? This is required once after FLoRaSat simulation runs."
+)
+sats_hint = "Are satellite states preprocessed? This is required once after FLoRaSat simulation runs."
+
 
 def generate_statistics_subparser(subparsers):
     stats_parser = subparsers.add_parser(
@@ -98,6 +128,14 @@ def generate_statistics_subparser(subparsers):
         required=False,
     )
 
+    stats_parser.add_argument(
+        "--stats",
+        help="Path to read/store pre-processed stats. If not specified, loaded from config or a 'stats' directory next to the routes path.",
+        dest="stats_path",
+        type=str,
+        required=False,
+    )
+
     stats_parser.add_argument(
         "--results",
         help="Path to read/store results. If not specified, loaded from config.",
@@ -106,6 +144,83 @@ def generate_statistics_subparser(subparsers):
         required=False,
     )
 
+    stats_parser.add_argument(
+        "--cache-size",
+        help=f"Memory ceiling in MiB for datasets shared between analyses. 0 disables the cache. If not specified, loaded from config or {default_cache_size}.",
+        dest="cache_size",
+        type=int,
+        required=False,
+    )
+
+    stats_parser.add_argument(
+        "--jobs",
+        help="Number of worker processes decoding simulation runs, of threads preprocessing them and of independent figures generated in parallel. Each is capped at this number, however many tasks run at once. If not specified, loaded from config or 1.",
+        dest="jobs",
+        type=int,
+        required=False,
+    )
+
+    stats_parser.add_argument(
+        "--render-jobs",
+        help="Number of worker processes exporting figures in the background. Defaults to 0, figures are exported one after another.",
+        dest="render_jobs",
+        type=int,
+        default=0,
+        required=False,
+    )
+
+    stats_parser.add_argument(
+        "--export-data",
+        help="Write the data behind every figure next to it: figure spec (.fig.json), plotted series (.data.parquet) and summary statistics (.summary.json).",
+        dest="export_data",
+        action="store_true",
+        required=False,
+    )
+
+    stats_parser.add_argument(
+        "--no-plot",
+        help="Skip rendering figures, only compute and export their data.",
+        dest="no_plot",
+        action="store_true",
+        required=False,
+    )
+
+    stats_parser.add_argument(
+        "--streaming",
+        help="Aggregate packet counts chunk by chunk instead of loading whole runs into memory. The aggregations of all requested analyses are computed in a single scan over the stats of every run.",
+        dest="streaming",
+        action="store_true",
+        required=False,
+    )
+
+    stats_parser.add_argument(
+        "--chunk-size",
+        help=f"Number of rows per chunk in streaming mode. Defaults to {default_chunk_size}.",
+        dest="chunk_size",
+        type=int,
+        default=default_chunk_size,
+        required=False,
+    )
+
+    stats_parser.add_argument(
+        "--max-points",
+        help=f"Maximum number of points per time-series trace (reduced with LTTB) or CDF. 0 plots all points. Defaults to {default_max_points}.",
+        dest="max_points",
+        type=int,
+        default=default_max_points,
+        required=False,
+    )
+
+    stats_parser.add_argument(
+        "--sketch",
+        help=f"Compute delay and distance distributions from mergeable per-run quantile sketches with the given relative accuracy (default {default_relative_accuracy}) instead of all packets. Sketches are stored next to the preprocessed stats. The parameter studies then summarize all packets instead of per-packet-id means and write *-all-packets.pdf files.",
+        dest="sketch",
+        type=float,
+        nargs="?",
+        const=default_relative_accuracy,
+        required=False,
+    )
+
     stats_parser.add_argument(
         "--preprocess-routes",
         help="Preprocess routes",
@@ -122,6 +237,39 @@ def generate_statistics_subparser(subparsers):
         required=False,
     )
 
+    stats_parser.add_argument(
+        "--preprocess-stats",
+        help="Preprocess stats",
+        dest="f_preprocess_stats",
+        action="store_true",
+        required=False,
+    )
+
+    stats_parser.add_argument(
+        "--preprocess-occupancy",
+        help="Preprocess satellite x time occupancy matrices, requires preprocessed satellites",
+        dest="f_preprocess_occupancy",
+        action="store_true",
+        required=False,
+    )
+
+    stats_parser.add_argument(
+        "--occupancy-bin-width",
+        help=f"Width of the occupancy time bins in seconds. Defaults to {default_occupancy_bin_width}.",
+        dest="occupancy_bin_width",
+        type=float,
+        default=default_occupancy_bin_width,
+        required=False,
+    )
+
+    stats_parser.add_argument(
+        "--force-preprocess",
+        help="Preprocess runs again even if their dumps are up to date",
+        dest="f_force_preprocess",
+        action="store_true",
+        required=False,
+    )
+
     stats_parser.add_argument(
         "--hops",
         help="Generate hops CDF",
@@ -145,7 +293,7 @@ def generate_statistics_subparser(subparsers):
         action="store_true",
         required=False,
     )
-    
+
     stats_parser.add_argument(
         "--deliveryratio",
         help="Generate deliveryratio graph",
@@ -218,6 +366,23 @@ def generate_statistics_subparser(subparsers):
         required=False,
     )
 
+    stats_parser.add_argument(
+        "--queue-heatmap",
+        help="Generate satellite x time queue heatmaps and report hotspots, requires preprocessed occupancy",
+        dest="f_queue_heatmap",
+        action="store_true",
+        required=False,
+    )
+
+    stats_parser.add_argument(
+        "--top-k",
+        help=f"Number of hotspot satellites and intervals to report. Defaults to {default_top_k}.",
+        dest="top_k",
+        type=int,
+        default=default_top_k,
+        required=False,
+    )
+
     stats_parser.add_argument(
         "--compare-queuing-delay",
         help="Compares queuing delay of multiple scenarios.",
@@ -257,6 +422,7 @@ def handle_run(args):
         args.florasat_results_path is None
         or args.routes_path is None
         or args.satellites_path is None
+        or args.stats_path is None
         or args.results_path is None
         or args.runs is None
     ):
@@ -303,6 +469,22 @@ def handle_run(args):
                 print(f"X Failed:", e)
                 sys.exit(1)
 
+        if args.stats_path is None:
+            try:
+                if "stats_path" in config:
+                    path = Path(config["stats_path"])
+                else:
+                    # configs written before stats were preprocessed lack the
+                    # entry, keep the stats next to the preprocessed routes
+                    path = Path(args.routes_path).parent.joinpath("stats")
+                    print(f"-> No 'stats_path' in config file, use {path}.")
+                if not path.is_dir():
+                    os.makedirs(path, exist_ok=True)
+                args.stats_path = path
+            except OSError as e:
+                print(f"X Failed:", e)
+                sys.exit(1)
+
         if args.results_path is None:
             try:
                 path = Path(config["results_path"])
@@ -327,6 +509,28 @@ def handle_run(args):
                 print(f"X Value for 'runs' in config file is no valid integer number.")
                 sys.exit(1)
 
+        if args.cache_size is None and "cache_size" in config:
+            try:
+                args.cache_size = int(config["cache_size"])
+            except ValueError:
+                print(
+                    f"X Value for 'cache_size' in config file is no valid integer number."
+                )
+                sys.exit(1)
+
+        if args.jobs is None and "jobs" in config:
+            try:
+                args.jobs = int(config["jobs"])
+            except ValueError:
+                print(f"X Value for 'jobs' in config file is no valid integer number.")
+                sys.exit(1)
+
+    if args.cache_size is None:
+        args.cache_size = default_cache_size
+
+    if args.jobs is None:
+        args.jobs = 1
+
     if args.f_all:
         args.f_hops = True
         args.f_distances = True
@@ -348,9 +552,23 @@ def handle_run(args):
     print("-> FLoRaSat result path:", "\t", args.florasat_results_path)
     print("-> Routes path:", "\t", "\t", args.routes_path)
     print("-> Satellites path:", "\t", "\t", args.satellites_path)
+    print("-> Stats path:", "\t", "\t", args.stats_path)
     print("-> Results path:", "\t", "\t", args.results_path)
+    print("-> Cache size (MiB):", "\t", "\t", args.cache_size)
+    print("-> Jobs:", "\t", "\t", "\t", args.jobs)
+    print("-> Render jobs:", "\t", "\t", args.render_jobs)
+    print("-> Export data:", "\t", "\t", args.export_data)
+    print("-> No plot:", "\t", "\t", "\t", args.no_plot)
+    print("-> Streaming:", "\t", "\t", "\t", args.streaming)
+    print("-> Chunk size:", "\t", "\t", "\t", args.chunk_size)
+    print("-> Max points per trace:", "\t", args.max_points)
+    print("-> Sketch accuracy:", "\t", "\t", args.sketch)
     print("-> Preprocess routes:", "\t", "\t", args.f_preprocess_routes)
     print("-> Preprocess satellites:", "\t", args.f_preprocess_satellites)
+    print("-> Preprocess stats:", "\t", "\t", args.f_preprocess_stats)
+    print("-> Preprocess occupancy:", "\t", args.f_preprocess_occupancy)
+    print("-> Occupancy bin width (s):", "\t", args.occupancy_bin_width)
+    print("-> Force preprocessing:", "\t", args.f_force_preprocess)
     print("-> Gen. hops CDF:", "\t", "\t", args.f_hops)
     print("-> Gen. distance CDF:", "\t", "\t", args.f_distances)
     print("-> Gen. packetloss graph:", "\t", args.f_packetloss)
@@ -363,6 +581,8 @@ def handle_run(args):
     print("-> Gen. paramstudy altitude:\t", args.f_paramstudy_altitude)
     print("-> Gen. paramstudy inclination:\t", args.f_paramstudy_inclination)
     print("-> Gen. paramstudy datarate:\t", args.f_paramstudy_datarate)
+    print("-> Gen. queue heatmap:", "\t", "\t", args.f_queue_heatmap)
+    print("-> Top k hotspots:", "\t", "\t", args.top_k)
 
     # Validation
     print("")
@@ -370,9 +590,43 @@ def handle_run(args):
         print("X Failure: At least 1 run required...")
         sys.exit(1)
 
+    if not args.jobs > 0:
+        print("X Failure: At least 1 job required...")
+        sys.exit(1)
+
+    if args.render_jobs < 0:
+        print("X Failure: Render jobs must not be negative...")
+        sys.exit(1)
+
+    if args.cache_size < 0:
+        print("X Failure: Cache size must not be negative...")
+        sys.exit(1)
+
+    if args.max_points != 0 and args.max_points < 3:
+        print("X Failure: Max points must be 0 or at least 3...")
+        sys.exit(1)
+
+    if args.sketch is not None and not 0 < args.sketch < 1:
+        print("X Failure: Sketch accuracy must be between 0 and 1...")
+        sys.exit(1)
+
+    if not args.chunk_size > 0:
+        print("X Failure: Chunk size must be positive...")
+        sys.exit(1)
+
+    if not args.occupancy_bin_width > 0:
+        print("X Failure: Occupancy bin width must be positive...")
+        sys.exit(1)
+
+    if not args.top_k > 0:
+        print("X Failure: At least 1 hotspot required...")
+        sys.exit(1)
+
     if (
         not args.f_preprocess_routes
         and not args.f_preprocess_satellites
+        and not args.f_preprocess_stats
+        and not args.f_preprocess_occupancy
         and not args.f_hops
         and not args.f_distances
         and not args.f_packetloss
@@ -388,6 +642,7 @@ def handle_run(args):
         and not args.f_compare_failures
         and not args.f_compare_congestion
         and not args.f_compare_queuing_delays
+        and not args.f_queue_heatmap
     ):
         print("")
         print("Nothing to do...")
@@ -401,202 +656,334 @@ def handle_run(args):
         args.florasat_results_path,
         args.routes_path,
         args.satellites_path,
+        args.stats_path,
         args.results_path,
     )
+    if args.cache_size > 0:
+        stats_config.cache = DatasetCache(args.cache_size * 1024 * 1024)
+    configure_export(not args.no_plot, args.export_data)
+    stats_config.streaming = args.streaming
+    stats_config.chunk_size = args.chunk_size
+    stats_config.max_points = args.max_points
+    stats_config.sketch = args.sketch
+    stats_config.manifest = Manifest(
+        Path(args.florasat_results_path),
+        Path(args.stats_path).joinpath(manifest_file_name),
+    )
 
-    if args.f_preprocess_routes:
-        print("")
-        print("Preprocess routes...")
-        try:
-            preprocess_routes(stats_config)
-        except FileNotFoundError as e:
-            print("X Failed to preprocess routes. Could not find:", e.filename)
-            sys.exit(1)
-
-    if args.f_preprocess_satellites:
-        print("")
-        print("Preprocess satellites...")
-        try:
-            preprocess_satellites(stats_config)
-        except FileNotFoundError as e:
-            print("X Failed to preprocess satellites. Could not find:", e.filename)
-            sys.exit(1)
-
-    if args.f_hops:
-        print("")
-        print("Run Hops CDF generation...")
-        try:
-            analyze_hopcounts(stats_config)
-        except FileNotFoundError as e:
-            print("X Failed to generate hops CDF. Could not find:", e.filename)
-            sys.exit(1)
-
-    if args.f_distances:
-        print("")
-        print("Run Distance CDF generation...")
-        try:
-            analyze_distances(stats_config)
-        except FileNotFoundError as e:
-            print("X Failed to generate distance CDF. Could not find:", e.filename)
-            print(
-                "Are routes preprocessed? This is required once after FLoRaSat simulation runs."
+    try:
+        # tasks share the pools, --jobs caps the running tasks, the decoding
+        # processes and the converting threads each, however many tasks use them
+        if args.jobs > 1:
+            # workers are started from scheduler threads, forking a threaded
+            # process can deadlock the child
+            stats_config.pool = ProcessPoolExecutor(
+                max_workers=args.jobs,
+                mp_context=multiprocessing.get_context("forkserver"),
             )
-            sys.exit(1)
-
-    if args.f_packetloss:
-        print("")
-        print("Run packetloss graph generation...")
-        try:
-            analyze_packetloss(stats_config)
-        except FileNotFoundError as e:
-            print("X Failed to generate packetloss graph. Could not find:", e.filename)
-            sys.exit(1)
+            stats_config.threads = ThreadPoolExecutor(max_workers=args.jobs)
+        if args.render_jobs > 0 and not args.no_plot:
+            start_export_queue(args.render_jobs)
 
+        scheduler = Scheduler(args.jobs)
 
-    if args.f_deliveryratio:
-        print("")
-        print("Run deliveryratio graph generation...")
-        try:
-            analyze_deliveryratio(stats_config)
-        except FileNotFoundError as e:
-            print("X Failed to generate deliveryratio graph. Could not find:", e.filename)
-            sys.exit(1)
-
-    if args.f_drop_heatmap:
-        print("")
-        print("Run drop heatmap generation...")
-        try:
-            create_drop_heatmap(stats_config)
-        except FileNotFoundError as e:
-            print("X Failed to generate drop heatmap. Could not find:", e.filename)
-            print(
-                "Are routes preprocessed? This is required once after FLoRaSat simulation runs."
+        if args.f_preprocess_routes:
+            scheduler.add(
+                Task(
+                    "preprocess routes",
+                    partial(preprocess_routes, stats_config, args.f_force_preprocess),
+                )
             )
-            sys.exit(1)
-
-    if args.f_queue_sizes:
-        print("")
-        print("Run queue size graph generation...")
-        try:
-            analyze_queues(stats_config)
-        except FileNotFoundError as e:
-            print("X Failed to generate queue size graph. Could not find:", e.filename)
-            print(
-                "Are satellite states preprocessed? This is required once after FLoRaSat simulation runs."
+        if args.f_preprocess_satellites:
+            scheduler.add(
+                Task(
+                    "preprocess satellites",
+                    partial(
+                        preprocess_satellites, stats_config, args.f_force_preprocess
+                    ),
+                )
             )
-            sys.exit(1)
-
-    if args.f_e2e_delay_cdf:
-        print("")
-        print("Run E2E delay CDF generation...")
-        try:
-            analyze_e2edelay(stats_config)
-        except FileNotFoundError as e:
-            print("X Failed to generate E2E delay CDF. Could not find:", e.filename)
-            sys.exit(1)
-
-    if args.f_compare_delay:
-        print("")
-        print("Run delay comparison graph generation...")
-        try:
-            compare_delays(stats_config)
-        except FileNotFoundError as e:
-            print(
-                "X Failed to generate delay comparison graph. Could not find:",
-                e.filename,
+        if args.f_preprocess_stats:
+            scheduler.add(
+                Task(
+                    "preprocess stats",
+                    partial(preprocess_stats, stats_config, args.f_force_preprocess),
+                )
             )
-            sys.exit(1)
-
-    if args.f_throughput:
-        print("")
-        print("Run analyze throughput graph generation...")
-        try:
-            analyze_throughput(stats_config)
-        except FileNotFoundError as e:
-            print(
-                "X Failed to generate analyze throughput graph. Could not find:",
-                e.filename,
+        routes = ["preprocess routes"] if args.f_preprocess_routes else []
+        sats = ["preprocess satellites"] if args.f_preprocess_satellites else []
+        stats = ["preprocess stats"] if args.f_preprocess_stats else []
+        if args.f_preprocess_occupancy:
+            scheduler.add(
+                Task(
+                    "preprocess occupancy",
+                    partial(
+                        preprocess_occupancy,
+                        stats_config,
+                        args.occupancy_bin_width,
+                        args.f_force_preprocess,
+                    ),
+                    sats,
+                    hint=sats_hint,
+                )
             )
-            sys.exit(1)
-
-    if args.f_paramstudy_altitude:
-        print("")
-        print("Run paramstudy altitude graph generation...")
-        try:
-            paramstudy_altitude(stats_config)
-        except FileNotFoundError as e:
-            print(
-                "X Failed to generate paramstudy altitude. Could not find:", e.filename
+        occupancy = ["preprocess occupancy"] if args.f_preprocess_occupancy else []
+
+        # In streaming mode, the analyses on packet counts declare their aggregations
+        # and one fused scan per scenario computes all of them
+        aggregations: List[streaming.Aggregation] = []
+        if args.streaming:
+            if args.f_hops:
+                aggregations += streaming.HOPS
+            if args.f_e2e_delay_cdf and args.sketch is None:
+                aggregations += streaming.E2E_DELAY
+            if args.f_packetloss or args.f_deliveryratio or args.f_compare_failures:
+                aggregations += streaming.DELIVERED_DROPPED
+            if args.f_drop_heatmap:
+                aggregations += streaming.DROP_REASONS
+            if args.f_throughput:
+                aggregations += streaming.DELIVERED_SIZES
+        fused = len(aggregations) > 0
+        if fused:
+            stats_config.aggregates = {}
+            for cstl in stats_config.cstl:
+                for sim_name in stats_config.sim_name:
+                    scheduler.add(
+                        Task(
+                            _scan_task_name(cstl, sim_name),
+                            partial(
+                                streaming.scan_stats,
+                                stats_config,
+                                cstl,
+                                sim_name,
+                                aggregations,
+                            ),
+                            stats,
+                        )
+                    )
+
+        # Analyses are split into one task per figure, i.e. per constellation and
+        # scenario, so that independent figures are generated in parallel
+        if args.f_hops:
+            _add_per_scenario(
+                scheduler,
+                stats_config,
+                "generate hops CDF",
+                analyze_hopcounts,
+                stats,
+                scanned=fused,
             )
-            print(
-                "Are satellite states preprocessed? This is required once after FLoRaSat simulation runs."
+        if args.f_distances:
+            _add_per_scenario(
+                scheduler,
+                stats_config,
+                "generate distance CDF",
+                analyze_distances,
+                routes + stats,
+                routes_hint,
             )
-            sys.exit(1)
-
-    if args.f_paramstudy_inclination:
-        print("")
-        print("Run paramstudy inclination graph generation...")
-        try:
-            paramstudy_inclination(stats_config)
-        except FileNotFoundError as e:
-            print(
-                "X Failed to generate paramstudy inclination. Could not find:",
-                e.filename,
+        if args.f_packetloss:
+            _add_per_scenario(
+                scheduler,
+                stats_config,
+                "generate packetloss graph",
+                analyze_packetloss,
+                stats,
+                scanned=fused,
             )
-            print(
-                "Are satellite states preprocessed? This is required once after FLoRaSat simulation runs."
+        if args.f_deliveryratio:
+            _add_per_scenario(
+                scheduler,
+                stats_config,
+                "generate deliveryratio graph",
+                analyze_deliveryratio,
+                stats,
+                scanned=fused,
             )
-            sys.exit(1)
-
-    if args.f_paramstudy_datarate:
-        print("")
-        print("Run paramstudy datarate graph generation...")
-        try:
-            paramstudy_datarate(stats_config)
-        except FileNotFoundError as e:
-            print(
-                "X Failed to generate paramstudy datarate. Could not find:", e.filename
+        if args.f_drop_heatmap:
+            _add_per_scenario(
+                scheduler,
+                stats_config,
+                "generate drop heatmap",
+                create_drop_heatmap,
+                stats,
+                routes_hint,
+                scanned=fused,
             )
-            print(
-                "Are satellite states preprocessed? This is required once after FLoRaSat simulation runs."
+        if args.f_queue_sizes:
+            _add_per_scenario(
+                scheduler,
+                stats_config,
+                "generate queue size graph",
+                analyze_queues,
+                sats,
+                sats_hint,
             )
-            sys.exit(1)
-
-    if args.f_compare_failures:
-        print("")
-        print("Run compare failures comparison graph generation...")
-        try:
-            compare_failure_scenarios(stats_config)
-        except FileNotFoundError as e:
-            print(
-                "X Failed to generate compare failures graph. Could not find:",
-                e.filename,
+        if args.f_e2e_delay_cdf:
+            _add_per_scenario(
+                scheduler,
+                stats_config,
+                "generate E2E delay CDF",
+                analyze_e2edelay,
+                stats,
+                scanned=fused and args.sketch is None,
             )
-            sys.exit(1)
-
-    if args.f_compare_congestion:
-        print("")
-        print("Run compare congestion comparison graph generation...")
-        try:
-            compare_congestion_scenarios(stats_config)
-        except FileNotFoundError as e:
-            print(
-                "X Failed to generate compare congestions graph. Could not find:",
-                e.filename,
+        if args.f_compare_delay:
+            for sim_name in stats_config.sim_name:
+                scheduler.add(
+                    Task(
+                        f"generate delay comparison graph ({sim_name})",
+                        partial(
+                            compare_delays, replace(stats_config, sim_name=[sim_name])
+                        ),
+                        stats,
+                    )
+                )
+        if args.f_throughput:
+            _add_per_scenario(
+                scheduler,
+                stats_config,
+                "generate analyze throughput graph",
+                analyze_throughput,
+                stats,
+                scanned=fused,
+            )
+        if args.f_paramstudy_altitude:
+            scheduler.add(
+                Task(
+                    "generate paramstudy altitude",
+                    partial(paramstudy_altitude, stats_config),
+                    routes + stats,
+                    sats_hint,
+                )
+            )
+        if args.f_paramstudy_inclination:
+            scheduler.add(
+                Task(
+                    "generate paramstudy inclination",
+                    partial(paramstudy_inclination, stats_config),
+                    routes + stats,
+                    sats_hint,
+                )
+            )
+        if args.f_paramstudy_datarate:
+            scheduler.add(
+                Task(
+                    "generate paramstudy datarate",
+                    partial(paramstudy_datarate, stats_config),
+                    sats + stats,
+                    sats_hint,
+                )
+            )
+        if args.f_compare_failures:
+            for cstl in stats_config.cstl:
+                scans = [
+                    _scan_task_name(cstl, sim_name)
+                    for sim_name in stats_config.sim_name
+                ]
+                scans = scans if fused else []
+                scheduler.add(
+                    Task(
+                        f"generate compare failures graph ({cstl})",
+                        partial(
+                            compare_failure_scenarios,
+                            replace(stats_config, cstl=[cstl]),
+                        ),
+                        stats + scans,
+                    )
+                )
+        if args.f_compare_congestion:
+            for cstl in stats_config.cstl:
+                scheduler.add(
+                    Task(
+                        f"generate compare congestions graph ({cstl})",
+                        partial(
+                            compare_congestion_scenarios,
+                            replace(stats_config, cstl=[cstl]),
+                        ),
+                        sats + stats,
+                        sats_hint,
+                    )
+                )
+        if args.f_compare_queuing_delays:
+            scheduler.add(
+                Task(
+                    "generate compare queuing delays graph",
+                    partial(compare_queuing_delay, stats_config),
+                    stats,
+                )
             )
-            print(
-                "Are satellite states preprocessed? This is required once after FLoRaSat simulation runs."
+        if args.f_queue_heatmap:
+            _add_per_scenario(
+                scheduler,
+                stats_config,
+                "generate queue heatmap",
+                partial(analyze_queue_heatmap, top_k=args.top_k),
+                occupancy,
+                "Is the occupancy preprocessed? Run with --preprocess-occupancy once.",
             )
-            sys.exit(1)
 
-    if args.f_compare_queuing_delays:
+        (task_failures, skipped) = scheduler.run()
+    finally:
+        # also if a task raised past the scheduler, no workers are left behind
+        if stats_config.pool is not None:
+            stats_config.pool.shutdown()
+        if stats_config.threads is not None:
+            stats_config.threads.shutdown()
+        failures = finish_export_queue()
+        stats_config.manifest.save()
+
+    if len(failures) > 0:
         print("")
-        print("Run generate compare queuing delays graph generation...")
-        try:
-            compare_queuing_delay(stats_config)
-        except FileNotFoundError as e:
-            print(
-                "X Failed to generate compare queuing delays graph. Could not find:",
-                e.filename,
+        print(f"X Failed to export {len(failures)} figures:")
+        for file_path, error in failures:
+            print("\t", file_path, "\t", error)
+
+    for name, error in task_failures:
+        print("")
+        if isinstance(error, FileNotFoundError):
+            print(f"X Failed to {name}. Could not find:", error.filename)
+            hint = scheduler.tasks[name].hint
+            if hint is not None:
+                print(hint)
+        else:
+            print(f"X Failed to {name}:")
+            traceback.print_exception(error)
+    if len(skipped) > 0:
+        print("")
+        print(f"X Skipped {len(skipped)} tasks as a task they depend on failed.")
+
+    if len(failures) > 0 or len(task_failures) > 0:
+        sys.exit(1)
+
+
+def _add_per_scenario(
+    scheduler: Scheduler,
+    config: utils.Config,
+    name: str,
+    analysis: Callable[[utils.Config], None],
+    dependencies: List[str],
+    hint: Optional[str] = None,
+    scanned: bool = False,
+):
+    """
+    Adds one task per constellation and scenario, each generates its own figures.
+    Scanned analyses read their aggregations from the fused scan of the scenario.
+    """
+    for cstl in config.cstl:
+        for sim_name in config.sim_name:
+            scan = [_scan_task_name(cstl, sim_name)] if scanned else []
+            scheduler.add(
+                Task(
+                    f"{name} ({cstl}/{sim_name})",
+                    partial(
+                        analysis, replace(config, cstl=[cstl], sim_name=[sim_name])
+                    ),
+                    dependencies + scan,
+                    hint,
+                )
             )
-            sys.exit(1)
+
+
+def _scan_task_name(cstl: str, sim_name: str) -> str:
+    return f"scan stats ({cstl}/{sim_name})"
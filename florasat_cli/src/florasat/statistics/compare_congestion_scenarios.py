@@ -6,7 +6,6 @@ import os
 from pathlib import Path
 import time
 from typing import Dict, List, Tuple
-from florasat_statistics import load_sat_stats
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
@@ -17,7 +16,9 @@ from florasat.statistics.utils import (
     get_sats_dump_file,
     load_stats,
 )
+from florasat.statistics.queue_stats import load_queue_steps
 from plotly.subplots import make_subplots
+from florasat.statistics.renderer import write_figure
 
 
 @dataclass
@@ -28,6 +29,28 @@ class Scatter:
     scatter: go.Scatter
 
 
+# simulated time of the congestion scenarios in seconds
+sim_duration = 1500
+
+# part of the cache file names, bump it whenever the cached values change
+queue_sizes_version = 2
+
+
+def get_queue_sizes_cache(config: Config, cstl: str, sim: str, alg: str) -> Path:
+    """Mean queue sizes per satellite and 100ms bin, summed over all runs."""
+    path = config.results_path.joinpath(cstl).joinpath(sim)
+    return path.joinpath(
+        f"{alg}.queue-sizes.{config.runs}-runs.v{queue_sizes_version}.csv"
+    )
+
+
+def is_cache_fresh(cache_fp: Path, sources: List[Path]) -> bool:
+    if not cache_fp.exists():
+        return False
+    mtime = cache_fp.stat().st_mtime
+    return all(mtime >= source.stat().st_mtime for source in sources)
+
+
 def compare_congestion_scenarios(config: Config):
     start = datetime.datetime(2019, 1, 1, 0, 0)
     for cstl in config.cstl:
@@ -48,61 +71,42 @@ def compare_congestion_scenarios(config: Config):
                 print(f"\t\tWorking on {alg}...")
                 run_dfs: List[pd.DataFrame] = []
 
-                tmp_path = Path(f"{cstl}-{sim}-{alg}")
+                cache_fp = get_queue_sizes_cache(config, cstl, sim, alg)
+                sats_fps = [
+                    get_sats_dump_file(config, cstl, sim, alg, run)[1]
+                    for run in range(config.runs)
+                ]
 
-                if tmp_path.exists():
-                    df = pd.read_csv(tmp_path)
+                if is_cache_fresh(cache_fp, sats_fps):
+                    df = pd.read_csv(cache_fp)
                     df = df.set_index("timestamp")
                 else:
-                    for run in range(config.runs):
+                    for run, file_path in enumerate(sats_fps):
                         print(f"\t\t\tWorking on run {run}...")
-                        _, file_path = get_sats_dump_file(config, cstl, sim, alg, run)
                         print(f"\t\t\t\tLoad {run}...")
-                        satellites = load_sat_stats(str(file_path))
+                        steps = load_queue_steps(str(file_path))
 
                         print(f"\t\t\t\tPre-Process {run}...")
-                        run_df = None
-                        dfs = []
-                        for id, sat in enumerate(satellites):
-                            if id % 50 == 0:
-                                print("Current sat:", id)
-                            entries = [[0.0, 0]]
-                            entries.extend(
-                                [[entry.start, entry.qs] for entry in sat.entries]
-                            )
-                            entries.append([1500.0, 0])
-                            df = pd.DataFrame(
-                                entries,
-                                columns=["timestamp", "queueSize"],
-                            )
-
-                            df["timestamp"] = df["timestamp"] * 1000 * 1000
-                            df["timestamp"] = df["timestamp"].astype("timedelta64[us]") + start  # type: ignore
-                            df = (
-                                df.set_index("timestamp").resample("1ms").last().ffill()
-                            )
-                            df = df.resample("100ms").mean().ffill()
-                            if run_df is None:
-                                run_df = pd.DataFrame(
-                                    [],
-                                    columns=["timestamp"],
-                                )
-                                run_df["timestamp"] = df.index
-                                run_df = run_df.set_index("timestamp")
-                            run_df[id] = df["queueSize"]
-                            # print(df["queueSize"].mean())
-                            dfs.append(df)
-                        assert run_df is not None
-                        # dfs.insert(0, run_df)
-                        # run_df = pd.concat(dfs, axis=1)
-                        print(run_df)
+                        # exact mean queue size of every satellite per 100ms bin
+                        bins = np.arange(int(sim_duration * 10))
+                        means = steps.mean(np.append(bins, len(bins)) / 10)
+                        run_df = pd.DataFrame(
+                            means.T,
+                            index=pd.Index(
+                                start + pd.to_timedelta(bins * 100, unit="ms"),
+                                name="timestamp",
+                            ),
+                        )
                         run_dfs.append(run_df)
 
                     print("\t\t\t\tReduce {alg}...")
                     df = reduce(lambda a, b: a.add(b, fill_value=0), run_dfs)
 
                     print(f"\t\t\t\tCache {alg}...")
-                    df.to_csv(tmp_path, index=True)
+                    os.makedirs(cache_fp.parent, exist_ok=True)
+                    tmp_fp = cache_fp.with_name(f"{cache_fp.name}.tmp")
+                    df.to_csv(tmp_fp, index=True)
+                    os.replace(tmp_fp, cache_fp)
                 df["mean"] = df.mean(axis=1)
                 df["ts"] = pd.to_datetime(df.index.values).map(lambda x: x.second + x.minute * 60 + x.hour * 3600)
                 df = df.groupby("ts").mean().pipe(pd.DataFrame)
@@ -163,4 +167,4 @@ def compare_congestion_scenarios(config: Config):
         os.makedirs(file_path, exist_ok=True)
         file_path = file_path.joinpath(f"congestion.comparison.pdf")
         apply_default(fig, 20, mt=40, width=1200, height=400)
-        fig.write_image(file_path, engine="kaleido")
+        write_figure(fig, file_path)
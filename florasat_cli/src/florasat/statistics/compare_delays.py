@@ -4,8 +4,15 @@ from typing import Dict, List, Tuple
 import pandas as pd
 import plotly.graph_objects as go
 
-from florasat.statistics.utils import Config, apply_default, load_stats
+from florasat.statistics.utils import (
+    DELIVERED_NORMAL,
+    Config,
+    apply_default,
+    grouped_box,
+    iter_stats,
+)
 from plotly.subplots import make_subplots
+from florasat.statistics.renderer import write_figure
 
 
 def compare_delays(config: Config):
@@ -20,16 +27,25 @@ def compare_delays(config: Config):
         alg_dfs: Dict[str, pd.DataFrame] = {}
         for alg in config.algorithms:
             dfs: List[pd.DataFrame] = []
-            for cstl in config.cstl:
+            runs = iter_stats(
+                config,
+                [(cstl, sim_name, alg) for cstl in config.cstl],
+                columns=[
+                    "pid",
+                    "queueDelay",
+                    "procDelay",
+                    "transDelay",
+                    "propDelay",
+                    "srcGs",
+                    "dstGs",
+                    "created",
+                ],
+                filters=DELIVERED_NORMAL,
+            )
+            for cstl, df in zip(config.cstl, runs):
                 print("\t", f"Working on {alg}/{cstl}/{sim_name}...")
-                # Load all runs
-                df = load_stats(config, cstl, sim_name, alg)
                 # Concat runs
                 df = pd.concat(df)
-                # Filter for delivered and Normal packets
-                df = df.loc[(df["dropReason"] == 99) & (df["type"] == "N")]
-
-                df.drop(columns=["dropReason", "type"], inplace=True)
 
                 df = (
                     df.groupby(["pid"])[
@@ -87,12 +103,12 @@ def compare_delays(config: Config):
             df = alg_dfs[alg]
 
             fig.add_trace(
-                go.Box(
-                    x=df["cstl"],
-                    y=df["queueDelay"],
+                grouped_box(
+                    df,
+                    "cstl",
+                    "queueDelay",
                     legendgroup=alg,
                     name=alg,
-                    boxpoints=False,
                     line_color=color,
                     showlegend=True,
                 ),
@@ -101,12 +117,12 @@ def compare_delays(config: Config):
             )
 
             fig.add_trace(
-                go.Box(
-                    x=df["cstl"],
-                    y=df["procDelay"],
+                grouped_box(
+                    df,
+                    "cstl",
+                    "procDelay",
                     legendgroup=alg,
                     name=alg,
-                    boxpoints=False,
                     line_color=color,
                     showlegend=False,
                 ),
@@ -115,12 +131,12 @@ def compare_delays(config: Config):
             )
 
             fig.add_trace(
-                go.Box(
-                    x=df["cstl"],
-                    y=df["transDelay"],
+                grouped_box(
+                    df,
+                    "cstl",
+                    "transDelay",
                     legendgroup=alg,
                     name=alg,
-                    boxpoints=False,
                     line_color=color,
                     showlegend=False,
                 ),
@@ -129,12 +145,12 @@ def compare_delays(config: Config):
             )
 
             fig.add_trace(
-                go.Box(
-                    x=df["cstl"],
-                    y=df["propDelay"],
+                grouped_box(
+                    df,
+                    "cstl",
+                    "propDelay",
                     legendgroup=alg,
                     name=alg,
-                    boxpoints=False,
                     line_color=color,
                     showlegend=False,
                 ),
@@ -156,7 +172,7 @@ def compare_delays(config: Config):
         print("\t", "Write plot to file", file_path)
         apply_default(fig, size=20)
         fig.update_layout(width=1200, boxgap=0.01)
-        fig.write_image(file_path, engine="kaleido")
+        write_figure(fig, file_path)
 
         # for delay in ["queueDelay", "procDelay", "transDelay", "propDelay"]:
         #     print(f"Create plot for {delay}...")
@@ -1,3 +1,4 @@
+import itertools
 from dataclasses import dataclass
 from math import ceil
 import os
@@ -6,8 +7,10 @@ from typing import Dict, List, Tuple
 import pandas as pd
 import plotly.graph_objects as go
 
-from florasat.statistics.utils import Config, apply_default, load_stats
+from florasat.statistics.streaming import delivered_dropped_counts
+from florasat.statistics.utils import Config, apply_default, iter_stats
 from plotly.subplots import make_subplots
+from florasat.statistics.renderer import write_figure
 
 
 @dataclass
@@ -32,33 +35,42 @@ def compare_failure_scenarios(config: Config):
                 ("#1ca02c", "#2b9f2b"),
                 ("#00cc96", "#00cb95"),
             ]
-            for alg in config.algorithms:
+            if config.streaming:
+                runs = itertools.repeat(None)
+            else:
+                runs = iter_stats(
+                    config,
+                    [(cstl, sim, alg) for alg in config.algorithms],
+                    columns=["recorded", "dropReason"],
+                )
+            for alg, df in zip(config.algorithms, runs):
                 (color, color2) = colors.pop(0)
                 print(f"\t\tWorking on {alg}...")
-                # Load all runs
-                df = load_stats(config, cstl, sim, alg)
-                # Concat runs
-                df = pd.concat(df)
-
-                df["recorded"] = df["recorded"].round()
-
-                delivered = (
-                    df.loc[df["dropReason"] == 99]
-                    .groupby("recorded")["recorded"]
-                    .count()
-                    .pipe(pd.DataFrame)
-                    .rename(columns={"recorded": "rcvd"})
-                )
+                if df is None:
+                    df = delivered_dropped_counts(config, cstl, sim, alg)
+                else:
+                    # Concat runs
+                    df = pd.concat(df)
 
-                dropped = (
-                    df.loc[df["dropReason"] != 99]
-                    .groupby("recorded")["recorded"]
-                    .count()
-                    .pipe(pd.DataFrame)
-                    .rename(columns={"recorded": "dropped"})
-                )
+                    df["recorded"] = df["recorded"].round()
+
+                    delivered = (
+                        df.loc[df["dropReason"] == 99]
+                        .groupby("recorded")["recorded"]
+                        .count()
+                        .pipe(pd.DataFrame)
+                        .rename(columns={"recorded": "rcvd"})
+                    )
+
+                    dropped = (
+                        df.loc[df["dropReason"] != 99]
+                        .groupby("recorded")["recorded"]
+                        .count()
+                        .pipe(pd.DataFrame)
+                        .rename(columns={"recorded": "dropped"})
+                    )
 
-                df = delivered.join(dropped).reset_index()
+                    df = delivered.join(dropped).reset_index()
 
                 max_val = df["recorded"].max()
 
@@ -142,4 +154,4 @@ def compare_failure_scenarios(config: Config):
         os.makedirs(file_path, exist_ok=True)
         file_path = file_path.joinpath(f"packetloss.comparison.pdf")
         apply_default(fig, 20, mt=40, width=1200, height=400)
-        fig.write_image(file_path, engine="kaleido")
+        write_figure(fig, file_path)
@@ -6,8 +6,9 @@ from typing import Dict, List, Tuple
 import pandas as pd
 import plotly.graph_objects as go
 
-from florasat.statistics.utils import Config, apply_default, load_stats
+from florasat.statistics.utils import Config, apply_default, grouped_box, iter_stats
 from plotly.subplots import make_subplots
+from florasat.statistics.renderer import write_figure
 
 
 @dataclass
@@ -35,11 +36,14 @@ def compare_queuing_delay(config: Config):
             (color, color2) = colors.pop(0)
             print(f"\t\tWorking on {alg}...")
             is_first_cstl = True
-            for cstl in config.cstl:
+            runs = iter_stats(
+                config,
+                [(cstl, sim, alg) for cstl in config.cstl],
+                columns=["recorded", "queueDelay"],
+            )
+            for cstl, df in zip(config.cstl, runs):
                 print(f"\t\t\tWorking on {cstl}...")
 
-                # Load all runs
-                df = load_stats(config, cstl, sim, alg)
                 # Concat runs
                 df = pd.concat(df)
 
@@ -58,16 +62,16 @@ def compare_queuing_delay(config: Config):
                 df["cstl"] = cstl
 
                 # plot_dfs.append((alg, df))
-                violin = go.Box(
+                violin = grouped_box(
+                    df,
+                    "cstl",
+                    "queueDelay",
                     name=alg,
-                    x=df["cstl"],
-                    y=df["queueDelay"],
                     # mode="lines",
                     showlegend=(not algs_handled_once and is_first_cstl),
                     legendgroup=alg,
                     offsetgroup=alg,
                     line_color=color,
-                    boxpoints=False,
                 )
                 violin = Graph(alg, color2, cstl, df, violin)
                 if sim in alg_graphs:
@@ -119,4 +123,4 @@ def compare_queuing_delay(config: Config):
     file_path = file_path.joinpath(f"queueing-delay.comparison.pdf")
     print("\t", f"Write plot to file {file_path}...")
     apply_default(fig, 20, mt=40, width=1200, height=400)
-    fig.write_image(file_path, engine="kaleido")
+    write_figure(fig, file_path)
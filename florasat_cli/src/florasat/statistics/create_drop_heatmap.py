@@ -6,11 +6,12 @@ import pandas as pd
 import plotly.graph_objects as go
 from florasat_statistics import load_routes
 
+from florasat.statistics.streaming import drop_reason_counts
 from florasat.statistics.utils import (
     Config,
     apply_default,
     get_route_dump_file,
-    load_simulation_paths,
+    load_stats_run,
 )
 
 
@@ -46,15 +47,33 @@ def create_drop_heatmap(config: Config):
     for cstl in config.cstl:
         for sim_name in config.sim_name:
             for alg in config.algorithms:
+                if config.streaming:
+                    reasons = drop_reason_counts(config, cstl, sim_name, alg)
+                    counts = (
+                        reasons.loc[reasons.index != 99]
+                        .to_frame(name="count")
+                        .astype("float64")
+                    )
+                    # normalize for runs
+                    counts["count"] = counts["count"] / config.runs
+                    for reason, count in counts.itertuples():
+                        print(map_reason(reason), count)
+                    print(counts["count"].sum())
+                    continue
+
                 ground_stations: List = []
                 seen_ids = set()
                 # get groundstations that were involved in traffic
                 run_dfs = []
                 for run in range(0, config.runs):
-                    (stats_fp, _, _) = load_simulation_paths(
-                        config, cstl, sim_name, alg, run
+                    df = load_stats_run(
+                        config,
+                        cstl,
+                        sim_name,
+                        alg,
+                        run,
+                        columns=["dropReason", "size"],
                     )
-                    df = pd.read_csv(stats_fp)
                     # load and process routes
                     # (_, file_path) = get_route_dump_file(
                     #     config, cstl, sim_name, alg, run
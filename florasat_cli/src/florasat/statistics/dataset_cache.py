@@ -0,0 +1,147 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# (alg, cstl, sim_name, run, filters the frame was loaded with)
+CacheKey = Tuple[str, str, str, int, Tuple[Tuple[str, str, Any], ...]]
+
+
+@dataclass
+class CacheEntry:
+    df: pd.DataFrame
+    size: int
+    # True if df holds every column of the stats file
+    complete: bool
+
+
+class PendingLoad:
+    """
+    A load of a run that is in flight. The first caller of wait() reads the
+    frame, all others block until it is there and share it.
+    """
+
+    def __init__(self, columns: Optional[List[str]], read: Callable[[], pd.DataFrame]):
+        # columns requested by the load, None means all
+        self.columns = columns
+        self.read = read
+        self.lock = threading.Lock()
+        self.done = False
+        self.df: Optional[pd.DataFrame] = None
+        self.error: Optional[BaseException] = None
+
+    def covers(self, columns: Optional[List[str]]) -> bool:
+        if self.columns is None:
+            return True
+        return columns is not None and all(col in self.columns for col in columns)
+
+    def wait(self) -> pd.DataFrame:
+        with self.lock:
+            if not self.done:
+                try:
+                    self.df = self.read()
+                except BaseException as e:
+                    self.error = e
+                self.done = True
+        if self.error is not None:
+            raise self.error
+        assert self.df is not None
+        return self.df
+
+
+class DatasetCache:
+    """
+    In-process LRU cache of loaded stats frames, shared by all analyses of one
+    `statistics` invocation. The memory ceiling is given in bytes. The cache is
+    used from several threads at once, loads in flight are registered so that
+    a run requested twice is read only once.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self.pending: Dict[CacheKey, List[PendingLoad]] = {}
+        self.lock = threading.RLock()
+
+    def get(
+        self, key: CacheKey, columns: Optional[List[str]] = None
+    ) -> Optional[pd.DataFrame]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or not self.__covers(entry, columns):
+                return None
+            self.entries.move_to_end(key)
+            # hand out copies, analyses modify their frames in place
+            if columns is None:
+                return entry.df.copy()
+            return entry.df[columns]
+
+    def missing_columns(
+        self, key: CacheKey, columns: Optional[List[str]]
+    ) -> Optional[List[str]]:
+        """Columns that have to be loaded additionally for key, None means all."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or columns is None:
+                return columns
+            return [col for col in columns if col not in entry.df.columns]
+
+    def pending_load(
+        self, key: CacheKey, columns: Optional[List[str]]
+    ) -> Optional[PendingLoad]:
+        """A load in flight for key that brings all the given columns."""
+        with self.lock:
+            for load in self.pending.get(key, []):
+                if load.covers(columns):
+                    return load
+            return None
+
+    def start_load(self, key: CacheKey, load: PendingLoad):
+        with self.lock:
+            self.pending.setdefault(key, []).append(load)
+
+    def finish_load(self, key: CacheKey, load: PendingLoad):
+        with self.lock:
+            loads = self.pending.get(key, [])
+            if load in loads:
+                loads.remove(load)
+            if len(loads) == 0:
+                self.pending.pop(key, None)
+
+    def put(self, key: CacheKey, df: pd.DataFrame, complete: bool = False):
+        with self.lock:
+            self.__put(key, df, complete)
+
+    def __put(self, key: CacheKey, df: pd.DataFrame, complete: bool):
+        entry = self.entries.get(key)
+        if entry is not None and not complete:
+            # extend cached frame by the newly loaded columns
+            new_columns = [col for col in df.columns if col not in entry.df.columns]
+            df = pd.concat([entry.df, df[new_columns]], axis=1)
+            complete = entry.complete
+
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            # too big to cache, a cached entry with fewer columns stays
+            return
+        self.__remove(key)
+        while self.size + size > self.max_bytes:
+            (evicted, evicted_entry) = self.entries.popitem(last=False)
+            print("\t\t", "Evict from cache:", "/".join(map(str, evicted[:4])))
+            self.size -= evicted_entry.size
+        self.entries[key] = CacheEntry(df, size, complete)
+        self.size += size
+
+    def __remove(self, key: CacheKey):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    @staticmethod
+    def __covers(entry: CacheEntry, columns: Optional[List[str]]) -> bool:
+        if columns is None:
+            return entry.complete
+        return all(col in entry.df.columns for col in columns)
@@ -0,0 +1,44 @@
+from typing import Tuple
+import numpy as np
+
+
+def lttb(x, y, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduces a series to at most max_points points with Largest-Triangle-Three-
+    Buckets. The first and last point are kept, every bucket in between keeps the
+    point spanning the largest triangle with the previously kept point and the
+    mean of the next bucket, so peaks and the shape of the curve survive.
+    Series with at most max_points points, or max_points of 0, are returned as is.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(x)
+    if max_points == 0 or n <= max_points:
+        return (x, y)
+    if max_points < 3:
+        raise ValueError("LTTB keeps at least the first, the last and one inner point")
+
+    # x may be datetimes, the areas are computed on plain numbers
+    xs = x.astype(np.float64)
+    ys = y.astype(np.float64)
+    # max_points - 2 buckets over the inner points
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(max_points - 2):
+        (start, end) = (edges[i], edges[i + 1])
+        if i + 2 < len(edges):
+            following = slice(edges[i + 1], edges[i + 2])
+        else:
+            following = slice(n - 1, n)
+        mean_x = xs[following].mean()
+        mean_y = ys[following].mean()
+        area = np.abs(
+            (xs[a] - mean_x) * (ys[start:end] - ys[a])
+            - (xs[a] - xs[start:end]) * (mean_y - ys[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return (x[selected], y[selected])
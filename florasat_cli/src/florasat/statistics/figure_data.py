@@ -0,0 +1,72 @@
+import json
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+Summary = Dict[str, Dict[str, Optional[float]]]
+
+
+def get_figure_data_files(file_path: Union[str, Path]) -> Tuple[Path, Path, Path]:
+    """Figure spec, summary statistics and plotted series written next to a figure."""
+    file_path = Path(file_path)
+    return (
+        file_path.with_suffix(".fig.json"),
+        file_path.with_suffix(".summary.json"),
+        file_path.with_suffix(".data.parquet"),
+    )
+
+
+def write_figure_data(
+    fig: go.Figure, file_path: Union[str, Path], summary: Optional[Summary] = None
+):
+    """
+    Writes the aggregated data behind a figure next to it: the full figure spec
+    as JSON for replotting, the summary statistics if given and the series of
+    all x/y traces as one long Parquet table.
+    """
+    fig_path, summary_path, data_path = get_figure_data_files(file_path)
+    os.makedirs(fig_path.parent, exist_ok=True)
+    pio.write_json(fig, fig_path)
+    if summary is not None:
+        summary = {
+            name: {key: _to_json(value) for key, value in values.items()}
+            for name, values in summary.items()
+        }
+        with open(summary_path, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    series = [
+        pd.DataFrame({"trace": id, "name": trace.name, "x": trace.x, "y": trace.y})
+        for id, trace in enumerate(fig.data)
+        if _is_series(trace)
+    ]
+    if len(series) > 0:
+        data = pd.concat(series, ignore_index=True)
+        # traces with categorical and numeric x share one column
+        if data["x"].dtype == object:
+            data["x"] = data["x"].astype(str)
+        data.to_parquet(data_path, index=False)
+
+
+def read_figure(fig_path: Union[str, Path]) -> go.Figure:
+    return pio.read_json(fig_path)
+
+
+def _is_series(trace) -> bool:
+    # the x and y of heatmaps are axes of z, not paired values
+    if getattr(trace, "z", None) is not None:
+        return False
+    x = getattr(trace, "x", None)
+    y = getattr(trace, "y", None)
+    return x is not None and y is not None and len(x) == len(y)
+
+
+def _to_json(value: Any) -> Optional[float]:
+    if value is None or math.isnan(value):
+        return None
+    # NumPy scalars to plain Python numbers
+    return value.item() if hasattr(value, "item") else value
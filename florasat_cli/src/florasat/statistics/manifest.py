@@ -0,0 +1,141 @@
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+import re
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+run_file_pattern = re.compile(r"^(\d+)\.(stats|routes|sats)\.csv$")
+
+manifest_file_name = ".florasat_manifest.json"
+
+manifest_version = 2
+
+
+@dataclass
+class DirectoryEntry:
+    # st_mtime_ns of the simulation directory when it was scanned
+    mtime_ns: int
+    # run -> file kind -> (st_mtime_ns, st_size) of the file
+    runs: Dict[int, Dict[str, Tuple[int, int]]] = field(default_factory=dict)
+
+
+class Manifest:
+    """
+    Index of the FLoRaSat results tree (<alg>/<cstl>/<sim_name>/<run>.<kind>.csv).
+    A simulation directory is scanned once and afterwards only rescanned when its
+    mtime changed, as run files were added or removed, or one of its run files
+    changed its mtime or size, as it was rewritten in place. With an index file,
+    the index survives between invocations. Safe to use from several threads.
+    """
+
+    def __init__(self, root: Path, index_fp: Optional[Path] = None):
+        self.root = root
+        self.index_fp = index_fp
+        self.directories: Dict[Tuple[str, str, str], DirectoryEntry] = {}
+        # directories checked against the file system during this invocation
+        self.validated: Set[Tuple[str, str, str]] = set()
+        self.dirty = False
+        self.lock = threading.Lock()
+        if index_fp is not None and index_fp.exists():
+            self.__read_index(index_fp)
+
+    def directory(self, alg: str, cstl: str, sim_name: str) -> DirectoryEntry:
+        key = (alg, cstl, sim_name)
+        with self.lock:
+            entry = self.directories.get(key)
+            if key in self.validated and entry is not None:
+                return entry
+
+            path = self.root.joinpath(alg).joinpath(cstl).joinpath(sim_name)
+            mtime_ns = path.stat().st_mtime_ns
+            if (
+                entry is None
+                or entry.mtime_ns != mtime_ns
+                or not self.__files_unchanged(path, entry)
+            ):
+                entry = self.__scan(path, mtime_ns)
+                self.directories[key] = entry
+                self.dirty = True
+            self.validated.add(key)
+            return entry
+
+    def save(self):
+        with self.lock:
+            if self.index_fp is None or not self.dirty:
+                return
+            content = {
+                "version": manifest_version,
+                "root": str(self.root),
+                "directories": [
+                    {
+                        "alg": alg,
+                        "cstl": cstl,
+                        "sim_name": sim_name,
+                        "mtime_ns": entry.mtime_ns,
+                        "runs": {
+                            str(run): {kind: list(stat) for kind, stat in files.items()}
+                            for run, files in entry.runs.items()
+                        },
+                    }
+                    for (alg, cstl, sim_name), entry in self.directories.items()
+                ],
+            }
+            os.makedirs(self.index_fp.parent, exist_ok=True)
+            tmp_fp = self.index_fp.with_name(self.index_fp.name + ".tmp")
+            with open(tmp_fp, "w") as f:
+                json.dump(content, f)
+            os.replace(tmp_fp, self.index_fp)
+            self.dirty = False
+
+    @staticmethod
+    def __files_unchanged(path: Path, entry: DirectoryEntry) -> bool:
+        for run, files in entry.runs.items():
+            for kind, stat in files.items():
+                try:
+                    file_stat = path.joinpath(f"{run}.{kind}.csv").stat()
+                except FileNotFoundError:
+                    return False
+                if (file_stat.st_mtime_ns, file_stat.st_size) != stat:
+                    return False
+        return True
+
+    @staticmethod
+    def __scan(path: Path, mtime_ns: int) -> DirectoryEntry:
+        entry = DirectoryEntry(mtime_ns)
+        with os.scandir(path) as it:
+            for dir_entry in it:
+                match = run_file_pattern.match(dir_entry.name)
+                if match is None:
+                    continue
+                run = int(match.group(1))
+                stat = dir_entry.stat()
+                entry.runs.setdefault(run, {})[match.group(2)] = (
+                    stat.st_mtime_ns,
+                    stat.st_size,
+                )
+        return entry
+
+    def __read_index(self, index_fp: Path):
+        try:
+            with open(index_fp) as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            print("\t", "Ignore unreadable manifest:", index_fp)
+            return
+        # an index of another results tree is of no use
+        if (
+            content.get("version") != manifest_version
+            or content.get("root") != str(self.root)
+        ):
+            return
+        for directory in content["directories"]:
+            key = (directory["alg"], directory["cstl"], directory["sim_name"])
+            self.directories[key] = DirectoryEntry(
+                directory["mtime_ns"],
+                {
+                    int(run): {kind: tuple(stat) for kind, stat in files.items()}
+                    for run, files in directory["runs"].items()
+                },
+            )
@@ -1,21 +1,41 @@
-import datetime
 import os
 from typing import List
-from florasat_statistics import load_routes, load_sat_stats
 import numpy as np
 import pandas as pd
 from florasat.statistics.utils import (
+    E2E_DELAY_COLUMNS,
     Config,
+    DELIVERED_NORMAL,
+    e2e_delay_ms,
     apply_default,
+    box_summary,
     get_sats_dump_file,
-    load_simulation_paths,
+    map_runs,
+    request_stats_run,
+    summary_box,
 )
+from florasat.statistics.queue_stats import load_queue_steps
 import plotly.express as px
 import plotly.graph_objects as go
+from florasat.statistics.renderer import write_figure
+
+
+def load_mean_queue_sizes(file_path: str) -> pd.DataFrame:
+    steps = load_queue_steps(file_path)
+    if steps.end <= 0.0:
+        # no queue sizes recorded, or the run ended at its start
+        return pd.DataFrame(
+            {"queueSize": pd.Series(dtype=np.float64)},
+            index=pd.Index([], dtype=np.int64, name="id"),
+        )
+    # exact time-weighted mean of every satellite over the whole run
+    means = steps.mean(np.array([0.0, steps.end]))
+    return pd.DataFrame(
+        {"queueSize": means[:, 0]}, index=pd.Index(steps.sat_id, name="id")
+    )
 
 
 def paramstudy_datarate(config: Config):
-    start = datetime.datetime(2019, 1, 1, 0, 0)
     fig_delay = go.Figure()
     fig_congestion = go.Figure()
     init_datarate = None
@@ -38,30 +58,24 @@ def paramstudy_datarate(config: Config):
             for alg in config.algorithms:
                 alg_pd = None
                 alg_df = None
-                for run in range(config.runs):
-                    (stats_path, _, _) = load_simulation_paths(
-                        config, cstl, sim_name, alg, run
-                    )
-                    (_, file_path) = get_sats_dump_file(
-                        config, cstl, sim_name, alg, run
+                requests = [
+                    request_stats_run(
+                        config,
+                        cstl,
+                        sim_name,
+                        alg,
+                        run,
+                        columns=["pid"] + E2E_DELAY_COLUMNS,
+                        filters=DELIVERED_NORMAL,
                     )
-                    sats = load_sat_stats(str(file_path))
-                    df = pd.DataFrame(columns=["id", "timestamp", "queueSize"])
-                    for sat in sats:
-                        id = sat.sat_id
-                        entries = [[id, entry.start, entry.qs] for entry in sat.entries]
-
-                        df = pd.concat(
-                            [pd.DataFrame(entries, columns=df.columns), df],
-                            ignore_index=True,
-                        )
-
-                    # df = df.groupby(["id", "timestamp"]).agg("mean")
-                    df["timestamp"] = df["timestamp"] * 1000 * 1000
-                    df["timestamp"] = df["timestamp"].astype("timedelta64[us]") + start  # type: ignore
-                    df = df.set_index("timestamp").resample("100us").last().ffill()
-                    df = df.reset_index()
-                    df = df.groupby("id")["queueSize"].mean().pipe(pd.DataFrame)
+                    for run in range(config.runs)
+                ]
+                sats_fps = [
+                    str(get_sats_dump_file(config, cstl, sim_name, alg, run)[1])
+                    for run in range(config.runs)
+                ]
+                run_queues = map_runs(config, load_mean_queue_sizes, sats_fps)
+                for request, df in zip(requests, run_queues):
                     df["queueSize"] = df["queueSize"] / factor
                     # print(df)
                     if alg_df is None:
@@ -72,9 +86,8 @@ def paramstudy_datarate(config: Config):
                         # print(alg_df)
 
                     ############################## e2e delay ##############################
-                    df = pd.read_csv(stats_path)
+                    df = request()
                     # df["distance"] = distances
-                    df = df.loc[(df["dropReason"] == 99) & (df["type"] == "N")]
 
                     if alg_pd is None:
                         alg_pd = df
@@ -96,15 +109,7 @@ def paramstudy_datarate(config: Config):
                 if alg_pd is None:
                     raise Exception("Alg_pd is none but should not!")
 
-                alg_pd["e2e-delay"] = (
-                    (
-                        alg_pd["queueDelay"]
-                        + alg_pd["procDelay"]
-                        + alg_pd["transDelay"]
-                        + alg_pd["propDelay"]
-                    )
-                    * 1000
-                ).round()
+                alg_pd["e2e-delay"] = e2e_delay_ms(alg_pd)
 
                 alg_pd = alg_pd[["pid", "e2e-delay"]]
 
@@ -137,49 +142,8 @@ def paramstudy_datarate(config: Config):
             ("e2e-delay", fig_delay, size_pds),
             ("queueSize", fig_congestion, size_dfs),
         ]:
-            q1 = []
-            median = []
-            q3 = []
-            lowerfence = []
-            upperfence = []
-            mean = []
-
-            for df in dfs:
-                work_on = df[metric]
-                tmp_q1 = np.percentile(work_on, 25)
-                q1.append(tmp_q1)
-                median.append(np.percentile(work_on, 50))  # median
-                tmp_q3 = np.percentile(work_on, 75)
-                q3.append(tmp_q3)  # q3
-
-                iqr = tmp_q3 - tmp_q1
-                th_upper = tmp_q3 + 1.5 * iqr
-                max_delay = work_on.max()
-                th_lower = tmp_q1 - 1.5 * iqr
-                min_delay = work_on.min()
-
-                lowerfence.append(max(min_delay, float(th_lower)))
-                upperfence.append(min(max_delay, float(th_upper)))
-                mean.append(work_on.mean())
-
-            fig.add_trace(
-                go.Box(
-                    x=sizes,
-                    y=[
-                        [0],
-                        [0],
-                        [0],
-                    ],
-                    q1=q1,
-                    median=median,
-                    q3=q3,
-                    lowerfence=lowerfence,
-                    upperfence=upperfence,
-                    mean=mean,
-                    boxpoints=False,
-                    name=datarate,
-                )
-            )
+            summaries = [box_summary(df[metric]) for df in dfs]
+            fig.add_trace(summary_box(sizes, summaries, name=datarate))
 
     fig_delay.update_layout(
         legend={
@@ -204,7 +168,7 @@ def paramstudy_datarate(config: Config):
     file_path = file_path.joinpath(f"paramstudy-datarate-delays.pdf")
     print("\t", "Write plot to file", file_path)
     apply_default(fig_delay, height=600, width=800)
-    fig_delay.write_image(file_path, engine="kaleido")
+    write_figure(fig_delay, file_path)
 
     fig_congestion.update_layout(
         legend={
@@ -229,4 +193,4 @@ def paramstudy_datarate(config: Config):
     file_path = file_path.joinpath(f"paramstudy-datarate-congestion.pdf")
     print("\t", "Write plot to file", file_path)
     apply_default(fig_congestion, height=600, width=800)
-    fig_congestion.write_image(file_path, engine="kaleido")
+    write_figure(fig_congestion, file_path)
@@ -1,12 +1,27 @@
 import os
-from typing import List
-from florasat_statistics import load_routes
+from typing import Dict, List
 import numpy as np
 
 import pandas as pd
-from florasat.statistics.utils import Config, apply_default, get_route_dump_file, load_simulation_paths, load_stats
+from florasat.statistics.utils import (
+    E2E_DELAY_COLUMNS,
+    Config,
+    apply_default,
+    box_summary,
+    DELIVERED_NORMAL,
+    e2e_delay_ms,
+    get_route_dump_file,
+    join_on_pid,
+    load_metric_sketch,
+    map_runs,
+    read_route_lengths,
+    request_stats_run,
+    summary_box,
+)
 import plotly.express as px
 import plotly.graph_objects as go
+from florasat.statistics.renderer import write_figure
+from florasat.statistics.sketch import DDSketch, merge_sketches
 
 def paramstudy_inclination(config: Config):
     fig_distance = go.Figure()
@@ -16,26 +31,51 @@ def paramstudy_inclination(config: Config):
         print("Working on inclination", incl)
         sizes = []
         size_pds: List[pd.DataFrame] = []
+        size_sketches: List[Dict[str, DDSketch]] = []
         for cstl in config.cstl:
             size = cstl.split("-")[1] + " sats"
             sizes.append(size)
+            if config.sketch is not None:
+                # all packets of all algorithms and runs, merged per metric
+                size_sketches.append(
+                    {
+                        metric: merge_sketches(
+                            [
+                                load_metric_sketch(
+                                    config, cstl, sim_name, alg, run, metric
+                                )
+                                for alg in config.algorithms
+                                for run in range(config.runs)
+                            ]
+                        )
+                        for metric in ["e2e-delay", "distance"]
+                    }
+                )
+                continue
             sim_pd = None
             for alg in config.algorithms:
                 alg_pd = None
-                for run in range(config.runs):
-                    (stats_path, _, _) = load_simulation_paths(
-                        config, cstl, sim_name, alg, run
-                    )
-                    (_, file_path) = get_route_dump_file(
-                        config, cstl, sim_name, alg, run
+                requests = [
+                    request_stats_run(
+                        config,
+                        cstl,
+                        sim_name,
+                        alg,
+                        run,
+                        columns=["pid"] + E2E_DELAY_COLUMNS,
+                        filters=DELIVERED_NORMAL,
                     )
-
-                    routes = load_routes(str(file_path))
-                    distances = list(map(lambda r: r.length, routes))
-
-                    df = pd.read_csv(stats_path)
-                    df["distance"] = distances
-                    df = df.loc[(df["dropReason"] == 99) & (df["type"] == "N")]
+                    for run in range(config.runs)
+                ]
+                routes_fps = [
+                    str(get_route_dump_file(config, cstl, sim_name, alg, run)[1])
+                    for run in range(config.runs)
+                ]
+                run_lengths = map_runs(config, read_route_lengths, routes_fps)
+                for request, route_lengths in zip(requests, run_lengths):
+                    df = request()
+                    df = join_on_pid(df, route_lengths, ["length"])
+                    df = df.rename(columns={"length": "distance"})
 
                     if alg_pd is None:
                         alg_pd = df
@@ -45,15 +85,7 @@ def paramstudy_inclination(config: Config):
                 if alg_pd is None:
                     raise Exception("Alg_pd is none but should not!")
 
-                alg_pd["e2e-delay"] = (
-                    (
-                        alg_pd["queueDelay"]
-                        + alg_pd["procDelay"]
-                        + alg_pd["transDelay"]
-                        + alg_pd["propDelay"]
-                    )
-                    * 1000
-                ).round()
+                alg_pd["e2e-delay"] = e2e_delay_ms(alg_pd)
 
                 alg_pd = alg_pd[["pid", "distance", "e2e-delay"]]
 
@@ -72,49 +104,14 @@ def paramstudy_inclination(config: Config):
             size_pds.append(sim_pd)
 
         for metric, fig in [("e2e-delay", fig_delay), ("distance", fig_distance)]:
-            q1 = []
-            median = []
-            q3 = []
-            lowerfence = []
-            upperfence = []
-            mean = []
-
-            for df in size_pds:
-                work_on = df[metric]
-                tmp_q1 = np.percentile(work_on, 25)
-                q1.append(tmp_q1)
-                median.append(np.percentile(work_on, 50))  # median
-                tmp_q3 = np.percentile(work_on, 75)
-                q3.append(tmp_q3)  # q3
-
-                iqr = tmp_q3 - tmp_q1
-                th_upper = tmp_q3 + 1.5 * iqr
-                max_delay = work_on.max()
-                th_lower = tmp_q1 - 1.5 * iqr
-                min_delay = work_on.min()
-
-                lowerfence.append(max(min_delay, float(th_lower)))
-                upperfence.append(min(max_delay, float(th_upper)))
-                mean.append(work_on.mean())
-
-            fig.add_trace(
-                go.Box(
-                    x=sizes,
-                    y=[
-                        [0],
-                        [0],
-                        [0],
-                    ],
-                    q1=q1,
-                    median=median,
-                    q3=q3,
-                    lowerfence=lowerfence,
-                    upperfence=upperfence,
-                    mean=mean,
-                    boxpoints=False,
-                    name=incl,
-                )
-            )
+            summaries = [sketches[metric].box_summary() for sketches in size_sketches]
+            summaries += [box_summary(df[metric]) for df in size_pds]
+            fig.add_trace(summary_box(sizes, summaries, name=incl))
+
+    # sketches summarize all packets instead of the per-pid means
+    (variant, of) = ("", "")
+    if config.sketch is not None:
+        (variant, of) = ("-all-packets", " (all packets)")
 
     fig_delay.update_layout(
         legend={
@@ -129,17 +126,17 @@ def paramstudy_inclination(config: Config):
         boxgroupgap=0.2,
         boxmode="group",
         xaxis_title="Number of satellites",
-        yaxis_title="Packet Delay [ms]",
+        yaxis_title=f"Packet Delay{of} [ms]",
     )
 
     fig_delay.update_yaxes(range=[0, 200])
 
     file_path = config.results_path
     os.makedirs(file_path, exist_ok=True)
-    file_path = file_path.joinpath(f"paramstudy-inclination-delays.pdf")
+    file_path = file_path.joinpath(f"paramstudy-inclination-delays{variant}.pdf")
     print("\t", "Write plot to file", file_path)
     apply_default(fig_delay, height=500, width=650)
-    fig_delay.write_image(file_path, engine="kaleido")
+    write_figure(fig_delay, file_path)
 
     fig_distance.update_layout(
         legend={
@@ -154,15 +151,15 @@ def paramstudy_inclination(config: Config):
         boxgroupgap=0.2,
         boxmode="group",
         xaxis_title="Number of satellites",
-        yaxis_title="Packet Distance [km]",
+        yaxis_title=f"Packet Distance{of} [km]",
     )
 
     fig_distance.update_yaxes(range=[0, 50000])  
 
     file_path = config.results_path
     os.makedirs(file_path, exist_ok=True)
-    file_path = file_path.joinpath(f"paramstudy-inclination-distances.pdf")
+    file_path = file_path.joinpath(f"paramstudy-inclination-distances{variant}.pdf")
     print("\t", "Write plot to file", file_path)
     apply_default(fig_distance, height=500, width=650)
-    fig_distance.write_image(file_path, engine="kaleido")
+    write_figure(fig_distance, file_path)
 
@@ -0,0 +1,57 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Tuple
+
+journal_file_name = ".florasat_journal.jsonl"
+
+
+class PreprocessJournal:
+    """
+    Append-only record of finished conversions, one JSON line per dump file.
+    A dump is up to date if it exists and its source still has the size and mtime
+    recorded when the dump was written. Every conversion is recorded as soon as it
+    finished, so an interrupted batch resumes after the last converted run.
+    """
+
+    def __init__(self, journal_fp: Path):
+        self.journal_fp = journal_fp
+        # dump file relative to the journal -> (size, mtime_ns) of its source
+        self.entries: Dict[str, Tuple[int, int]] = {}
+        # conversions may finish on several threads at once
+        self.lock = threading.Lock()
+        if journal_fp.exists():
+            self.__read()
+
+    def is_up_to_date(self, dump_fp: Path, source: os.stat_result) -> bool:
+        entry = self.entries.get(self.__key(dump_fp))
+        if entry is None or not dump_fp.exists():
+            return False
+        return entry == (source.st_size, source.st_mtime_ns)
+
+    def record(self, dump_fp: Path, source: os.stat_result):
+        """Records that dump_fp was converted from a source with the given stat."""
+        entry = (source.st_size, source.st_mtime_ns)
+        key = self.__key(dump_fp)
+        line = {"dump": key, "size": entry[0], "mtime_ns": entry[1]}
+        with self.lock:
+            self.entries[key] = entry
+            os.makedirs(self.journal_fp.parent, exist_ok=True)
+            with open(self.journal_fp, "a") as f:
+                f.write(json.dumps(line) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def __key(self, dump_fp: Path) -> str:
+        return os.path.relpath(dump_fp, self.journal_fp.parent)
+
+    def __read(self):
+        with open(self.journal_fp) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self.entries[entry["dump"]] = (entry["size"], entry["mtime_ns"])
+                except (ValueError, KeyError):
+                    # line of an interrupted write
+                    continue
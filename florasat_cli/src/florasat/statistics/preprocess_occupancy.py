@@ -0,0 +1,83 @@
+import json
+import os
+from math import ceil
+from pathlib import Path
+from typing import List, Tuple
+import numpy as np
+from florasat.statistics.preprocess_journal import PreprocessJournal, journal_file_name
+from florasat.statistics.queue_stats import load_queue_steps
+from florasat.statistics.utils import (
+    Config,
+    get_occupancy_file,
+    get_sats_dump_file,
+    map_threads,
+)
+
+
+def write_occupancy(sats_fp: Path, file_path: Path, meta_path: Path, bin_width: float):
+    """
+    Writes the mean queue size of every satellite per time bin as a float32
+    satellites x bins matrix. Rows are ordered by satellite id.
+    """
+    steps = load_queue_steps(str(sats_fp))
+    bin_count = max(1, ceil(steps.end / bin_width))
+    edges = np.arange(bin_count + 1) * bin_width
+
+    # filled block by block, the whole matrix is never held in memory
+    tmp_path = file_path.with_name(f"{file_path.name}.tmp")
+    matrix = np.lib.format.open_memmap(
+        tmp_path, mode="w+", dtype=np.float32, shape=(len(steps.sat_id), bin_count)
+    )
+    block = max(1, 4_000_000 // bin_count)
+    for begin in range(0, len(steps.sat_id), block):
+        rows = slice(begin, begin + block)
+        matrix[rows] = steps.mean(edges, rows)
+    matrix.flush()
+    del matrix
+    os.replace(tmp_path, file_path)
+
+    meta = {"bin_width": bin_width, "sat_ids": steps.sat_id.tolist()}
+    tmp_path = meta_path.with_name(f"{meta_path.name}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def preprocess_occupancy(config: Config, bin_width: float, force: bool = False):
+    journal = PreprocessJournal(config.satellites_path.joinpath(journal_file_name))
+    ########### load data ##########
+    tasks: List[Tuple[Path, Path, Path, os.stat_result]] = []
+    for cstl in config.cstl:
+        for sim_name in config.sim_name:
+            for alg in config.algorithms:
+                print("\t", f"Preprocess occupancy for {alg}/{cstl}/{sim_name}...")
+                for run in range(0, config.runs):
+                    _, sats_fp = get_sats_dump_file(config, cstl, sim_name, alg, run)
+                    _, file_path, meta_path = get_occupancy_file(
+                        config, cstl, sim_name, alg, run
+                    )
+                    source = os.stat(sats_fp)
+                    if (
+                        not force
+                        and journal.is_up_to_date(file_path, source)
+                        and _bin_width(meta_path) == bin_width
+                    ):
+                        print("\t", "\t", "Up to date:", file_path)
+                        continue
+                    tasks.append((sats_fp, file_path, meta_path, source))
+
+    def convert(task: Tuple[Path, Path, Path, os.stat_result]):
+        sats_fp, file_path, meta_path, source = task
+        print("\t", "\t", "Read + Convert:", sats_fp)
+        print("\t", "\t", "-> Dump to:", file_path)
+        write_occupancy(sats_fp, file_path, meta_path, bin_width)
+        journal.record(file_path, source)
+
+    map_threads(config, convert, tasks)
+
+
+def _bin_width(meta_path: Path):
+    if not meta_path.exists():
+        return None
+    with open(meta_path) as f:
+        return json.load(f)["bin_width"]
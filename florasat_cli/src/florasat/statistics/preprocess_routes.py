@@ -1,8 +1,20 @@
-from florasat.statistics.utils import Config, get_route_dump_file, load_simulation_paths
+import os
+from pathlib import Path
+from typing import List, Tuple
+from florasat.statistics.preprocess_journal import PreprocessJournal, journal_file_name
+from florasat.statistics.utils import (
+    Config,
+    get_route_dump_file,
+    get_route_metrics_file,
+    load_simulation_paths,
+    map_threads,
+)
 from florasat_statistics import process_routes
 
-def preprocess_routes(config: Config):
+def preprocess_routes(config: Config, force: bool = False):
+    journal = PreprocessJournal(config.routes_path.joinpath(journal_file_name))
     ########### load data ##########
+    tasks: List[Tuple[Path, Path, Path, Path, os.stat_result]] = []
     for cstl in config.cstl:
         for sim_name in config.sim_name:
             for alg in config.algorithms:
@@ -15,9 +27,25 @@ def preprocess_routes(config: Config):
                     (path, file_path) = get_route_dump_file(
                         config, cstl, sim_name, alg, run
                     )
-                    print("\t", "\t", "Read + Convert:", routes_fp)
-                    print("\t", "\t", "-> Dump to:", file_path)
-                    # Call Rust library function
-                    process_routes(
-                        str(routes_fp), str(path), str(file_path)
+                    (_, metrics_fp) = get_route_metrics_file(
+                        config, cstl, sim_name, alg, run
                     )
+                    source = os.stat(routes_fp)
+                    if (
+                        not force
+                        and journal.is_up_to_date(file_path, source)
+                        and metrics_fp.exists()
+                    ):
+                        print("\t", "\t", "Up to date:", file_path)
+                        continue
+                    tasks.append((routes_fp, path, file_path, metrics_fp, source))
+
+    def convert(task: Tuple[Path, Path, Path, Path, os.stat_result]):
+        (routes_fp, path, file_path, metrics_fp, source) = task
+        print("\t", "\t", "Read + Convert:", routes_fp)
+        print("\t", "\t", "-> Dump to:", file_path)
+        # Call Rust library function, releases the GIL while converting
+        process_routes(str(routes_fp), str(path), str(file_path), str(metrics_fp))
+        journal.record(file_path, source)
+
+    map_threads(config, convert, tasks)
@@ -1,9 +1,20 @@
-from florasat.statistics.utils import Config, get_sats_dump_file, load_simulation_paths
+import os
+from pathlib import Path
+from typing import List, Tuple
+from florasat.statistics.preprocess_journal import PreprocessJournal, journal_file_name
+from florasat.statistics.utils import (
+    Config,
+    get_sats_dump_file,
+    load_simulation_paths,
+    map_threads,
+)
 from florasat_statistics import process_sat_stats
 
 
-def preprocess_satellites(config: Config):
+def preprocess_satellites(config: Config, force: bool = False):
+    journal = PreprocessJournal(config.satellites_path.joinpath(journal_file_name))
     ########### load data ##########
+    tasks: List[Tuple[Path, Path, os.stat_result]] = []
     for cstl in config.cstl:
         for sim_name in config.sim_name:
             for alg in config.algorithms:
@@ -16,7 +27,18 @@ def preprocess_satellites(config: Config):
                     (path, file_path) = get_sats_dump_file(
                         config, cstl, sim_name, alg, run
                     )
-                    print("\t", "\t", "Read + Convert:", sats_fp)
-                    print("\t", "\t", "-> Dump to:", file_path)
-                    # Call Rust library function
-                    process_sat_stats(str(sats_fp), str(file_path))
+                    source = os.stat(sats_fp)
+                    if not force and journal.is_up_to_date(file_path, source):
+                        print("\t", "\t", "Up to date:", file_path)
+                        continue
+                    tasks.append((sats_fp, file_path, source))
+
+    def convert(task: Tuple[Path, Path, os.stat_result]):
+        (sats_fp, file_path, source) = task
+        print("\t", "\t", "Read + Convert:", sats_fp)
+        print("\t", "\t", "-> Dump to:", file_path)
+        # Call Rust library function, releases the GIL while converting
+        process_sat_stats(str(sats_fp), str(file_path))
+        journal.record(file_path, source)
+
+    map_threads(config, convert, tasks)
@@ -0,0 +1,50 @@
+import os
+from pathlib import Path
+from typing import List, Tuple
+from florasat.statistics.preprocess_journal import PreprocessJournal, journal_file_name
+from florasat.statistics.utils import (
+    Config,
+    convert_stats,
+    get_stats_dump_file,
+    is_stats_dump_fresh,
+    load_simulation_paths,
+    map_threads,
+)
+
+
+def preprocess_stats(config: Config, force: bool = False):
+    journal = PreprocessJournal(config.stats_path.joinpath(journal_file_name))
+    ########### load data ##########
+    tasks: List[Tuple[Path, Path, Path, os.stat_result]] = []
+    for cstl in config.cstl:
+        for sim_name in config.sim_name:
+            for alg in config.algorithms:
+                print("\t", f"Preprocess stats for {alg}/{cstl}/{sim_name}...")
+                for run in range(0, config.runs):
+                    # load and convert stats
+                    (stats_fp, _, _) = load_simulation_paths(
+                        config, cstl, sim_name, alg, run
+                    )
+                    (path, file_path) = get_stats_dump_file(
+                        config, cstl, sim_name, alg, run
+                    )
+                    source = os.stat(stats_fp)
+                    # readers also reject dumps with other column types
+                    if (
+                        not force
+                        and journal.is_up_to_date(file_path, source)
+                        and is_stats_dump_fresh(stats_fp, file_path)
+                    ):
+                        print("\t", "\t", "Up to date:", file_path)
+                        continue
+                    tasks.append((stats_fp, path, file_path, source))
+
+    def convert(task: Tuple[Path, Path, Path, os.stat_result]):
+        (stats_fp, path, file_path, source) = task
+        print("\t", "\t", "Read + Convert:", stats_fp)
+        print("\t", "\t", "-> Dump to:", file_path)
+        # Arrow reads and writes outside of the GIL
+        convert_stats(stats_fp, path, file_path)
+        journal.record(file_path, source)
+
+    map_threads(config, convert, tasks)
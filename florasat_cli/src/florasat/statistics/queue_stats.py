@@ -0,0 +1,147 @@
+from dataclasses import dataclass
+from typing import Dict
+
+import numpy as np
+from florasat_statistics import load_sat_stats_arrays
+
+# upper bound of (satellite, edge) lookups done at once
+max_lookups = 4_000_000
+
+
+@dataclass
+class QueueSteps:
+    """
+    Queue sizes of all satellites of a run as piecewise-constant step functions.
+    State i of a satellite holds qs[i] from start[i] until the next state starts,
+    the last state holds forever. Every satellite starts with an empty queue at
+    `origin`. Windows are integrated exactly over the steps, no dense time grid
+    is built.
+    """
+
+    # per satellite, ascending
+    sat_id: np.ndarray
+    # states of satellite s are [offsets[s]:offsets[s + 1]], sorted by start
+    offsets: np.ndarray
+    start: np.ndarray
+    qs: np.ndarray
+    origin: float
+
+    @staticmethod
+    def from_arrays(sats: Dict[str, np.ndarray]) -> "QueueSteps":
+        """Builds the steps from the arrays of load_sat_stats_arrays."""
+        offsets = sats["offsets"].astype(np.int64)
+        counts = np.diff(offsets)
+        sat_index = np.repeat(np.arange(len(counts)), counts)
+        # satellites are stored in arbitrary order, sort them by id
+        sat_id = sats["sat_id"][np.minimum(offsets[:-1], len(sats["sat_id"]) - 1)]
+        sat_order = np.argsort(sat_id, kind="stable")
+        sat_rank = np.argsort(sat_order)
+        start = sats["start"].astype(np.float64)
+        order = np.lexsort((start, sat_rank[sat_index]))
+        start = start[order]
+        qs = sats["qs"][order].astype(np.float64)
+        sat_id = sat_id[sat_order]
+        counts = counts[sat_order]
+
+        origin = min(0.0, start.min()) if len(start) > 0 else 0.0
+        first = np.cumsum(counts) - counts
+        start = np.insert(start, first, origin)
+        qs = np.insert(qs, first, 0.0)
+        offsets = np.concatenate(([0], np.cumsum(counts + 1)))
+        return QueueSteps(sat_id, offsets, start, qs, origin)
+
+    @property
+    def end(self) -> float:
+        """Start of the latest state of all satellites, origin without satellites."""
+        return float(self.start.max()) if len(self.start) > 0 else self.origin
+
+    def mean(self, edges: np.ndarray, sats: slice = slice(None)) -> np.ndarray:
+        """Time-weighted mean queue size, satellites x windows."""
+        return self.__time_average(self.qs, edges, sats)
+
+    def occupancy(self, edges: np.ndarray, sats: slice = slice(None)) -> np.ndarray:
+        """Fraction of the time a queue is not empty, satellites x windows."""
+        busy = (self.qs > 0).astype(np.float64)
+        return self.__time_average(busy, edges, sats)
+
+    def max(self, edges: np.ndarray, sats: slice = slice(None)) -> np.ndarray:
+        """Maximum queue size, satellites x windows."""
+        # not clipped, a window ending at origin must not see the state there
+        edges = np.asarray(edges, dtype=np.float64)
+        # sentinel, a window may end behind the last state
+        values = np.append(self.qs, 0.0)
+        blocks = list(self.__blocks(sats, len(edges)))
+        result = np.empty((sum(len(block) for block in blocks), len(edges) - 1))
+        row = 0
+        for block in blocks:
+            # state active at the window start up to the last one starting inside
+            first = self.__lookup(block, edges[:-1], "right")
+            last = self.__lookup(block, edges[1:], "left")
+            bounds = np.column_stack([first.ravel(), last.ravel() + 1]).ravel()
+            maxima = np.maximum.reduceat(values, bounds)[::2]
+            result[row : row + len(block)] = maxima.reshape(first.shape)
+            row += len(block)
+        return result
+
+    def __time_average(
+        self, values: np.ndarray, edges: np.ndarray, sats: slice
+    ) -> np.ndarray:
+        widths = np.diff(np.asarray(edges, dtype=np.float64))
+        # windows of zero length have no average
+        with np.errstate(invalid="ignore"):
+            return self.__window_integral(values, edges, sats) / widths
+
+    def __window_integral(
+        self, values: np.ndarray, edges: np.ndarray, sats: slice
+    ) -> np.ndarray:
+        edges = self.__clip(edges)
+        if len(self.sat_id) == 0:
+            return np.empty((0, len(edges) - 1))
+        # integral of every satellite from origin up to each state start
+        durations = np.diff(self.start, append=self.start[-1])
+        durations[self.offsets[1:] - 1] = 0.0
+        areas = values * durations
+        cumulative = np.cumsum(areas) - areas
+        cumulative -= np.repeat(cumulative[self.offsets[:-1]], np.diff(self.offsets))
+
+        blocks = list(self.__blocks(sats, len(edges)))
+        result = np.empty((sum(len(block) for block in blocks), len(edges) - 1))
+        row = 0
+        for block in blocks:
+            states = self.__lookup(block, edges, "right")
+            integral = cumulative[states] + values[states] * (
+                edges - self.start[states]
+            )
+            result[row : row + len(block)] = np.diff(integral, axis=1)
+            row += len(block)
+        return result
+
+    def __lookup(self, sats: np.ndarray, times: np.ndarray, side: str) -> np.ndarray:
+        """
+        Index of the last state starting at or before (side="right"), or strictly
+        before (side="left"), each time, satellites x times. All satellites are
+        searched at once by shifting each one into its own time span.
+        """
+        span = max(self.end, times.max()) - self.origin + 1.0
+        counts = np.diff(self.offsets)
+        shifted = (self.start - self.origin) + np.repeat(
+            np.arange(len(counts)) * span, counts
+        )
+        queries = (times - self.origin)[np.newaxis, :] + (sats * span)[:, np.newaxis]
+        states = np.searchsorted(shifted, queries, side=side) - 1
+        # never leave the satellite, its first state starts at origin
+        return np.maximum(states, self.offsets[:-1][sats][:, np.newaxis])
+
+    def __clip(self, edges: np.ndarray) -> np.ndarray:
+        return np.maximum(np.asarray(edges, dtype=np.float64), self.origin)
+
+    def __blocks(self, sats: slice, edge_count: int):
+        """Satellite indices of sats in blocks of bounded lookup count."""
+        indices = np.arange(len(self.sat_id))[sats]
+        size = max(1, max_lookups // max(1, edge_count))
+        for begin in range(0, len(indices), size):
+            yield indices[begin : begin + size]
+
+
+def load_queue_steps(file_path: str) -> QueueSteps:
+    return QueueSteps.from_arrays(load_sat_stats_arrays(file_path))
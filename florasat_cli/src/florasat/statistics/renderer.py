@@ -0,0 +1,117 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+import multiprocessing
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from florasat.statistics.figure_data import Summary, write_figure_data
+
+
+class Renderer:
+    """
+    Exports figures through the Kaleido scope of this process, which keeps its
+    render subprocess alive between figures. The first PDF rendered by a fresh
+    subprocess contains a "Loading MathJax" box, so a throwaway figure is
+    rendered once in memory before the first real export.
+    """
+
+    def __init__(self):
+        self.warmed_up = False
+        # the Kaleido subprocess handles one figure at a time
+        self.lock = threading.Lock()
+
+    def write(self, fig: go.Figure, file_path: Union[str, Path]):
+        with self.lock:
+            if not self.warmed_up:
+                self.__warm_up()
+            fig.write_image(file_path, engine="kaleido")
+
+    def __warm_up(self):
+        fig = go.Figure(go.Scatter(x=[0, 1, 2, 3, 4], y=[0, 1, 4, 9, 16]))
+        pio.to_image(fig, format="pdf", engine="kaleido")
+        self.warmed_up = True
+
+
+class ExportQueue:
+    """
+    Writes figures on background worker processes, each with its own renderer,
+    while the caller goes on computing the next figure. Output paths are kept as
+    given, failures are collected and returned by finish.
+    """
+
+    def __init__(self, jobs: int):
+        # figures are submitted from scheduler threads, forking a threaded
+        # process can deadlock the child
+        self.executor = ProcessPoolExecutor(
+            max_workers=jobs, mp_context=multiprocessing.get_context("forkserver")
+        )
+        self.pending: List[Tuple[str, Future]] = []
+
+    def submit(self, fig: go.Figure, file_path: Union[str, Path]):
+        future = self.executor.submit(export_figure, fig, file_path)
+        self.pending.append((str(file_path), future))
+
+    def finish(self) -> List[Tuple[str, BaseException]]:
+        """Waits for all exports, returns the files that failed with their error."""
+        failures = []
+        for file_path, future in self.pending:
+            error = future.exception()
+            if error is not None:
+                failures.append((file_path, error))
+        self.pending = []
+        self.executor.shutdown()
+        return failures
+
+
+# one renderer per process
+renderer = Renderer()
+# figures are exported synchronously unless a queue is started
+export_queue: Optional[ExportQueue] = None
+# render figures, write their data next to them
+plot = True
+export_data = False
+
+
+def configure_export(plot_figures: bool, export_figure_data: bool):
+    global plot, export_data
+    plot = plot_figures
+    export_data = export_figure_data
+
+
+def start_export_queue(jobs: int):
+    global export_queue
+    export_queue = ExportQueue(jobs)
+
+
+def finish_export_queue() -> List[Tuple[str, BaseException]]:
+    global export_queue
+    if export_queue is None:
+        return []
+    failures = export_queue.finish()
+    export_queue = None
+    return failures
+
+
+def export_figure(fig: go.Figure, file_path: Union[str, Path]):
+    # runs on the export workers
+    renderer.write(fig, file_path)
+
+
+def write_figure(
+    fig: go.Figure, file_path: Union[str, Path], summary: Optional[Summary] = None
+):
+    """
+    Writes fig to file_path, the format follows the file extension. Hands the
+    figure to the export queue if one is running. With data export enabled the
+    figure spec, its series and the summary statistics are written next to it.
+    """
+    if export_data:
+        write_figure_data(fig, file_path, summary)
+    if not plot:
+        return
+    if export_queue is not None:
+        export_queue.submit(fig, file_path)
+    else:
+        renderer.write(fig, file_path)
@@ -0,0 +1,68 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class Task:
+    name: str
+    run: Callable[[], None]
+    # names of tasks that have to succeed before this one starts
+    dependencies: List[str] = field(default_factory=list)
+    # printed if the task fails as input files are missing
+    hint: Optional[str] = None
+
+
+class Scheduler:
+    """
+    Runs a DAG of tasks on a pool of threads, every task as soon as all of its
+    dependencies succeeded. Tasks depending on a failed task are skipped, all
+    others still run. Ready tasks start in the order they were added, so with a
+    single job everything runs in order, one task after another.
+    """
+
+    def __init__(self, jobs: int):
+        self.jobs = jobs
+        self.tasks: Dict[str, Task] = {}
+
+    def add(self, task: Task):
+        for dependency in task.dependencies:
+            if dependency not in self.tasks:
+                raise ValueError(f"Task {task.name} depends on unknown {dependency}")
+        self.tasks[task.name] = task
+
+    def run(self) -> Tuple[List[Tuple[str, BaseException]], List[str]]:
+        """Runs all tasks, returns the failed tasks with their error and the skipped ones."""
+        failures: List[Tuple[str, BaseException]] = []
+        skipped: List[str] = []
+        succeeded = set()
+        remaining = list(self.tasks.values())
+        running: Dict[Future, Task] = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            while len(remaining) > 0 or len(running) > 0:
+                for task in list(remaining):
+                    unfinished = [d for d in task.dependencies if d not in succeeded]
+                    if any(d in skipped or d in dict(failures) for d in unfinished):
+                        print("X Skip", task.name, "as a dependency failed")
+                        skipped.append(task.name)
+                        remaining.remove(task)
+                    elif len(unfinished) == 0:
+                        running[executor.submit(self.__start, task)] = task
+                        remaining.remove(task)
+                if len(running) == 0:
+                    continue
+                (done, _) = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        succeeded.add(task.name)
+                    else:
+                        failures.append((task.name, error))
+        return (failures, skipped)
+
+    @staticmethod
+    def __start(task: Task):
+        print("")
+        print(f"Run {task.name}...")
+        task.run()
@@ -0,0 +1,201 @@
+import json
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Union
+import numpy as np
+
+default_relative_accuracy = 0.01
+
+
+class DDSketch:
+    """
+    Mergeable quantile sketch of non-negative values (DDSketch). Value x > 0 is
+    counted in bin ceil(log_gamma(x)), every quantile is returned within the
+    relative accuracy of the true one. Count, sum, min and max are exact. Sketches
+    with the same accuracy merge by adding their bins.
+    """
+
+    def __init__(self, relative_accuracy: float = default_relative_accuracy):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("Relative accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        # counts[i] holds the values of bin offset + i
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        if values.min() < 0:
+            raise ValueError("DDSketch only holds non-negative values")
+        positive = values[values > 0]
+        bins = np.ceil(np.log(positive) / math.log(self.gamma)).astype(np.int64)
+        if len(bins) > 0:
+            offset = int(bins.min())
+            self.__add_bins(offset, np.bincount(bins - offset))
+        self.zero_count += len(values) - len(positive)
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: "DDSketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same accuracy can be merged")
+        if len(other.counts) > 0:
+            self.__add_bins(other.offset, other.counts)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count > 0 else math.nan
+
+    def bins(self):
+        """Representative value and count of every non-empty bin, ascending."""
+        indices = np.nonzero(self.counts)[0]
+        values = self.__bin_value(indices + self.offset)
+        counts = self.counts[indices]
+        if self.zero_count > 0:
+            values = np.concatenate(([0.0], values))
+            counts = np.concatenate(([self.zero_count], counts))
+        return (values, counts)
+
+    def quantile(self, q: Union[float, np.ndarray]):
+        """Lower quantile(s), clipped to the exact min and max."""
+        if self.count == 0:
+            return np.full(np.shape(q), math.nan) if np.ndim(q) > 0 else math.nan
+        values, counts = self.bins()
+        ranks = np.asarray(q, dtype=np.float64) * (self.count - 1)
+        positions = np.searchsorted(np.cumsum(counts), ranks, side="right")
+        result = np.clip(
+            values[np.minimum(positions, len(values) - 1)], self.min, self.max
+        )
+        return result if np.ndim(q) > 0 else float(result)
+
+    def tail_mean(self, threshold: float) -> float:
+        """Approximate mean of the values above threshold."""
+        values, counts = self.bins()
+        above = values > threshold
+        if not above.any():
+            return math.nan
+        return float((values[above] * counts[above]).sum() / counts[above].sum())
+
+    def summary(self) -> Dict[str, float]:
+        """The statistics of utils.tail_summary, read from the sketch."""
+        percent_1 = self.quantile(0.99)
+        percent_01 = self.quantile(0.999)
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p99": percent_1,
+            "p99_mean": self.tail_mean(percent_1),
+            "p99.9": percent_01,
+            "p99.9_mean": self.tail_mean(percent_01),
+        }
+
+    def box_summary(self) -> Dict[str, float]:
+        """The statistics of utils.box_summary, read from the sketch."""
+        q1, median, q3 = self.quantile(np.array([0.25, 0.5, 0.75]))
+        iqr = q3 - q1
+        return {
+            "q1": q1,
+            "median": median,
+            "q3": q3,
+            "lowerfence": max(self.min, q1 - 1.5 * iqr),
+            "upperfence": min(self.max, q3 + 1.5 * iqr),
+            "mean": self.mean,
+        }
+
+    def save(self, file_path: Path):
+        data = {
+            "relative_accuracy": self.relative_accuracy,
+            "offset": self.offset,
+            "counts": self.counts.tolist(),
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count > 0 else None,
+            "max": self.max if self.count > 0 else None,
+        }
+        tmp_path = file_path.with_name(
+            f"{file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, file_path)
+
+    @staticmethod
+    def load(file_path: Path) -> "DDSketch":
+        with open(file_path) as f:
+            data = json.load(f)
+        sketch = DDSketch(data["relative_accuracy"])
+        sketch.offset = data["offset"]
+        sketch.counts = np.array(data["counts"], dtype=np.int64)
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if sketch.count > 0:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
+
+    def __add_bins(self, offset: int, counts: np.ndarray):
+        if len(self.counts) == 0:
+            self.offset, self.counts = (offset, counts.astype(np.int64))
+            return
+        begin = min(self.offset, offset)
+        end = max(self.offset + len(self.counts), offset + len(counts))
+        merged = np.zeros(end - begin, dtype=np.int64)
+        merged[
+            self.offset - begin : self.offset - begin + len(self.counts)
+        ] += self.counts
+        merged[offset - begin : offset - begin + len(counts)] += counts
+        self.offset, self.counts = (begin, merged)
+
+    def __bin_value(self, bins: np.ndarray) -> np.ndarray:
+        # midpoint of (gamma^(i-1), gamma^i] within the relative accuracy
+        return 2 * np.power(self.gamma, bins.astype(np.float64)) / (self.gamma + 1)
+
+
+def load_sketch(
+    file_path: Path,
+    sources: List[Path],
+    relative_accuracy: float,
+    compute: Callable[[], np.ndarray],
+) -> DDSketch:
+    """
+    Sketch stored at file_path, rebuilt from compute() if it is missing, has a
+    different accuracy or is older than one of its sources.
+    """
+    if file_path.exists():
+        mtime = file_path.stat().st_mtime
+        if all(mtime >= source.stat().st_mtime for source in sources):
+            sketch = DDSketch.load(file_path)
+            if sketch.relative_accuracy == relative_accuracy:
+                return sketch
+    sketch = DDSketch(relative_accuracy)
+    sketch.add(compute())
+    os.makedirs(file_path.parent, exist_ok=True)
+    sketch.save(file_path)
+    return sketch
+
+
+def merge_sketches(sketches: List[DDSketch]) -> DDSketch:
+    merged = DDSketch(sketches[0].relative_accuracy)
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
@@ -0,0 +1,188 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from florasat.statistics.utils import (
+    DELIVERED_NORMAL,
+    E2E_DELAY_COLUMNS,
+    Config,
+    e2e_delay_ms,
+    filter_mask,
+    iter_stats_chunks,
+)
+
+# Columns computed from every chunk before grouping, with the stats columns they need
+DERIVED_COLUMNS: Dict[str, Tuple[List[str], Callable[[pd.DataFrame], pd.Series]]] = {
+    # `recorded` in whole seconds like in the in-memory analyses
+    "second": (["recorded"], lambda df: df["recorded"].round()),
+    "e2e-delay": (E2E_DELAY_COLUMNS, e2e_delay_ms),
+}
+
+
+@dataclass(frozen=True)
+class Aggregation:
+    """
+    Number of packets, or the sum of `value`, per group of `by` among the packets
+    matching the filters `where`, summed over all runs. `by` holds stats columns
+    or derived columns. Analyses declare the aggregations they need, aggregate()
+    computes any number of them in one pass over the stats.
+    """
+
+    by: Tuple[str, ...]
+    where: Tuple[Tuple[str, str, Any], ...] = ()
+    value: Optional[str] = None
+
+    @property
+    def columns(self) -> List[str]:
+        """Stats columns read for this aggregation."""
+        columns: List[str] = []
+        for column in self.by:
+            if column in DERIVED_COLUMNS:
+                columns += DERIVED_COLUMNS[column][0]
+            else:
+                columns.append(column)
+        columns += [column for (column, _, _) in self.where]
+        if self.value is not None:
+            columns.append(self.value)
+        return columns
+
+
+DELIVERED_PER_SECOND = Aggregation(("second",), (("dropReason", "==", 99),))
+DROPPED_PER_SECOND = Aggregation(("second",), (("dropReason", "!=", 99),))
+DELIVERED_PER_SECOND_AND_SIZE = Aggregation(("second", "size"), tuple(DELIVERED_NORMAL))
+HOPS_HISTOGRAM = Aggregation(("hops",), tuple(DELIVERED_NORMAL))
+E2E_DELAY_HISTOGRAM = Aggregation(("e2e-delay",), tuple(DELIVERED_NORMAL))
+PACKETS_PER_DROP_REASON = Aggregation(("dropReason",))
+
+# Aggregations of the analyses in streaming mode
+DELIVERED_DROPPED = [DELIVERED_PER_SECOND, DROPPED_PER_SECOND]
+DELIVERED_SIZES = [DELIVERED_PER_SECOND_AND_SIZE]
+HOPS = [HOPS_HISTOGRAM]
+E2E_DELAY = [E2E_DELAY_HISTOGRAM]
+DROP_REASONS = [PACKETS_PER_DROP_REASON]
+
+
+def aggregate(
+    config: Config,
+    cstl: str,
+    sim_name: str,
+    alg: str,
+    aggregations: Iterable[Aggregation],
+) -> Dict[Aggregation, pd.Series]:
+    """
+    Computes all aggregations in a single pass over the stats of every run. Runs
+    are folded chunk by chunk into running results, so memory only grows with
+    the number of groups. Derived columns and filter masks are computed once per
+    chunk, however many aggregations use them.
+    """
+    aggregations = list(dict.fromkeys(aggregations))
+    columns = list(dict.fromkeys(col for a in aggregations for col in a.columns))
+    derived = [col for col in DERIVED_COLUMNS if any(col in a.by for a in aggregations)]
+
+    results: Dict[Aggregation, Optional[pd.Series]] = {a: None for a in aggregations}
+    for chunk in iter_stats_chunks(config, cstl, sim_name, alg, columns):
+        for column in derived:
+            chunk[column] = DERIVED_COLUMNS[column][1](chunk)
+        masks: Dict[Tuple[Tuple[str, str, Any], ...], pd.Series] = {}
+        for aggregation in aggregations:
+            rows = chunk
+            if len(aggregation.where) > 0:
+                if aggregation.where not in masks:
+                    masks[aggregation.where] = filter_mask(chunk, aggregation.where)
+                rows = chunk.loc[masks[aggregation.where]]
+            grouped = rows.groupby(list(aggregation.by))
+            if aggregation.value is None:
+                part = grouped.size()
+            else:
+                part = grouped[aggregation.value].sum()
+            old = results[aggregation]
+            results[aggregation] = part if old is None else old.add(part, fill_value=0)
+
+    finished: Dict[Aggregation, pd.Series] = {}
+    for aggregation, series in results.items():
+        if series is None:
+            series = pd.DataFrame(columns=list(aggregation.by))
+            series = series.groupby(list(aggregation.by)).size()
+        series = series.sort_index()
+        if aggregation.value is None:
+            series = series.astype("int64")
+        finished[aggregation] = series
+    return finished
+
+
+def scan_stats(
+    config: Config, cstl: str, sim_name: str, aggregations: List[Aggregation]
+):
+    """
+    Fused scan of a scenario: computes the aggregations of all requested
+    analyses for every algorithm and keeps them in config.aggregates.
+    """
+    assert config.aggregates is not None
+    for alg in config.algorithms:
+        print("\t", f"Scan {alg}/{cstl}/{sim_name}...")
+        config.aggregates[(alg, cstl, sim_name)] = aggregate(
+            config, cstl, sim_name, alg, aggregations
+        )
+
+
+def aggregated(
+    config: Config,
+    cstl: str,
+    sim_name: str,
+    alg: str,
+    aggregations: List[Aggregation],
+) -> Dict[Aggregation, pd.Series]:
+    """Aggregations from the fused scan if it computed them, otherwise computed here."""
+    if config.aggregates is not None:
+        results = config.aggregates.get((alg, cstl, sim_name), {})
+        if all(a in results for a in aggregations):
+            return {a: results[a] for a in aggregations}
+    return aggregate(config, cstl, sim_name, alg, aggregations)
+
+
+def delivered_dropped_counts(
+    config: Config, cstl: str, sim_name: str, alg: str
+) -> pd.DataFrame:
+    """
+    Delivered (`rcvd`) and dropped packets per `recorded` second of all runs,
+    laid out like the grouped frames of the in-memory analyses.
+    """
+    counts = aggregated(config, cstl, sim_name, alg, DELIVERED_DROPPED)
+    delivered = (
+        counts[DELIVERED_PER_SECOND].rename_axis("recorded").to_frame(name="rcvd")
+    )
+    dropped = (
+        counts[DROPPED_PER_SECOND].rename_axis("recorded").to_frame(name="dropped")
+    )
+    return delivered.join(dropped).reset_index()
+
+
+def delivered_size_counts(
+    config: Config, cstl: str, sim_name: str, alg: str
+) -> pd.DataFrame:
+    """Delivered normal packets per `recorded` second and packet size of all runs."""
+    counts = aggregated(config, cstl, sim_name, alg, DELIVERED_SIZES)
+    return (
+        counts[DELIVERED_PER_SECOND_AND_SIZE]
+        .rename_axis(["recorded", "size"])
+        .to_frame(name="count")
+        .reset_index()
+    )
+
+
+def hop_counts(config: Config, cstl: str, sim_name: str, alg: str) -> pd.Series:
+    """Delivered normal packets per hop count of all runs."""
+    return aggregated(config, cstl, sim_name, alg, HOPS)[HOPS_HISTOGRAM]
+
+
+def e2e_delay_counts(config: Config, cstl: str, sim_name: str, alg: str) -> pd.Series:
+    """Delivered normal packets per E2E delay in whole milliseconds of all runs."""
+    return aggregated(config, cstl, sim_name, alg, E2E_DELAY)[E2E_DELAY_HISTOGRAM]
+
+
+def drop_reason_counts(config: Config, cstl: str, sim_name: str, alg: str) -> pd.Series:
+    """Packets per `dropReason` of all runs, delivered ones have reason 99."""
+    return aggregated(config, cstl, sim_name, alg, DROP_REASONS)[
+        PACKETS_PER_DROP_REASON
+    ]
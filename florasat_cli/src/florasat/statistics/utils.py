@@ -1,18 +1,65 @@
+from concurrent.futures import Executor
 from dataclasses import dataclass
+import operator
 import os
+import threading
 from pathlib import Path
-import time
+import numpy as np
 import pandas as pd
-from typing import Any, List, Tuple
+import pyarrow as pa
+from pyarrow import csv
+import pyarrow.parquet as pq
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
 from plotly.subplots import make_subplots
 import plotly.graph_objects as go
-import plotly.express as px
 import tomli
+from florasat_statistics import load_route_metrics, load_routes_columnar
+
+from florasat.statistics.dataset_cache import DatasetCache, PendingLoad
+from florasat.statistics.manifest import Manifest
+from florasat.statistics.renderer import write_figure
+from florasat.statistics.sketch import DDSketch, load_sketch
 
 config_name = ".florasat_config.toml"
 
 pd.options.plotting.backend = "plotly"
 
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Column types of the FLoRaSat *.stats.csv format, columns not listed are inferred
+STATS_SCHEMA = {
+    "pid": pa.int32(),
+    "type": pa.dictionary(pa.int32(), pa.string()),
+    "srcGs": pa.int32(),
+    "dstGs": pa.int32(),
+    "size": pa.int32(),
+    "hops": pa.int16(),
+    "dropReason": pa.int8(),
+    "queueDelay": pa.float64(),
+    "procDelay": pa.float64(),
+    "transDelay": pa.float64(),
+    "propDelay": pa.float64(),
+    "created": pa.float64(),
+    "recorded": pa.float64(),
+}
+
+# Row predicates on the stats, in the (column, op, value) form of pyarrow.parquet.
+# All predicates have to hold for a row to be loaded.
+StatsFilter = List[Tuple[str, str, Any]]
+
+# Normal packets that reached their destination
+DELIVERED_NORMAL: StatsFilter = [("dropReason", "==", 99), ("type", "==", "N")]
+
+FILTER_OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
 
 @dataclass
 class Config:
@@ -23,7 +70,26 @@ class Config:
     florasat_results_path: Path
     routes_path: Path
     satellites_path: Path
+    stats_path: Path
     results_path: Path
+    cache: Optional[DatasetCache] = None
+    # worker processes for decoding runs, None loads runs sequentially
+    pool: Optional[Executor] = None
+    # threads converting runs, shared by all preprocessing tasks, None converts
+    # runs one after another
+    threads: Optional[Executor] = None
+    # fold time series from bounded chunks instead of whole runs
+    streaming: bool = False
+    # rows per chunk in streaming mode
+    chunk_size: int = 1_000_000
+    # points per time-series trace or CDF, 0 plots all of them
+    max_points: int = 2000
+    # relative accuracy of quantile sketches, None works on all packets
+    sketch: Optional[float] = None
+    # index of florasat_results_path, created on first use if not set
+    manifest: Optional[Manifest] = None
+    # results of the fused stats scan per (alg, cstl, sim_name), see streaming.py
+    aggregates: Optional[Dict[Tuple[str, str, str], Dict[Any, pd.Series]]] = None
 
 
 def load_simulation_paths(
@@ -33,7 +99,9 @@ def load_simulation_paths(
         config.florasat_results_path.joinpath(alg).joinpath(cstl).joinpath(sim_name)
     )
     print("\t", "Load run", run, "from", path_directory)
-    content_dir: List[str] = os.listdir(path_directory)
+    if config.manifest is None:
+        config.manifest = Manifest(config.florasat_results_path)
+    run_files = config.manifest.directory(alg, cstl, sim_name).runs.get(run, {})
 
     stats_file_name = f"{run}.stats.csv"
     stats_file_path = path_directory.joinpath(stats_file_name)
@@ -45,9 +113,9 @@ def load_simulation_paths(
     sats_file_path = path_directory.joinpath(sats_file_name)
 
     if (
-        not stats_file_name in content_dir
-        or not routes_file_name in content_dir
-        or not sats_file_name in content_dir
+        not "stats" in run_files
+        or not "routes" in run_files
+        or not "sats" in run_files
     ):
         raise FileNotFoundError(
             f"Could not find {stats_file_name} or {routes_file_name} or {sats_file_name} in {path_directory}"
@@ -64,6 +132,15 @@ def get_route_dump_file(
     return (path, file_path)
 
 
+def get_route_metrics_file(
+    config: Config, cstl: str, sim_name: str, alg: str, run: int
+) -> Tuple[Path, Path]:
+    """Per-packet route metrics of a run, written next to the routes dump."""
+    path = config.routes_path.joinpath(alg).joinpath(cstl).joinpath(sim_name)
+    file_path = path.joinpath(f"{run}.routes.metrics.msgpack")
+    return (path, file_path)
+
+
 def get_sats_dump_file(
     config: Config, cstl: str, sim_name: str, alg: str, run: int
 ) -> Tuple[Path, Path]:
@@ -72,31 +149,598 @@ def get_sats_dump_file(
     return (path, file_path)
 
 
-def load_stats(
-    config: Config, cstl: str, sim_name: str, alg: str
-) -> List[pd.DataFrame]:
-    dfs: List[pd.DataFrame] = []
+def get_occupancy_file(
+    config: Config, cstl: str, sim_name: str, alg: str, run: int
+) -> Tuple[Path, Path, Path]:
+    """Occupancy matrix of a run and its JSON metadata, next to the sats dump."""
+    path = config.satellites_path.joinpath(alg).joinpath(cstl).joinpath(sim_name)
+    file_path = path.joinpath(f"{run}.occupancy.npy")
+    meta_path = path.joinpath(f"{run}.occupancy.json")
+    return (path, file_path, meta_path)
+
+
+def get_stats_dump_file(
+    config: Config, cstl: str, sim_name: str, alg: str, run: int
+) -> Tuple[Path, Path]:
+    path = config.stats_path.joinpath(alg).joinpath(cstl).joinpath(sim_name)
+    file_path = path.joinpath(f"{run}.stats.parquet")
+    return (path, file_path)
+
+
+def get_sketch_file(
+    config: Config, cstl: str, sim_name: str, alg: str, run: int, metric: str
+) -> Tuple[Path, Path]:
+    """Quantile sketch of a metric of a run, next to the stats dump."""
+    path = config.stats_path.joinpath(alg).joinpath(cstl).joinpath(sim_name)
+    file_path = path.joinpath(f"{run}.{metric}.sketch.json")
+    return (path, file_path)
+
+
+def is_stats_dump_fresh(stats_fp: Path, dump_fp: Path) -> bool:
+    if not dump_fp.exists():
+        return False
+    if dump_fp.stat().st_mtime < stats_fp.stat().st_mtime:
+        return False
+    # dumps written with other column types are converted again
+    schema = pq.read_schema(dump_fp)
+    return all(
+        schema.field(column).type == column_type
+        for column, column_type in STATS_SCHEMA.items()
+        if column in schema.names
+    )
+
+
+def read_stats_csv(stats_fp: Path, columns: Optional[List[str]] = None) -> pa.Table:
+    # multithreaded Arrow reader, typed by STATS_SCHEMA
+    return csv.read_csv(
+        stats_fp,
+        read_options=csv.ReadOptions(use_threads=True),
+        convert_options=csv.ConvertOptions(
+            column_types=STATS_SCHEMA, include_columns=columns
+        ),
+    )
+
+
+def convert_stats(
+    stats_fp: Path,
+    path: Path,
+    dump_fp: Path,
+    columns: Optional[List[str]] = None,
+    filters: Optional[StatsFilter] = None,
+) -> pd.DataFrame:
+    table = read_stats_csv(stats_fp)
+    os.makedirs(path, exist_ok=True)
+    # write + rename, readers never see a partially written dump
+    tmp_fp = dump_fp.with_name(
+        f"{dump_fp.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    pq.write_table(table, tmp_fp, compression="zstd")
+    os.replace(tmp_fp, dump_fp)
+    if filters is not None:
+        table = table.filter(pq.filters_to_expression(filters))
+    if columns is not None:
+        table = table.select(columns)
+    return table.to_pandas()
+
+
+def read_stats_file(
+    stats_fp: Path,
+    path: Path,
+    dump_fp: Path,
+    columns: Optional[List[str]] = None,
+    filters: Optional[StatsFilter] = None,
+) -> pd.DataFrame:
+    """
+    Reads the stats of one run. Filters are applied on the Arrow table while
+    scanning, rejected rows never become pandas objects.
+    """
+    if is_stats_dump_fresh(stats_fp, dump_fp):
+        print("\t\t", "Read:", dump_fp)
+        return pd.read_parquet(
+            dump_fp, engine="pyarrow", columns=columns, filters=filters
+        )
+    print("\t\t", "Read + Convert:", stats_fp)
+    return convert_stats(stats_fp, path, dump_fp, columns, filters)
+
+
+def filter_mask(df: pd.DataFrame, filters: StatsFilter) -> pd.Series:
+    """Rows of an already loaded frame that match all filters."""
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters:
+        mask &= FILTER_OPS[op](df[column], value)
+    return mask
+
+
+def iter_stats_chunks(
+    config: Config,
+    cstl: str,
+    sim_name: str,
+    alg: str,
+    columns: Optional[List[str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yields the stats of all runs in chunks of at most config.chunk_size rows, so
+    that no run has to be held in memory at once.
+    """
     for run in range(0, config.runs):
+        if config.cache is not None:
+            df = config.cache.get((alg, cstl, sim_name, run, ()), columns)
+            if df is not None:
+                print("\t\t", "Read from cache:", f"{alg}/{cstl}/{sim_name}/{run}")
+                yield df
+                continue
+
         (stats_fp, _, _) = load_simulation_paths(config, cstl, sim_name, alg, run)
-        print("\t\t", "Read:", stats_fp)
-        dfs.append(pd.read_csv(stats_fp))
-    return dfs
+        (_, dump_fp) = get_stats_dump_file(config, cstl, sim_name, alg, run)
+        if is_stats_dump_fresh(stats_fp, dump_fp):
+            print("\t\t", "Stream:", dump_fp)
+            batches = pq.ParquetFile(dump_fp).iter_batches(
+                batch_size=config.chunk_size, columns=columns
+            )
+        else:
+            print("\t\t", "Stream:", stats_fp)
+            # CSV blocks are sized in bytes, assume ~128 bytes per row
+            batches = csv.open_csv(
+                stats_fp,
+                read_options=csv.ReadOptions(block_size=config.chunk_size * 128),
+                convert_options=csv.ConvertOptions(
+                    column_types=STATS_SCHEMA, include_columns=columns
+                ),
+            )
+        for batch in batches:
+            yield batch.to_pandas()
+
+
+def submit_stats_read(
+    config: Config,
+    cstl: str,
+    sim_name: str,
+    alg: str,
+    run: int,
+    columns: Optional[List[str]] = None,
+    filters: Optional[StatsFilter] = None,
+) -> Callable[[], pd.DataFrame]:
+    (stats_fp, _, _) = load_simulation_paths(config, cstl, sim_name, alg, run)
+    (path, dump_fp) = get_stats_dump_file(config, cstl, sim_name, alg, run)
+    if config.pool is not None:
+        future = config.pool.submit(
+            read_stats_file, stats_fp, path, dump_fp, columns, filters
+        )
+        return future.result
+    return lambda: read_stats_file(stats_fp, path, dump_fp, columns, filters)
+
+
+def request_stats_run(
+    config: Config,
+    cstl: str,
+    sim_name: str,
+    alg: str,
+    run: int,
+    columns: Optional[List[str]] = None,
+    filters: Optional[StatsFilter] = None,
+) -> Callable[[], pd.DataFrame]:
+    """
+    Starts loading a run and returns a function that waits for its frame.
+    With a worker pool the run is decoded in the background. Filters are always
+    pushed down into the reader. The cache keeps the frames of every filter
+    apart, so analyses with the same filters share their loads.
+    """
+    cache = config.cache
+    if cache is None:
+        return submit_stats_read(config, cstl, sim_name, alg, run, columns, filters)
+
+    key = (alg, cstl, sim_name, run, tuple(filters or []))
+
+    with cache.lock:
+        df = cache.get(key, columns)
+        if df is not None:
+            print("\t\t", "Read from cache:", f"{alg}/{cstl}/{sim_name}/{run}")
+            return lambda: df
+
+        # share a load of the same run in flight, e.g. of a parallel analysis
+        load = cache.pending_load(key, columns)
+        if load is None:
+            missing = cache.missing_columns(key, columns)
+            read = submit_stats_read(
+                config, cstl, sim_name, alg, run, missing, filters
+            )
 
+            def read_into_cache() -> pd.DataFrame:
+                try:
+                    df = read()
+                    cache.put(key, df, complete=missing is None)
+                    return df
+                finally:
+                    cache.finish_load(key, load)
+
+            load = PendingLoad(columns, read_into_cache)
+            cache.start_load(key, load)
+        else:
+            print("\t\t", "Wait for load of:", f"{alg}/{cstl}/{sim_name}/{run}")
+
+    def result() -> pd.DataFrame:
+        df = load.wait()
+        cached = cache.get(key, columns)
+        if cached is not None:
+            return cached
+        # does not fit into the cache, the loaded frame is shared by all waiters
+        if columns is None and load.columns is None:
+            return df.copy()
+        if columns is not None and all(col in df.columns for col in columns):
+            return df[columns]
+        return submit_stats_read(config, cstl, sim_name, alg, run, columns, filters)()
+
+    return result
+
+
+def load_stats_run(
+    config: Config,
+    cstl: str,
+    sim_name: str,
+    alg: str,
+    run: int,
+    columns: Optional[List[str]] = None,
+    filters: Optional[StatsFilter] = None,
+) -> pd.DataFrame:
+    return request_stats_run(config, cstl, sim_name, alg, run, columns, filters)()
 
-def fix_loading_mathjax():
-    # garbage graph
-    fig = px.scatter(x=[0, 1, 2, 3, 4], y=[0, 1, 4, 9, 16])
-    fig.write_image("/tmp/fix-mathjax.pdf", engine="kaleido")
-    time.sleep(1)
+
+def load_stats(
+    config: Config,
+    cstl: str,
+    sim_name: str,
+    alg: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[StatsFilter] = None,
+) -> List[pd.DataFrame]:
+    requests = [
+        request_stats_run(config, cstl, sim_name, alg, run, columns, filters)
+        for run in range(0, config.runs)
+    ]
+    return [request() for request in requests]
+
+
+def iter_stats(
+    config: Config,
+    groups: List[Tuple[str, str, str]],
+    columns: Optional[List[str]] = None,
+    filters: Optional[StatsFilter] = None,
+) -> Iterator[List[pd.DataFrame]]:
+    """
+    Yields the runs of every (cstl, sim_name, alg) group in order. While a group
+    is processed by the caller, the runs of the next group are already loading.
+    """
+
+    def request_group(cstl: str, sim_name: str, alg: str):
+        return [
+            request_stats_run(config, cstl, sim_name, alg, run, columns, filters)
+            for run in range(0, config.runs)
+        ]
+
+    if len(groups) == 0:
+        return
+    requests = request_group(*groups[0])
+    for id in range(len(groups)):
+        current = requests
+        if id + 1 < len(groups):
+            requests = request_group(*groups[id + 1])
+        yield [request() for request in current]
+
+
+E2E_DELAY_COLUMNS = ["queueDelay", "procDelay", "transDelay", "propDelay"]
+
+
+def e2e_delay_ms(df: pd.DataFrame) -> pd.Series:
+    """End-to-end delay in whole milliseconds from the delay columns."""
+    return (
+        (df["queueDelay"] + df["procDelay"] + df["transDelay"] + df["propDelay"])
+        * 1000
+    ).round()
+
+
+def load_metric_sketch(
+    config: Config, cstl: str, sim_name: str, alg: str, run: int, metric: str
+) -> DDSketch:
+    """
+    Quantile sketch of "e2e-delay" or "distance" of the delivered normal packets
+    of a run. Built on first use and stored next to the stats dump.
+    """
+    (stats_fp, _, _) = load_simulation_paths(config, cstl, sim_name, alg, run)
+    (_, file_path) = get_sketch_file(config, cstl, sim_name, alg, run, metric)
+    sources = [stats_fp]
+    if metric == "e2e-delay":
+
+        def compute() -> np.ndarray:
+            df = load_stats_run(
+                config, cstl, sim_name, alg, run, E2E_DELAY_COLUMNS, DELIVERED_NORMAL
+            )
+            return e2e_delay_ms(df).to_numpy()
+
+    elif metric == "distance":
+        (_, metrics_fp) = get_route_metrics_file(config, cstl, sim_name, alg, run)
+        sources.append(metrics_fp)
+
+        def compute() -> np.ndarray:
+            df = load_stats_run(
+                config, cstl, sim_name, alg, run, ["pid"], DELIVERED_NORMAL
+            )
+            df = join_on_pid(df, read_route_metrics(str(metrics_fp)), ["length"])
+            return df["length"].to_numpy()
+
+    else:
+        raise ValueError(f"No sketch for metric {metric}")
+    assert config.sketch is not None
+    return load_sketch(file_path, sources, config.sketch, compute)
+
+
+def read_route_metrics(file_path: str) -> pd.DataFrame:
+    """Route metrics of a run, one row per packet sorted by pid."""
+    return pd.DataFrame(load_route_metrics(file_path))
+
+
+def read_route_lengths(file_path: str) -> pd.DataFrame:
+    """
+    Pid and length of every route of a routes dump, sorted by pid. Decoded by
+    the columnar loader, no Route objects are built.
+    """
+    routes = load_routes_columnar(file_path)
+    order = np.argsort(routes["pid"], kind="stable")
+    return pd.DataFrame(
+        {"pid": routes["pid"][order], "length": routes["length"][order]}
+    )
+
+
+def join_on_pid(
+    df: pd.DataFrame, route_metrics: pd.DataFrame, columns: List[str]
+) -> pd.DataFrame:
+    """
+    Adds the given route metric columns to the stats rows with the same pid. The
+    metrics are sorted by pid, every row is looked up by binary search. Rows
+    without a route are dropped and reported.
+    """
+    route_pids = route_metrics["pid"].to_numpy()
+    pids = df["pid"].to_numpy()
+    index = np.searchsorted(route_pids, pids)
+    index = np.minimum(index, max(0, len(route_pids) - 1))
+    matched = route_pids[index] == pids if len(route_pids) > 0 else pids != pids
+    missing = len(pids) - int(matched.sum())
+    if missing > 0:
+        print(
+            "\t",
+            "\t",
+            f"{missing} of {len(pids)} packets have no route, pids:",
+            pids[~matched][:10],
+        )
+    df = df.loc[matched].copy()
+    for column in columns:
+        df[column] = route_metrics[column].to_numpy()[index[matched]]
+    return df
+
+
+def map_runs(config: Config, fn: Callable[[T], R], args: List[T]) -> List[R]:
+    """Applies fn to every run argument, in worker processes if available."""
+    if config.pool is None:
+        return list(map(fn, args))
+    return list(config.pool.map(fn, args))
+
+
+def map_threads(config: Config, fn: Callable[[T], R], args: List[T]) -> List[R]:
+    """
+    Applies fn to every argument on the shared config.threads. Only worthwhile if
+    fn spends its time outside of the GIL, like the native conversions.
+    """
+    if config.threads is None:
+        return list(map(fn, args))
+    return list(config.threads.map(fn, args))
 
 
 def apply_default(fig, size=22, width=600, height=400, mt=10):
-    fix_loading_mathjax()
     fig.update_layout(
         margin=dict(l=10, r=10, b=10, t=mt), font=dict(size=size), width=width, height=height
     )
 
 
+# name, x, CDF at x and summary statistics of one plotted distribution
+CdfSeries = Tuple[str, np.ndarray, np.ndarray, Dict[str, float]]
+
+
+def sorted_quantile(values: np.ndarray, q: float) -> float:
+    """Quantile of sorted values with linear interpolation, like pandas."""
+    if len(values) == 0:
+        return np.nan
+    position = q * (len(values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def tail_summary(values: np.ndarray) -> Dict[str, float]:
+    """
+    Mean, 99th and 99.9th percentile and the mean of the values above each of
+    them, from one cumulative sum over the sorted values.
+    """
+    cumulative = np.cumsum(values, dtype=np.float64)
+    total = cumulative[-1] if len(values) > 0 else np.nan
+
+    def tail_mean(threshold: float) -> float:
+        begin = int(np.searchsorted(values, threshold, side="right"))
+        if begin == len(values):
+            return np.nan
+        before = cumulative[begin - 1] if begin > 0 else 0.0
+        return (total - before) / (len(values) - begin)
+
+    percent_1 = sorted_quantile(values, 0.99)
+    percent_01 = sorted_quantile(values, 0.999)
+    return {
+        "count": len(values),
+        "mean": total / len(values) if len(values) > 0 else np.nan,
+        "p99": percent_1,
+        "p99_mean": tail_mean(percent_1),
+        "p99.9": percent_01,
+        "p99.9_mean": tail_mean(percent_01),
+    }
+
+
+def histogram_summary(x: np.ndarray, counts: np.ndarray) -> Dict[str, float]:
+    """tail_summary of the sorted distinct values x, occurring counts times each."""
+    ranks = np.cumsum(counts)
+    sums = np.cumsum(x * counts, dtype=np.float64)
+    count = int(ranks[-1]) if len(x) > 0 else 0
+    if count == 0:
+        return {
+            "count": 0,
+            "mean": np.nan,
+            "p99": np.nan,
+            "p99_mean": np.nan,
+            "p99.9": np.nan,
+            "p99.9_mean": np.nan,
+        }
+
+    def value_at(rank: int) -> float:
+        # value of the rank-th smallest packet
+        return x[np.searchsorted(ranks, rank, side="right")]
+
+    def quantile(q: float) -> float:
+        position = q * (count - 1)
+        lower = int(position)
+        (low, high) = (value_at(lower), value_at(min(lower + 1, count - 1)))
+        return low + (high - low) * (position - lower)
+
+    def tail_mean(threshold: float) -> float:
+        begin = int(np.searchsorted(x, threshold, side="right"))
+        if begin == len(x):
+            return np.nan
+        (before, rank) = (sums[begin - 1], ranks[begin - 1]) if begin > 0 else (0.0, 0)
+        return (sums[-1] - before) / (count - rank)
+
+    percent_1 = quantile(0.99)
+    percent_01 = quantile(0.999)
+    return {
+        "count": count,
+        "mean": sums[-1] / count,
+        "p99": percent_1,
+        "p99_mean": tail_mean(percent_1),
+        "p99.9": percent_01,
+        "p99.9_mean": tail_mean(percent_01),
+    }
+
+
+def box_summary(values) -> Dict[str, float]:
+    """
+    Box statistics like the paramstudy figures computed them: linear quartiles
+    and whiskers at 1.5 IQR of the box, clipped to the minimum and maximum.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = np.sort(values[~np.isnan(values)])
+    if len(values) == 0:
+        return {
+            "q1": np.nan,
+            "median": np.nan,
+            "q3": np.nan,
+            "lowerfence": np.nan,
+            "upperfence": np.nan,
+            "mean": np.nan,
+        }
+    (q1, median, q3) = (sorted_quantile(values, q) for q in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    return {
+        "q1": q1,
+        "median": median,
+        "q3": q3,
+        "lowerfence": max(values[0], q1 - 1.5 * iqr),
+        "upperfence": min(values[-1], q3 + 1.5 * iqr),
+        "mean": values.mean(),
+    }
+
+
+def summary_box(x: List[Any], summaries: List[Dict[str, float]], **kwargs) -> go.Box:
+    """Box trace of precomputed statistics, one box per x."""
+    return go.Box(
+        x=x,
+        **{
+            stat: [summary[stat] for summary in summaries]
+            for stat in ["q1", "median", "q3", "lowerfence", "upperfence", "mean"]
+        },
+        boxpoints=False,
+        **kwargs,
+    )
+
+
+def raw_box_summary(values) -> Dict[str, float]:
+    """
+    Box statistics as plotly computes them from raw data with the default
+    "linear" quartile method: quantiles interpolated at rank q * n - 0.5 and
+    whiskers at the most extreme values within 1.5 IQR of the box.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = np.sort(values[~np.isnan(values)])
+    if len(values) == 0:
+        return box_summary(values)
+    (q1, median, q3) = (_plotly_quantile(values, q) for q in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    lower = np.searchsorted(values, q1 - 1.5 * iqr, side="left")
+    upper = np.searchsorted(values, q3 + 1.5 * iqr, side="right") - 1
+    return {
+        "q1": q1,
+        "median": median,
+        "q3": q3,
+        "lowerfence": min(q1, values[min(lower, len(values) - 1)]),
+        "upperfence": max(q3, values[max(upper, 0)]),
+        "mean": values.mean(),
+    }
+
+
+def _plotly_quantile(values: np.ndarray, q: float) -> float:
+    position = q * len(values) - 0.5
+    if position < 0:
+        return values[0]
+    if position > len(values) - 1:
+        return values[-1]
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def grouped_box(df: pd.DataFrame, x: str, y: str, **kwargs) -> go.Box:
+    """
+    Box trace of column y per value of column x. Only the box statistics of every
+    group are put into the figure, not the raw values, the statistics are the
+    ones plotly would compute from them.
+    """
+    names = []
+    summaries = []
+    for name, values in df.groupby(x, sort=False)[y]:
+        names.append(name)
+        summaries.append(raw_box_summary(values.to_numpy()))
+    return summary_box(names, summaries, **kwargs)
+
+
+def cdf_points(values: np.ndarray, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Empirical CDF of sorted values at their distinct values. Beyond max_points
+    distinct values only the points at evenly spaced probabilities and at evenly
+    spaced values are kept, so steep and flat parts both stay resolved.
+    """
+    (x, counts) = np.unique(values, return_counts=True)
+    return histogram_cdf_points(x, counts, max_points)
+
+
+def histogram_cdf_points(
+    x: np.ndarray, counts: np.ndarray, max_points: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """cdf_points of the sorted distinct values x, occurring counts times each."""
+    cdf = np.cumsum(counts) / counts.sum()
+    if max_points == 0 or len(x) <= max_points:
+        return (x, cdf)
+    half = max_points // 2
+    by_probability = np.searchsorted(cdf, np.linspace(0, 1, half), side="left")
+    by_value = np.searchsorted(x, np.linspace(x[0], x[-1], half), side="right") - 1
+    keep = np.unique(
+        np.concatenate([by_probability, by_value, [0, len(x) - 1]]).clip(0, len(x) - 1)
+    )
+    return (x[keep], cdf[keep])
+
+
 def plot_cdf(
     dfs: List[Tuple[str, pd.DataFrame]],
     col: str,
@@ -106,50 +750,81 @@ def plot_cdf(
     mean_unit: str = "",
     percent_1_low: bool = False,
     percent_01_low: bool = False,
+    max_points: int = 2000,
+):
+    series: List[CdfSeries] = []
+    for name, df in dfs:
+        # one sort per series, CDF and all statistics are read from it
+        values = np.sort(df[col].dropna().to_numpy())
+        (x, cdf) = cdf_points(values, max_points)
+        series.append((name, x, cdf, tail_summary(values)))
+    plot_cdf_series(series, file_path, x_name, mean, mean_unit)
+
+
+def plot_cdf_sketches(
+    sketches: List[Tuple[str, DDSketch]],
+    file_path: Path,
+    x_name: str = "",
+    mean: bool = False,
+    mean_unit: str = "",
+):
+    """plot_cdf of merged quantile sketches, one point per sketch bin."""
+    series: List[CdfSeries] = []
+    for name, sketch in sketches:
+        (x, counts) = sketch.bins()
+        series.append((name, x, np.cumsum(counts) / sketch.count, sketch.summary()))
+    plot_cdf_series(series, file_path, x_name, mean, mean_unit)
+
+
+def plot_cdf_histograms(
+    histograms: List[Tuple[str, pd.Series]],
+    file_path: Path,
+    x_name: str = "",
+    mean: bool = False,
+    mean_unit: str = "",
+    max_points: int = 2000,
+):
+    """plot_cdf of packet counts per value, as computed in streaming mode."""
+    series: List[CdfSeries] = []
+    for name, histogram in histograms:
+        x = histogram.index.to_numpy(dtype=np.float64)
+        counts = histogram.to_numpy()
+        (points, cdf) = histogram_cdf_points(x, counts, max_points)
+        series.append((name, points, cdf, histogram_summary(x, counts)))
+    plot_cdf_series(series, file_path, x_name, mean, mean_unit)
+
+
+def plot_cdf_series(
+    series: List[CdfSeries],
+    file_path: Path,
+    x_name: str = "",
+    mean: bool = False,
+    mean_unit: str = "",
 ):
     print("\t", "Create plot...")
     fig = make_subplots()
     colors = ["#636efa", "#ef553b", "#2ca02c", "#00cc96"]
     positions = ["top right", "top left", "bottom left", "bottom right"]
-    for name, df in dfs:
+    summary = {}
+    for name, x, cdf, series_summary in series:
         color = colors.pop(0)
         position = positions.pop(0)
 
-        mean_val = df[col].mean().round(2)  # type: ignore
-
-        percent_1 = df[col].quantile(q=0.99)
-        if df[df[col] > percent_1][col] is not None:
-            percent_1_mean = df[df[col] > percent_1][col].mean()
-        percent_01 = df[col].quantile(q=0.999, interpolation="linear")
-        if df[df[col] > percent_01][col] is not None:
-            percent_01_mean = df[df[col] > percent_01][col].mean()
+        summary[name] = series_summary
+        mean_val = np.round(summary[name]["mean"], 2)
 
         print(name)
         print("mean:", mean_val)  # type: ignore
 
-        print("1%:", percent_1, "mean:", percent_1_mean)  # type: ignore
-        
-        print("0.1%:", percent_01, "mean:", percent_01_mean)  # type: ignore
-
-        stats_df = (
-            df.groupby(col)[col]
-            .agg("count")
-            .pipe(pd.DataFrame)
-            .rename(columns={col: "frequency"})
-        )
-        # if not continuous:
-        #     stats_df = stats_df.reindex(list(range(0, max_val + 1)), fill_value=0)
-
-        stats_df["pdf"] = stats_df["frequency"] / sum(stats_df["frequency"])
+        print("1%:", summary[name]["p99"], "mean:", summary[name]["p99_mean"])
 
-        stats_df["cdf"] = stats_df["pdf"].cumsum()
-        stats_df = stats_df.reset_index()
+        print("0.1%:", summary[name]["p99.9"], "mean:", summary[name]["p99.9_mean"])
 
         fig.add_trace(
             go.Scatter(
                 name=name,
-                x=stats_df[col].values,
-                y=stats_df["cdf"],
+                x=x,
+                y=cdf,
                 mode="markers+lines",
                 line=dict(color=color),
             )
@@ -173,7 +848,7 @@ def plot_cdf(
     fig.update_xaxes(title_text=x_name, tickmode="auto", nticks=10)
     fig.update_yaxes(title_text="CDF", dtick=0.1)
     print("\t", "Write plot to file...")
-    fig.write_image(file_path, engine="kaleido")
+    write_figure(fig, file_path, summary)
 
 
 def load_config(path_raw: str | None = None) -> dict[str, Any]:
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from florasat.statistics.sketch import DDSketch
+from florasat.statistics.utils import box_summary, grouped_box, raw_box_summary
+
+
+def samples():
+    rng = np.random.default_rng(7)
+    return [
+        np.array([5.0]),
+        np.array([1.0, 2.0]),
+        np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 100], dtype=np.float64),
+        rng.normal(50, 10, 101),
+        rng.exponential(20, 1000).round(),
+        np.concatenate([rng.normal(0, 1, 500), [40.0, -35.0]]),
+    ]
+
+
+def baseline_box(values: np.ndarray):
+    """The statistics the paramstudy figures computed before."""
+    q1 = np.percentile(values, 25)
+    q3 = np.percentile(values, 75)
+    iqr = q3 - q1
+    return {
+        "q1": q1,
+        "median": np.percentile(values, 50),
+        "q3": q3,
+        "lowerfence": max(values.min(), float(q1 - 1.5 * iqr)),
+        "upperfence": min(values.max(), float(q3 + 1.5 * iqr)),
+        "mean": values.mean(),
+    }
+
+
+def plotly_box(values: np.ndarray):
+    """Box statistics of plotly.js (traces/box/calc.js, quartilemethod "linear")."""
+    v = np.sort(values)
+    n = len(v)
+
+    def interp(q):
+        position = q * n - 0.5
+        if position < 0:
+            return v[0]
+        if position > n - 1:
+            return v[-1]
+        frac = position % 1
+        return frac * v[int(np.ceil(position))] + (1 - frac) * v[int(np.floor(position))]
+
+    q1, med, q3 = interp(0.25), interp(0.5), interp(0.75)
+    # Lib.findBin(x, v, true) + 1 is the first value >= x, Lib.findBin(x, v) the last <= x
+    first = next(i for i in range(n + 1) if i == n or v[i] >= 2.5 * q1 - 1.5 * q3)
+    last = max(i for i in range(-1, n) if i == -1 or v[i] <= 2.5 * q3 - 1.5 * q1)
+    return {
+        "q1": q1,
+        "median": med,
+        "q3": q3,
+        "lowerfence": min(q1, v[min(first, n - 1)]),
+        "upperfence": max(q3, v[max(last, 0)]),
+        "mean": v.mean(),
+    }
+
+
+@pytest.mark.parametrize("values", samples())
+def test_box_summary_matches_baseline_paramstudy_boxes(values):
+    summary = box_summary(values)
+    for stat, expected in baseline_box(values).items():
+        assert summary[stat] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("values", samples())
+def test_raw_box_summary_matches_plotly(values):
+    summary = raw_box_summary(values)
+    for stat, expected in plotly_box(values).items():
+        assert summary[stat] == pytest.approx(expected)
+
+
+def test_grouped_box_ships_plotly_statistics():
+    values = samples()[3:5]
+    df = pd.DataFrame(
+        {
+            "x": ["a"] * len(values[0]) + ["b"] * len(values[1]),
+            "y": np.concatenate(values),
+        }
+    )
+    box = grouped_box(df, "x", "y")
+    assert list(box.x) == ["a", "b"]
+    assert box.boxpoints is False
+    for id, group in enumerate(values):
+        for stat, expected in plotly_box(group).items():
+            assert getattr(box, stat)[id] == pytest.approx(expected)
+
+
+def test_sketch_box_summary_uses_baseline_fences():
+    values = np.random.default_rng(3).exponential(20, 10_000)
+    sketch = DDSketch(0.01)
+    sketch.add(values)
+    summary = sketch.box_summary()
+    expected = baseline_box(values)
+    for stat in ["q1", "median", "q3", "lowerfence", "upperfence"]:
+        assert summary[stat] == pytest.approx(expected[stat], rel=0.03)
+    assert summary["mean"] == pytest.approx(expected["mean"])
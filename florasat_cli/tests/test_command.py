@@ -0,0 +1,76 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from florasat import cli
+from florasat.statistics import command, renderer
+from florasat.statistics.manifest import manifest_file_name
+from florasat.statistics.scheduler import Scheduler
+
+
+def test_failed_run_releases_workers_and_saves_manifest(monkeypatch, tmp_path):
+    path = tmp_path.joinpath("results", "alg", "cstl-4", "sim")
+    path.mkdir(parents=True)
+    pd.DataFrame({"pid": np.arange(5), "dropReason": [99] * 5}).to_csv(
+        path.joinpath("0.stats.csv"), index=False
+    )
+    for kind in ["routes", "sats"]:
+        path.joinpath(f"0.{kind}.csv").touch()
+    config_fp = tmp_path.joinpath("config.toml")
+    paths = {
+        "florasat_results_path": tmp_path.joinpath("results"),
+        "routes_path": tmp_path.joinpath("routes"),
+        "satellites_path": tmp_path.joinpath("sats"),
+        "stats_path": tmp_path.joinpath("stats"),
+        "results_path": tmp_path.joinpath("out"),
+    }
+    config_fp.write_text("".join(f'{name} = "{path}"\n' for name, path in paths.items()))
+
+    shut_down = []
+
+    class Pool(ProcessPoolExecutor):
+        def shutdown(self, *args, **kwargs):
+            shut_down.append(type(self).__name__)
+            super().shutdown(*args, **kwargs)
+
+    class Threads(ThreadPoolExecutor):
+        def shutdown(self, *args, **kwargs):
+            shut_down.append(type(self).__name__)
+            super().shutdown(*args, **kwargs)
+
+    def run(scheduler):
+        # the first task indexes the results, then the run breaks off
+        next(iter(scheduler.tasks.values())).run()
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(command, "ProcessPoolExecutor", Pool)
+    monkeypatch.setattr(command, "ThreadPoolExecutor", Threads)
+    monkeypatch.setattr(Scheduler, "run", run)
+    args = cli.generate_parser().parse_args(
+        [
+            "statistics",
+            "--config",
+            str(config_fp),
+            "--cstl",
+            "cstl-4",
+            "--name",
+            "sim",
+            "--algs",
+            "alg",
+            "--runs",
+            "1",
+            "--jobs",
+            "2",
+            "--render-jobs",
+            "1",
+            "--preprocess-stats",
+        ]
+    )
+    with pytest.raises(KeyboardInterrupt):
+        cli.run_command(args)
+
+    assert sorted(shut_down) == ["Pool", "Threads"]
+    assert renderer.export_queue is None
+    assert paths["stats_path"].joinpath(manifest_file_name).exists()
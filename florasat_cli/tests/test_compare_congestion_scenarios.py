@@ -0,0 +1,41 @@
+import os
+
+from florasat.statistics.compare_congestion_scenarios import (
+    get_queue_sizes_cache,
+    is_cache_fresh,
+)
+from florasat.statistics.utils import Config
+
+
+def test_queue_sizes_cache_follows_its_sources(tmp_path):
+    config = Config(
+        algorithms=["alg"],
+        cstl=["cstl-4"],
+        sim_name=["sim"],
+        runs=2,
+        florasat_results_path=tmp_path.joinpath("results"),
+        routes_path=tmp_path.joinpath("routes"),
+        satellites_path=tmp_path.joinpath("sats"),
+        stats_path=tmp_path.joinpath("stats"),
+        results_path=tmp_path.joinpath("out"),
+    )
+    cache_fp = get_queue_sizes_cache(config, "cstl-4", "sim", "alg")
+    assert cache_fp.is_relative_to(config.results_path)
+    other_runs = get_queue_sizes_cache(
+        Config(**{**config.__dict__, "runs": 3}), "cstl-4", "sim", "alg"
+    )
+    assert other_runs != cache_fp
+
+    sources = [tmp_path.joinpath(f"{run}.sats.msgpack") for run in range(2)]
+    for source in sources:
+        source.touch()
+    assert not is_cache_fresh(cache_fp, sources)
+
+    cache_fp.parent.mkdir(parents=True)
+    cache_fp.touch()
+    assert is_cache_fresh(cache_fp, sources)
+
+    # a run was simulated again
+    mtime = cache_fp.stat().st_mtime
+    os.utime(sources[1], (mtime + 10, mtime + 10))
+    assert not is_cache_fresh(cache_fp, sources)
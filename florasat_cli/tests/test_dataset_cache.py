@@ -0,0 +1,168 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from florasat.statistics import utils
+from florasat.statistics.dataset_cache import DatasetCache, PendingLoad
+
+
+def key(run: int, filters=()):
+    return ("alg", "cstl", "sim", run, filters)
+
+
+def frame(columns, rows: int = 100) -> pd.DataFrame:
+    return pd.DataFrame({col: np.arange(rows, dtype=np.int64) for col in columns})
+
+
+def size_of(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+def test_evicts_least_recently_used():
+    entry_size = size_of(frame(["a"]))
+    cache = DatasetCache(3 * entry_size)
+    for run in range(3):
+        cache.put(key(run), frame(["a"]))
+    # run 0 becomes the most recently used
+    assert cache.get(key(0), ["a"]) is not None
+
+    cache.put(key(3), frame(["a"]))
+    assert list(cache.entries) == [key(2), key(0), key(3)]
+    assert cache.get(key(1), ["a"]) is None
+
+
+def test_byte_accounting():
+    cache = DatasetCache(10_000)
+    frames = [frame(["a"]), frame(["a", "b"]), frame(["a"], rows=300)]
+    for run, df in enumerate(frames):
+        cache.put(key(run), df)
+    assert cache.size == sum(size_of(df) for df in frames)
+    assert cache.size == sum(entry.size for entry in cache.entries.values())
+
+    # replacing an entry counts its new size only
+    cache.put(key(0), frame(["a", "b", "c"]), complete=True)
+    assert cache.size == sum(entry.size for entry in cache.entries.values())
+    assert cache.size <= cache.max_bytes
+
+    # evictions give their bytes back
+    cache.put(key(3), frame(["a"], rows=900))
+    assert cache.size == sum(entry.size for entry in cache.entries.values())
+    assert cache.size <= cache.max_bytes
+
+
+def test_frames_larger_than_the_cache_are_not_kept():
+    cache = DatasetCache(size_of(frame(["a"])))
+    cache.put(key(0), frame(["a", "b"]))
+    assert len(cache.entries) == 0
+    assert cache.size == 0
+
+
+def test_merges_column_subsets():
+    cache = DatasetCache(10_000)
+    cache.put(key(0), frame(["a", "b"]))
+    assert cache.missing_columns(key(0), ["b", "c"]) == ["c"]
+    assert cache.get(key(0), ["b", "c"]) is None
+
+    cache.put(key(0), frame(["c"]))
+    assert list(cache.get(key(0), ["c", "a"]).columns) == ["c", "a"]
+    assert cache.missing_columns(key(0), ["a", "b", "c"]) == []
+    # not every column of the run was loaded
+    assert cache.get(key(0)) is None
+    assert cache.size == size_of(frame(["a", "b", "c"]))
+
+    # frames of other filters are kept apart
+    assert cache.get(key(0, (("type", "==", "N"),)), ["a"]) is None
+
+
+def test_merge_too_big_keeps_cached_columns():
+    cache = DatasetCache(size_of(frame(["a", "b"])))
+    cache.put(key(0), frame(["a", "b"]))
+    cache.put(key(0), frame(["c"]))
+    assert list(cache.get(key(0), ["a", "b"]).columns) == ["a", "b"]
+    assert cache.size == size_of(frame(["a", "b"]))
+
+
+def test_hands_out_copies():
+    cache = DatasetCache(10_000)
+    cache.put(key(0), frame(["a"]), complete=True)
+    df = cache.get(key(0))
+    df["a"] = -1
+    assert (cache.get(key(0))["a"] >= 0).all()
+
+
+def test_pending_load_is_read_once():
+    calls = []
+    started = threading.Event()
+
+    def read():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return frame(["a"])
+
+    load = PendingLoad(["a"], read)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        frames = list(executor.map(lambda _: load.wait(), range(8)))
+    assert len(calls) == 1
+    assert all(df is frames[0] for df in frames)
+    assert load.covers(["a"]) and not load.covers(["a", "b"]) and not load.covers(None)
+
+
+def test_pending_load_error_reaches_every_caller():
+    def read():
+        raise OSError("unreadable")
+
+    load = PendingLoad(None, read)
+    for _ in range(2):
+        with pytest.raises(OSError):
+            load.wait()
+
+
+def test_callers_share_one_load(monkeypatch, tmp_path):
+    reads = []
+    release = threading.Event()
+
+    def submit_stats_read(config, cstl, sim_name, alg, run, columns, filters):
+        reads.append(columns)
+
+        def read():
+            release.wait(5)
+            return frame(columns)
+
+        return read
+
+    monkeypatch.setattr(utils, "submit_stats_read", submit_stats_read)
+    config = utils.Config(
+        algorithms=["alg"],
+        cstl=["cstl"],
+        sim_name=["sim"],
+        runs=1,
+        florasat_results_path=tmp_path,
+        routes_path=tmp_path,
+        satellites_path=tmp_path,
+        stats_path=tmp_path,
+        results_path=tmp_path,
+        cache=DatasetCache(10_000),
+    )
+
+    def request(columns):
+        return utils.request_stats_run(config, "cstl", "sim", "alg", 0, columns)
+
+    # requested before the first load finished
+    waits = [request(["a", "b"]) for _ in range(3)] + [request(["b"])]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(wait) for wait in waits]
+        release.set()
+        frames = [future.result() for future in futures]
+    assert reads == [["a", "b"]]
+    assert [list(df.columns) for df in frames] == [["a", "b"]] * 3 + [["b"]]
+    assert config.cache.pending == {}
+
+    # later requests are served from the cache, new columns are loaded alone
+    assert list(request(["a"])().columns) == ["a"]
+    assert list(request(["a", "c"])().columns) == ["a", "c"]
+    assert reads == [["a", "b"], ["c"]]
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from florasat.statistics.downsample import lttb
+
+
+def test_keeps_endpoints():
+    x = np.arange(1000)
+    y = np.sin(x / 50)
+    (xs, ys) = lttb(x, y, 50)
+    assert (xs[0], ys[0]) == (x[0], y[0])
+    assert (xs[-1], ys[-1]) == (x[-1], y[-1])
+
+
+def test_returns_max_points():
+    x = np.arange(1000)
+    y = np.random.default_rng(0).normal(size=1000)
+    for max_points in [3, 10, 100, 999]:
+        (xs, ys) = lttb(x, y, max_points)
+        assert len(xs) == max_points
+        assert len(ys) == max_points
+        # the kept points are a subsequence of the input
+        assert np.all(np.diff(xs) > 0)
+
+
+def test_short_input_unchanged():
+    x = np.arange(20)
+    y = x * 2.0
+    for max_points in [0, 20, 50]:
+        (xs, ys) = lttb(x, y, max_points)
+        np.testing.assert_array_equal(xs, x)
+        np.testing.assert_array_equal(ys, y)
+
+
+def test_keeps_peaks():
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[[137, 512, 871]] = [10.0, -7.0, 5.0]
+    (xs, ys) = lttb(x, y, 20)
+    assert {137, 512, 871} <= set(xs.tolist())
+    assert ys.max() == 10.0
+    assert ys.min() == -7.0
+
+
+def test_keeps_datetimes():
+    x = np.arange("2024-01-01", "2024-01-11", dtype="datetime64[h]")
+    y = np.arange(len(x), dtype=np.float64)
+    (xs, ys) = lttb(x, y, 10)
+    assert xs.dtype == x.dtype
+    assert xs[-1] == x[-1]
+
+
+def test_rejects_too_few_points():
+    with pytest.raises(ValueError):
+        lttb(np.arange(10), np.arange(10), 2)
@@ -0,0 +1,75 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from florasat.statistics.manifest import Manifest, manifest_file_name
+
+
+def make_run(path, run, size=10):
+    for kind in ["stats", "routes", "sats"]:
+        path.joinpath(f"{run}.{kind}.csv").write_text("x" * size)
+
+
+def test_index_survives_invocations(tmp_path):
+    path = tmp_path.joinpath("results", "alg", "cstl", "sim")
+    path.mkdir(parents=True)
+    make_run(path, 0)
+    make_run(path, 1)
+    path.joinpath("notes.txt").touch()
+    index_fp = tmp_path.joinpath("stats", manifest_file_name)
+
+    manifest = Manifest(tmp_path.joinpath("results"), index_fp)
+    entry = manifest.directory("alg", "cstl", "sim")
+    assert sorted(entry.runs) == [0, 1]
+    assert sorted(entry.runs[0]) == ["routes", "sats", "stats"]
+    manifest.save()
+
+    loaded = Manifest(tmp_path.joinpath("results"), index_fp)
+    assert loaded.directories == manifest.directories
+    assert loaded.directory("alg", "cstl", "sim") == entry
+    assert not loaded.dirty
+
+
+def test_file_rewritten_in_place_is_rescanned(tmp_path):
+    path = tmp_path.joinpath("results", "alg", "cstl", "sim")
+    path.mkdir(parents=True)
+    make_run(path, 0)
+    index_fp = tmp_path.joinpath(manifest_file_name)
+    manifest = Manifest(tmp_path.joinpath("results"), index_fp)
+    manifest.directory("alg", "cstl", "sim")
+    manifest.save()
+
+    # rewriting a file keeps the mtime of its directory
+    directory_stat = path.stat()
+    path.joinpath("0.stats.csv").write_text("y" * 25)
+    os.utime(path, ns=(directory_stat.st_atime_ns, directory_stat.st_mtime_ns))
+
+    loaded = Manifest(tmp_path.joinpath("results"), index_fp)
+    entry = loaded.directory("alg", "cstl", "sim")
+    assert entry.runs[0]["stats"][1] == 25
+    assert loaded.dirty
+
+
+def test_concurrent_use(tmp_path):
+    sims = [f"sim-{id}" for id in range(16)]
+    for sim in sims:
+        path = tmp_path.joinpath("results", "alg", "cstl", sim)
+        path.mkdir(parents=True)
+        make_run(path, 0)
+    manifest = Manifest(
+        tmp_path.joinpath("results"), tmp_path.joinpath(manifest_file_name)
+    )
+
+    def use(sim):
+        entry = manifest.directory("alg", "cstl", sim)
+        manifest.save()
+        return entry
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        entries = list(executor.map(use, sims * 4))
+    assert all(0 in entry.runs for entry in entries)
+    manifest.save()
+
+    loaded = Manifest(
+        tmp_path.joinpath("results"), tmp_path.joinpath(manifest_file_name)
+    )
+    assert sorted(sim for (_, _, sim) in loaded.directories) == sorted(sims)
@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from florasat.statistics.preprocess_journal import PreprocessJournal, journal_file_name
+from florasat.statistics.preprocess_stats import preprocess_stats
+from florasat.statistics.utils import (
+    Config,
+    get_stats_dump_file,
+    is_stats_dump_fresh,
+    load_simulation_paths,
+)
+
+
+def make_config(tmp_path) -> Config:
+    path = tmp_path.joinpath("results", "alg", "cstl-4", "sim")
+    path.mkdir(parents=True)
+    n = 20
+    pd.DataFrame(
+        {
+            "pid": np.arange(n),
+            "type": ["N"] * n,
+            "size": [100] * n,
+            "hops": [2] * n,
+            "dropReason": [99] * n,
+            "queueDelay": np.linspace(0, 0.01, n),
+            "procDelay": [0.001] * n,
+            "transDelay": [0.002] * n,
+            "propDelay": [0.02] * n,
+            "created": np.arange(n, dtype=float),
+            "recorded": np.arange(n, dtype=float) + 0.5,
+        }
+    ).to_csv(path.joinpath("0.stats.csv"), index=False)
+    for kind in ["routes", "sats"]:
+        path.joinpath(f"0.{kind}.csv").touch()
+    return Config(
+        algorithms=["alg"],
+        cstl=["cstl-4"],
+        sim_name=["sim"],
+        runs=1,
+        florasat_results_path=tmp_path.joinpath("results"),
+        routes_path=tmp_path.joinpath("routes"),
+        satellites_path=tmp_path.joinpath("sats"),
+        stats_path=tmp_path.joinpath("stats"),
+        results_path=tmp_path.joinpath("out"),
+    )
+
+
+def test_journaled_dump_with_old_schema_is_rebuilt(tmp_path):
+    config = make_config(tmp_path)
+    preprocess_stats(config)
+    (stats_fp, _, _) = load_simulation_paths(config, "cstl-4", "sim", "alg", 0)
+    (_, dump_fp) = get_stats_dump_file(config, "cstl-4", "sim", "alg", 0)
+    assert is_stats_dump_fresh(stats_fp, dump_fp)
+
+    # a dump written when the delays were narrowed, still in the journal
+    table = pq.read_table(dump_fp)
+    for column in ["queueDelay", "procDelay", "transDelay", "propDelay"]:
+        index = table.schema.get_field_index(column)
+        table = table.set_column(index, column, table[column].cast(pa.float32()))
+    pq.write_table(table, dump_fp)
+    journal = PreprocessJournal(config.stats_path.joinpath(journal_file_name))
+    assert journal.is_up_to_date(dump_fp, os.stat(stats_fp))
+    assert not is_stats_dump_fresh(stats_fp, dump_fp)
+
+    preprocess_stats(config)
+    assert is_stats_dump_fresh(stats_fp, dump_fp)
+    assert pq.read_schema(dump_fp).field("queueDelay").type == pa.float64()
+
+
+def test_fresh_dump_is_skipped(tmp_path):
+    config = make_config(tmp_path)
+    preprocess_stats(config)
+    (_, dump_fp) = get_stats_dump_file(config, "cstl-4", "sim", "alg", 0)
+    mtime_ns = dump_fp.stat().st_mtime_ns
+
+    preprocess_stats(config)
+    assert dump_fp.stat().st_mtime_ns == mtime_ns
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from florasat.statistics.queue_stats import QueueSteps
+
+# satellite id -> unsorted (start, queue size) states, satellites in dump order
+SATELLITES = {
+    7: [(3.0, 2), (0.5, 1), (8.0, 0), (4.25, 5)],
+    2: [(1.0, 3)],
+    5: [(0.0, 4), (6.0, 0), (2.0, 1), (9.5, 6)],
+    3: [(2.5, 0), (2.75, 8)],
+}
+
+WINDOWS = [
+    np.array([-2.0, -1.0, 0.0]),
+    np.array([0.0, 1.0, 2.5, 4.0, 7.0, 9.5]),
+    np.array([0.2, 3.1, 3.3, 12.0, 20.0]),
+    np.array([11.0, 15.0]),
+    np.array([0.0, 20.0]),
+]
+
+
+def steps_of(satellites) -> QueueSteps:
+    offsets = np.cumsum([0] + [len(states) for states in satellites.values()])
+    states = [state for states in satellites.values() for state in states]
+    return QueueSteps.from_arrays(
+        {
+            "offsets": offsets,
+            "sat_id": np.repeat(
+                list(satellites), [len(states) for states in satellites.values()]
+            ),
+            "start": np.array([start for (start, _) in states]),
+            "qs": np.array([qs for (_, qs) in states], dtype=np.int32),
+        }
+    )
+
+
+def pieces(states, origin, begin, end):
+    """(length, queue size) of the constant pieces of a satellite within [begin, end)."""
+    states = sorted(states)
+    times = [origin] + [start for (start, _) in states] + [np.inf]
+    values = [0] + [qs for (_, qs) in states]
+    # an empty queue before origin as well
+    result = [(max(0.0, min(end, origin) - begin), 0)]
+    for id, value in enumerate(values):
+        length = min(end, times[id + 1]) - max(begin, times[id])
+        if length > 0:
+            result.append((length, value))
+    return result
+
+
+def brute_force(satellites, origin, edges, statistic):
+    result = np.empty((len(satellites), len(edges) - 1))
+    for row, sat in enumerate(sorted(satellites)):
+        for col, (begin, end) in enumerate(zip(edges[:-1], edges[1:])):
+            parts = [p for p in pieces(satellites[sat], origin, begin, end) if p[0] > 0]
+            if statistic == "mean":
+                value = sum(length * qs for (length, qs) in parts) / (end - begin)
+            elif statistic == "occupancy":
+                value = sum(length for (length, qs) in parts if qs > 0) / (end - begin)
+            else:
+                value = max(qs for (_, qs) in parts)
+            result[row, col] = value
+    return result
+
+
+@pytest.mark.parametrize("edges", WINDOWS)
+@pytest.mark.parametrize("statistic", ["mean", "occupancy", "max"])
+def test_steps_match_brute_force(statistic, edges):
+    steps = steps_of(SATELLITES)
+    assert list(steps.sat_id) == [2, 3, 5, 7]
+    expected = brute_force(SATELLITES, steps.origin, edges, statistic)
+    np.testing.assert_allclose(getattr(steps, statistic)(edges), expected)
+    # a subset of satellites gives the same rows
+    np.testing.assert_allclose(
+        getattr(steps, statistic)(edges, slice(1, 3)), expected[1:3]
+    )
+
+
+def test_steps_before_zero():
+    satellites = {1: [(-2.0, 3), (1.0, 1)], 4: [(0.5, 2)]}
+    steps = steps_of(satellites)
+    assert steps.origin == -2.0
+    edges = np.array([-3.0, -1.0, 0.75, 4.0])
+    for statistic in ["mean", "occupancy", "max"]:
+        np.testing.assert_allclose(
+            getattr(steps, statistic)(edges),
+            brute_force(satellites, steps.origin, edges, statistic),
+        )
+
+
+def test_empty_dump():
+    steps = steps_of({})
+    assert steps.end == 0.0
+    for statistic in ["mean", "occupancy", "max"]:
+        assert getattr(steps, statistic)(np.array([0.0, steps.end])).shape == (0, 1)
+
+
+def test_zero_length_window():
+    steps = steps_of({1: [(0.0, 2)]})
+    assert steps.end == 0.0
+    assert np.isnan(steps.mean(np.array([0.0, steps.end]))).all()
+    assert np.isnan(steps.occupancy(np.array([0.0, steps.end]))).all()
+
+
+@pytest.mark.parametrize("satellites", [{}, {1: [(0.0, 2)], 3: [(0.0, 1)]}])
+def test_mean_queue_sizes_of_empty_runs(monkeypatch, satellites):
+    from florasat.statistics import paramstudy_datarate
+
+    monkeypatch.setattr(
+        paramstudy_datarate, "load_queue_steps", lambda _: steps_of(satellites)
+    )
+    df = paramstudy_datarate.load_mean_queue_sizes("sats.bin")
+    assert len(df) == 0
+    assert list(df.columns) == ["queueSize"]
+    assert df.index.name == "id"
+
+
+def test_mean_queue_sizes(monkeypatch):
+    from florasat.statistics import paramstudy_datarate
+
+    steps = steps_of(SATELLITES)
+    monkeypatch.setattr(paramstudy_datarate, "load_queue_steps", lambda _: steps)
+    df = paramstudy_datarate.load_mean_queue_sizes("sats.bin")
+    expected = brute_force(SATELLITES, steps.origin, [0.0, steps.end], "mean")
+    np.testing.assert_allclose(df.loc[[2, 3, 5, 7], "queueSize"], expected[:, 0])
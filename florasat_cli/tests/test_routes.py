@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+from florasat.statistics import utils
+
+
+def test_read_route_lengths_sorts_by_pid(monkeypatch):
+    columns = {
+        "pid": np.array([7, 2, 9, 4], dtype=np.uint32),
+        "length": np.array([700, 200, 900, 400], dtype=np.uint32),
+        "hop_count": np.array([3, 2, 4, 2], dtype=np.uint32),
+        "offsets": np.array([0, 3, 5, 9, 11], dtype=np.uint64),
+    }
+    monkeypatch.setattr(utils, "load_routes_columnar", lambda _: columns)
+
+    lengths = utils.read_route_lengths("0.routes.msgpack")
+    assert list(lengths["pid"]) == [2, 4, 7, 9]
+    assert list(lengths["length"]) == [200, 400, 700, 900]
+
+    # stats rows find the length of their route, rows without a route are dropped
+    df = pd.DataFrame({"pid": np.array([9, 2, 5, 7], dtype=np.int32)})
+    df = utils.join_on_pid(df, lengths, ["length"])
+    assert list(df["pid"]) == [9, 2, 7]
+    assert list(df["length"]) == [900, 200, 700]
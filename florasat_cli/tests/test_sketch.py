@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from florasat.statistics.sketch import DDSketch, merge_sketches
+
+QUANTILES = np.array([0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999, 1])
+
+
+def values(seed: int, size: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    # zeros, a wide range and a heavy tail
+    return np.concatenate(
+        [np.zeros(size // 50), rng.lognormal(3, 1.5, size), rng.pareto(1.5, size)]
+    )
+
+
+def exact_quantiles(values: np.ndarray) -> np.ndarray:
+    # the lower quantile the sketch approximates
+    return np.sort(values)[np.floor(QUANTILES * (len(values) - 1)).astype(int)]
+
+
+@pytest.mark.parametrize("relative_accuracy", [0.05, 0.01, 0.001])
+def test_quantiles_within_relative_accuracy(relative_accuracy):
+    data = values(1, 20_000)
+    sketch = DDSketch(relative_accuracy)
+    sketch.add(data)
+    estimated = sketch.quantile(QUANTILES)
+    exact = exact_quantiles(data)
+    assert np.all(np.abs(estimated - exact) <= relative_accuracy * exact)
+    assert sketch.count == len(data)
+    assert sketch.min == data.min()
+    assert sketch.max == data.max()
+    assert sketch.mean == pytest.approx(data.mean())
+
+
+def test_merged_sketches_equal_one_sketch():
+    parts = [values(seed, size) for (seed, size) in [(2, 5000), (3, 10), (4, 800)]]
+    sketches = []
+    for part in parts:
+        sketch = DDSketch(0.01)
+        sketch.add(part)
+        sketches.append(sketch)
+    sketches.append(DDSketch(0.01))
+    merged = merge_sketches(sketches)
+
+    single = DDSketch(0.01)
+    single.add(np.concatenate(parts))
+    np.testing.assert_array_equal(merged.quantile(QUANTILES), single.quantile(QUANTILES))
+    assert merged.count == single.count
+    assert merged.min == single.min
+    assert merged.max == single.max
+    assert merged.sum == pytest.approx(single.sum)
+
+
+def test_save_and_load(tmp_path):
+    sketch = DDSketch(0.02)
+    sketch.add(values(5, 1000))
+    sketch.save(tmp_path / "sketch.json")
+    loaded = DDSketch.load(tmp_path / "sketch.json")
+    np.testing.assert_array_equal(loaded.quantile(QUANTILES), sketch.quantile(QUANTILES))
+    assert loaded.summary() == sketch.summary()
+
+
+def test_empty_sketch():
+    sketch = DDSketch()
+    sketch.add(np.array([]))
+    assert sketch.count == 0
+    assert np.isnan(sketch.quantile(0.5))
+    assert np.isnan(sketch.mean)
+
+
+def test_rejects_merging_other_accuracy():
+    with pytest.raises(ValueError):
+        DDSketch(0.01).merge(DDSketch(0.02))
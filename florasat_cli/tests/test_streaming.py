@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from florasat.statistics import streaming
+from florasat.statistics.utils import (
+    DELIVERED_NORMAL,
+    Config,
+    e2e_delay_ms,
+    get_stats_dump_file,
+    is_stats_dump_fresh,
+    iter_stats_chunks,
+    load_simulation_paths,
+    load_stats,
+    read_stats_file,
+)
+
+ALG, CSTL, SIM = ("alg", "cstl-4", "sim")
+RUNS = 2
+
+
+@pytest.fixture(params=["csv", "parquet"])
+def config(request, tmp_path):
+    rng = np.random.default_rng(11)
+    path = tmp_path.joinpath("results", ALG, CSTL, SIM)
+    path.mkdir(parents=True)
+    for run in range(RUNS):
+        n = 500
+        pd.DataFrame(
+            {
+                "pid": np.arange(n),
+                "type": rng.choice(["N", "C"], n, p=[0.8, 0.2]),
+                "srcGs": rng.integers(0, 5, n),
+                "dstGs": rng.integers(0, 5, n),
+                "size": rng.choice([100, 1500], n),
+                "hops": rng.integers(1, 12, n),
+                "dropReason": rng.choice([99, 1, 4, 9], n, p=[0.7, 0.1, 0.1, 0.1]),
+                "queueDelay": rng.exponential(0.01, n),
+                "procDelay": rng.random(n) * 0.001,
+                "transDelay": rng.random(n) * 0.002,
+                "propDelay": rng.random(n) * 0.03,
+                "created": rng.random(n) * 20,
+                "recorded": rng.random(n) * 20 + run,
+            }
+        ).to_csv(path.joinpath(f"{run}.stats.csv"), index=False)
+        for kind in ["routes", "sats"]:
+            path.joinpath(f"{run}.{kind}.csv").touch()
+
+    config = Config(
+        algorithms=[ALG],
+        cstl=[CSTL],
+        sim_name=[SIM],
+        runs=RUNS,
+        florasat_results_path=tmp_path.joinpath("results"),
+        routes_path=tmp_path.joinpath("routes"),
+        satellites_path=tmp_path.joinpath("sats"),
+        stats_path=tmp_path.joinpath("stats"),
+        results_path=tmp_path.joinpath("out"),
+        streaming=True,
+        # several chunks per run
+        chunk_size=64,
+    )
+    if request.param == "parquet":
+        for run in range(RUNS):
+            (stats_fp, _, _) = load_simulation_paths(config, CSTL, SIM, ALG, run)
+            (dump_path, dump_fp) = get_stats_dump_file(config, CSTL, SIM, ALG, run)
+            read_stats_file(stats_fp, dump_path, dump_fp)
+    return config
+
+
+def in_memory(config, columns, filters=None) -> pd.DataFrame:
+    return pd.concat(load_stats(config, CSTL, SIM, ALG, columns, filters))
+
+
+def test_delivered_dropped_counts(config):
+    df = in_memory(config, ["recorded", "dropReason"])
+    df["recorded"] = df["recorded"].round()
+    delivered = (
+        df.loc[df["dropReason"] == 99]
+        .groupby("recorded")["recorded"]
+        .count()
+        .pipe(pd.DataFrame)
+        .rename(columns={"recorded": "rcvd"})
+    )
+    dropped = (
+        df.loc[df["dropReason"] != 99]
+        .groupby("recorded")["recorded"]
+        .count()
+        .pipe(pd.DataFrame)
+        .rename(columns={"recorded": "dropped"})
+    )
+    expected = delivered.join(dropped).reset_index()
+
+    result = streaming.delivered_dropped_counts(config, CSTL, SIM, ALG)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_delivered_size_counts(config):
+    df = in_memory(config, ["recorded", "size"], DELIVERED_NORMAL)
+    df["recorded"] = df["recorded"].round()
+    expected = (
+        df.groupby(["recorded", "size"])["recorded"]
+        .count()
+        .pipe(pd.DataFrame)
+        .rename(columns={"recorded": "count"})
+        .reset_index()
+    )
+
+    result = streaming.delivered_size_counts(config, CSTL, SIM, ALG)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_hop_counts(config):
+    df = in_memory(config, ["hops"], DELIVERED_NORMAL)
+    expected = df["hops"].value_counts().sort_index()
+
+    result = streaming.hop_counts(config, CSTL, SIM, ALG)
+    pd.testing.assert_series_equal(
+        result, expected, check_dtype=False, check_names=False
+    )
+
+
+def test_e2e_delay_counts(config):
+    df = in_memory(
+        config, ["queueDelay", "procDelay", "transDelay", "propDelay"], DELIVERED_NORMAL
+    )
+    expected = e2e_delay_ms(df).value_counts().sort_index()
+    assert len(expected) > 10
+
+    result = streaming.e2e_delay_counts(config, CSTL, SIM, ALG)
+    pd.testing.assert_series_equal(
+        result, expected, check_dtype=False, check_names=False
+    )
+
+
+def test_drop_reason_counts(config):
+    df = in_memory(config, ["dropReason"])
+    expected = df["dropReason"].value_counts().sort_index()
+
+    result = streaming.drop_reason_counts(config, CSTL, SIM, ALG)
+    pd.testing.assert_series_equal(
+        result, expected, check_dtype=False, check_names=False
+    )
+
+
+def test_fused_scan_equals_separate_aggregations(config):
+    aggregations = (
+        streaming.DELIVERED_DROPPED
+        + streaming.DELIVERED_SIZES
+        + streaming.HOPS
+        + streaming.E2E_DELAY
+        + streaming.DROP_REASONS
+    )
+    separate = {
+        aggregation: streaming.aggregate(config, CSTL, SIM, ALG, [aggregation])[
+            aggregation
+        ]
+        for aggregation in aggregations
+    }
+
+    config.aggregates = {}
+    streaming.scan_stats(config, CSTL, SIM, aggregations)
+    for aggregation in aggregations:
+        fused = streaming.aggregated(config, CSTL, SIM, ALG, [aggregation])
+        pd.testing.assert_series_equal(fused[aggregation], separate[aggregation])
+
+
+def test_delays_are_read_as_float64(config):
+    df = in_memory(config, ["queueDelay", "procDelay", "transDelay", "propDelay"])
+    assert (df.dtypes == np.float64).all()
+    for chunk in iter_stats_chunks(config, CSTL, SIM, ALG, ["queueDelay"]):
+        assert chunk["queueDelay"].dtype == np.float64
+
+
+def test_dump_with_narrowed_delays_is_stale(config):
+    (stats_fp, _, _) = load_simulation_paths(config, CSTL, SIM, ALG, 0)
+    (dump_path, dump_fp) = get_stats_dump_file(config, CSTL, SIM, ALG, 0)
+    read_stats_file(stats_fp, dump_path, dump_fp)
+    assert is_stats_dump_fresh(stats_fp, dump_fp)
+
+    table = pq.read_table(dump_fp)
+    index = table.schema.get_field_index("queueDelay")
+    table = table.set_column(
+        index, "queueDelay", table["queueDelay"].cast(pa.float32())
+    )
+    pq.write_table(table, dump_fp)
+    assert not is_stats_dump_fresh(stats_fp, dump_fp)
@@ -1,5 +1,7 @@
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import Dict, List, Tuple
+
+import numpy as np
 
 @dataclass
 class Hop:
@@ -23,7 +25,23 @@ class Route:
 def load_routes(read_path: str) -> List[Route]:
     pass
 
-def process_routes(routes_fp: str, path: str, file_path: str):
+def load_routes_columnar(read_path: str) -> Dict[str, np.ndarray]:
+    """
+    Loads a routes dump as NumPy arrays. Per route: pid, length, hop_count and
+    offsets, the hops of route i are hop_*[offsets[i]:offsets[i + 1]].
+    Per hop: hop_id, hop_type (ASCII code), hop_lat, hop_lon and hop_alt.
+    """
+    pass
+
+def load_route_metrics(read_path: str) -> Dict[str, np.ndarray]:
+    """
+    Loads the per-packet route metrics written by process_routes, sorted by pid:
+    pid, length, isl_length, gsl_length (km), sat_hops, src_gs, dst_gs, first_sat
+    and last_sat. Ids are -1 if a route does not start or end with one.
+    """
+    pass
+
+def process_routes(routes_fp: str, path: str, file_path: str, metrics_file_path: str):
     pass
 
 @dataclass
@@ -39,5 +57,12 @@ class State:
 def load_sat_stats(read_path: str) -> List[Satellite]:
     pass
 
+def load_sat_stats_arrays(read_path: str) -> Dict[str, np.ndarray]:
+    """
+    Loads a satellites dump as flat NumPy arrays with one entry per state:
+    sat_id, start and qs. The states of satellite i are [offsets[i]:offsets[i + 1]].
+    """
+    pass
+
 def process_sat_stats(routes_fp: str, file_path: str):
     pass
\ No newline at end of file
@@ -0,0 +1,32 @@
+use std::{fs, io, path::Path};
+
+/// Writes `buf` to a temporary file next to `file_path` and renames it afterwards,
+/// so that an interrupted conversion never leaves a truncated dump behind.
+pub fn write_atomic(file_path: &Path, buf: &[u8]) -> io::Result<()> {
+    let mut tmp_name = file_path.file_name().unwrap_or_default().to_os_string();
+    tmp_name.push(".tmp");
+    let tmp_path = file_path.with_file_name(tmp_name);
+    fs::write(&tmp_path, buf)?;
+    fs::rename(&tmp_path, file_path)
+}
+
+#[cfg(test)]
+mod tests {
+    use std::fs;
+
+    use crate::dump::write_atomic;
+
+    #[test]
+    fn test_write_atomic() {
+        let dir = std::env::temp_dir().join("florasat_statistics_test_write_atomic");
+        fs::create_dir_all(&dir).unwrap();
+        let file_path = dir.join("0.routes.msgpack");
+
+        write_atomic(&file_path, b"first").unwrap();
+        write_atomic(&file_path, b"second").unwrap();
+
+        assert_eq!(fs::read(&file_path).unwrap(), b"second");
+        assert!(!dir.join("0.routes.msgpack.tmp").exists());
+        fs::remove_dir_all(&dir).unwrap();
+    }
+}
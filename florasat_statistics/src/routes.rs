@@ -1,14 +1,22 @@
 use std::{
+    fmt,
     fs::{self, File},
-    io::BufReader,
+    io::{self, BufReader},
+    path::Path,
 };
 
 use csv::Error;
 use itertools::Itertools;
 use map_3d::{deg2rad, geodetic2ecef};
-use pyo3::prelude::*;
+use numpy::IntoPyArray;
+use pyo3::{exceptions::PyValueError, prelude::*, types::PyDict};
 use rmp_serde::Serializer;
-use serde::{Deserialize, Serialize};
+use serde::{
+    de::{SeqAccess, Visitor},
+    Deserialize, Deserializer, Serialize,
+};
+
+use crate::dump::write_atomic;
 
 #[derive(Serialize, Deserialize, Debug)]
 struct Record {
@@ -69,14 +77,193 @@ impl Route {
 }
 
 #[pyfunction]
-pub fn load_routes(read_path: String) -> PyResult<Vec<Route>> {
-    let data = fs::read(read_path)?;
-    let res: Vec<Route> = rmp_serde::from_slice(&data).expect("Unable to parse");
-    Ok(res)
+pub fn load_routes(py: Python<'_>, read_path: String) -> PyResult<Vec<Route>> {
+    // release the GIL while reading and decoding
+    py.allow_threads(|| {
+        let data = fs::read(read_path)?;
+        let res: Vec<Route> = rmp_serde::from_slice(&data)
+            .map_err(|e| PyValueError::new_err(format!("Unable to parse routes: {}", e)))?;
+        Ok(res)
+    })
+}
+
+/// Struct-of-arrays form of a routes dump. The hops of route `i` are the hop
+/// entries `offsets[i]..offsets[i + 1]`.
+#[derive(Debug, Default)]
+struct RouteColumns {
+    pid: Vec<u32>,
+    length: Vec<u32>,
+    hop_count: Vec<u32>,
+    offsets: Vec<u64>,
+    hop_id: Vec<u32>,
+    // ASCII code of the hop type, b'G' or b'S'
+    hop_type: Vec<u8>,
+    hop_lat: Vec<f32>,
+    hop_lon: Vec<f32>,
+    hop_alt: Vec<u16>,
+}
+
+impl RouteColumns {
+    fn push(&mut self, route: Route) {
+        self.pid.push(route.pid);
+        self.length.push(route.length);
+        self.hop_count.push(route.hops.len() as u32);
+        for hop in route.hops {
+            self.hop_id.push(hop.id);
+            self.hop_type.push(hop.typ as u8);
+            self.hop_lat.push(hop.lat);
+            self.hop_lon.push(hop.lon);
+            self.hop_alt.push(hop.alt);
+        }
+        self.offsets.push(self.hop_id.len() as u64);
+    }
+}
+
+impl<'de> Deserialize<'de> for RouteColumns {
+    fn deserialize<D: Deserializer<'de>>(deserializer: D) -> Result<Self, D::Error> {
+        struct ColumnsVisitor;
+
+        impl<'de> Visitor<'de> for ColumnsVisitor {
+            type Value = RouteColumns;
+
+            fn expecting(&self, formatter: &mut fmt::Formatter) -> fmt::Result {
+                formatter.write_str("a sequence of routes")
+            }
+
+            // routes are appended one by one, only a single route is held at a time
+            fn visit_seq<A: SeqAccess<'de>>(self, mut seq: A) -> Result<RouteColumns, A::Error> {
+                let mut columns = RouteColumns::default();
+                columns.offsets.push(0);
+                while let Some(route) = seq.next_element::<Route>()? {
+                    columns.push(route);
+                }
+                Ok(columns)
+            }
+        }
+
+        deserializer.deserialize_seq(ColumnsVisitor)
+    }
+}
+
+#[pyfunction]
+pub fn load_routes_columnar(py: Python<'_>, read_path: String) -> PyResult<&PyDict> {
+    let columns = py.allow_threads(|| -> PyResult<RouteColumns> {
+        let data = fs::read(read_path)?;
+        rmp_serde::from_slice(&data)
+            .map_err(|e| PyValueError::new_err(format!("Unable to parse routes: {}", e)))
+    })?;
+
+    let dict = PyDict::new(py);
+    dict.set_item("pid", columns.pid.into_pyarray(py))?;
+    dict.set_item("length", columns.length.into_pyarray(py))?;
+    dict.set_item("hop_count", columns.hop_count.into_pyarray(py))?;
+    dict.set_item("offsets", columns.offsets.into_pyarray(py))?;
+    dict.set_item("hop_id", columns.hop_id.into_pyarray(py))?;
+    dict.set_item("hop_type", columns.hop_type.into_pyarray(py))?;
+    dict.set_item("hop_lat", columns.hop_lat.into_pyarray(py))?;
+    dict.set_item("hop_lon", columns.hop_lon.into_pyarray(py))?;
+    dict.set_item("hop_alt", columns.hop_alt.into_pyarray(py))?;
+    Ok(dict)
+}
+
+/// Per-packet metrics of a routes dump as columns, sorted by pid. Lengths are in
+/// km, ISL covers satellite to satellite links and GSL up- and downlinks. Ground
+/// station and satellite ids are -1 if a route does not start or end with one.
+#[derive(Serialize, Deserialize, Debug, Default)]
+struct RouteMetrics {
+    pid: Vec<u32>,
+    length: Vec<u32>,
+    isl_length: Vec<u32>,
+    gsl_length: Vec<u32>,
+    sat_hops: Vec<u32>,
+    src_gs: Vec<i32>,
+    dst_gs: Vec<i32>,
+    first_sat: Vec<i32>,
+    last_sat: Vec<i32>,
+}
+
+impl RouteMetrics {
+    fn from_routes(routes: &[Route]) -> Self {
+        let mut order: Vec<usize> = (0..routes.len()).collect();
+        order.sort_by_key(|&i| routes[i].pid);
+
+        let mut metrics = RouteMetrics::default();
+        for route in order.into_iter().map(|i| &routes[i]) {
+            let (mut isl_length, mut gsl_length) = (0.0, 0.0);
+            for (a, b) in route.hops.iter().tuple_windows() {
+                if a.typ == 'S' && b.typ == 'S' {
+                    isl_length += a.distance(b);
+                } else {
+                    gsl_length += a.distance(b);
+                }
+            }
+            let gs_id = |hop: Option<&Hop>| match hop {
+                Some(hop) if hop.typ == 'G' => hop.id as i32,
+                _ => -1,
+            };
+            let sat_id = |hop: Option<&Hop>| hop.map_or(-1, |hop| hop.id as i32);
+            let is_sat = |hop: &&Hop| hop.typ == 'S';
+
+            metrics.pid.push(route.pid);
+            metrics.length.push(route.length);
+            metrics.isl_length.push(f64::round(isl_length) as u32);
+            metrics.gsl_length.push(f64::round(gsl_length) as u32);
+            metrics
+                .sat_hops
+                .push(route.hops.iter().filter(is_sat).count() as u32);
+            metrics.src_gs.push(gs_id(route.hops.first()));
+            metrics.dst_gs.push(gs_id(route.hops.last()));
+            metrics
+                .first_sat
+                .push(sat_id(route.hops.iter().find(is_sat)));
+            metrics
+                .last_sat
+                .push(sat_id(route.hops.iter().rev().find(is_sat)));
+        }
+        metrics
+    }
+}
+
+#[pyfunction]
+pub fn load_route_metrics(py: Python<'_>, read_path: String) -> PyResult<&PyDict> {
+    let metrics = py.allow_threads(|| -> PyResult<RouteMetrics> {
+        let data = fs::read(read_path)?;
+        rmp_serde::from_slice(&data)
+            .map_err(|e| PyValueError::new_err(format!("Unable to parse route metrics: {}", e)))
+    })?;
+
+    let dict = PyDict::new(py);
+    dict.set_item("pid", metrics.pid.into_pyarray(py))?;
+    dict.set_item("length", metrics.length.into_pyarray(py))?;
+    dict.set_item("isl_length", metrics.isl_length.into_pyarray(py))?;
+    dict.set_item("gsl_length", metrics.gsl_length.into_pyarray(py))?;
+    dict.set_item("sat_hops", metrics.sat_hops.into_pyarray(py))?;
+    dict.set_item("src_gs", metrics.src_gs.into_pyarray(py))?;
+    dict.set_item("dst_gs", metrics.dst_gs.into_pyarray(py))?;
+    dict.set_item("first_sat", metrics.first_sat.into_pyarray(py))?;
+    dict.set_item("last_sat", metrics.last_sat.into_pyarray(py))?;
+    Ok(dict)
 }
 
 #[pyfunction]
-pub fn process_routes(read_path: String, write_path: String, write_file: String) -> PyResult<()> {
+pub fn process_routes(
+    py: Python<'_>,
+    read_path: String,
+    write_path: String,
+    write_file: String,
+    metrics_file: String,
+) -> PyResult<()> {
+    // the conversion does not touch Python objects, other threads may run meanwhile
+    py.allow_threads(|| convert_routes(read_path, write_path, write_file, metrics_file))?;
+    Ok(())
+}
+
+fn convert_routes(
+    read_path: String,
+    write_path: String,
+    write_file: String,
+    metrics_file: String,
+) -> io::Result<()> {
     // read from file
     let file = File::open(read_path)?;
     let reader = BufReader::new(file);
@@ -85,12 +272,17 @@ pub fn process_routes(read_path: String, write_path: String, write_file: String)
 
     // transform
     let routes = transform_routes(iter);
+    let metrics = RouteMetrics::from_routes(&routes);
 
     // write
     let mut buf = Vec::new();
     routes.serialize(&mut Serializer::new(&mut buf)).unwrap();
     fs::create_dir_all(write_path)?;
-    fs::write(write_file, buf)?;
+    write_atomic(Path::new(&write_file), &buf)?;
+
+    let mut buf = Vec::new();
+    metrics.serialize(&mut Serializer::new(&mut buf)).unwrap();
+    write_atomic(Path::new(&metrics_file), &buf)?;
 
     Ok(())
 }
@@ -153,7 +345,10 @@ fn calculate_distance(hops: &Vec<Hop>) -> u32 {
 mod tests {
     use stringreader::StringReader;
 
-    use crate::routes::{transform_routes, Hop, Route};
+    use rmp_serde::Serializer;
+    use serde::Serialize;
+
+    use crate::routes::{transform_routes, Hop, Route, RouteColumns, RouteMetrics};
 
     #[test]
     fn test_transform_routes() {
@@ -241,4 +436,63 @@ mod tests {
         let route = Route::new(22, test_hops);
         assert_eq!(route.length, 5487);
     }
+
+    #[test]
+    fn test_route_columns() {
+        let streader = StringReader::new(
+            "pid,type,id,lat,lon,alt\n\
+        3182,G,0,-33.49,-70.74,0\n\
+        3182,S,16,-11.13,-69.91,786\n\
+        3182,G,4,40.73,-73.94,0\n\
+        3185,G,3,49.23,7,0\n\
+        3185,S,45,38.11,16.57,786\n\
+        3185,S,46,5.3,19.05,784\n\
+        3185,G,5,-33.92,18.42,0\n\
+        ",
+        );
+        let mut rdr = csv::Reader::from_reader(streader);
+        let routes = transform_routes(rdr.deserialize());
+        let lengths: Vec<u32> = routes.iter().map(|r| r.length).collect();
+
+        let mut buf = Vec::new();
+        routes.serialize(&mut Serializer::new(&mut buf)).unwrap();
+        let columns: RouteColumns = rmp_serde::from_slice(&buf).unwrap();
+
+        assert_eq!(columns.pid, vec![3182, 3185]);
+        assert_eq!(columns.length, lengths);
+        assert_eq!(columns.hop_count, vec![3, 4]);
+        assert_eq!(columns.offsets, vec![0, 3, 7]);
+        assert_eq!(columns.hop_id, vec![0, 16, 4, 3, 45, 46, 5]);
+        assert_eq!(columns.hop_type[..3], [b'G', b'S', b'G']);
+        assert_eq!(columns.hop_alt[4], 786);
+    }
+
+    #[test]
+    fn test_route_metrics() {
+        let streader = StringReader::new(
+            "pid,type,id,lat,lon,alt\n\
+        3185,G,3,49.23,7,0\n\
+        3185,S,45,38.11,16.57,786\n\
+        3185,S,46,5.3,19.05,784\n\
+        3185,G,5,-33.92,18.42,0\n\
+        3182,G,0,-33.49,-70.74,0\n\
+        3182,S,16,-11.13,-69.91,786\n\
+        3182,G,4,40.73,-73.94,0\n\
+        3190,S,16,-11.13,-69.91,786\n\
+        ",
+        );
+        let mut rdr = csv::Reader::from_reader(streader);
+        let routes = transform_routes(rdr.deserialize());
+        let metrics = RouteMetrics::from_routes(&routes);
+
+        assert_eq!(metrics.pid, vec![3182, 3185, 3190]);
+        assert_eq!(metrics.length, vec![routes[1].length, routes[0].length, 0]);
+        assert_eq!(metrics.isl_length[0], 0);
+        assert!(metrics.isl_length[1] > 0);
+        assert_eq!(metrics.sat_hops, vec![1, 2, 1]);
+        assert_eq!(metrics.src_gs, vec![0, 3, -1]);
+        assert_eq!(metrics.dst_gs, vec![4, 5, -1]);
+        assert_eq!(metrics.first_sat, vec![16, 45, 16]);
+        assert_eq!(metrics.last_sat, vec![16, 46, 16]);
+    }
 }
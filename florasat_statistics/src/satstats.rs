@@ -3,13 +3,20 @@ use itertools::Itertools;
 use rmp_serde::Serializer;
 use std::{
     collections::HashMap,
+    fmt,
     fs::{self, File},
-    io::BufReader,
+    io::{self, BufReader},
     path::Path,
 };
 
-use pyo3::{pyclass, pyfunction, PyResult};
-use serde::{Deserialize, Serialize};
+use numpy::IntoPyArray;
+use pyo3::{exceptions::PyValueError, pyclass, pyfunction, types::PyDict, PyResult, Python};
+use serde::{
+    de::{SeqAccess, Visitor},
+    Deserialize, Deserializer, Serialize,
+};
+
+use crate::dump::write_atomic;
 
 #[derive(Serialize, Deserialize, Debug)]
 struct Record {
@@ -33,14 +40,91 @@ pub struct State {
 }
 
 #[pyfunction]
-pub fn load_sat_stats(read_path: String) -> PyResult<Vec<Satellite>> {
-    let data = fs::read(read_path)?;
-    let res: Vec<Satellite> = rmp_serde::from_slice(&data).expect("Unable to parse");
-    Ok(res)
+pub fn load_sat_stats(py: Python<'_>, read_path: String) -> PyResult<Vec<Satellite>> {
+    // release the GIL while reading and decoding
+    py.allow_threads(|| {
+        let data = fs::read(read_path)?;
+        let res: Vec<Satellite> = rmp_serde::from_slice(&data).map_err(|e| {
+            PyValueError::new_err(format!("Unable to parse satellite stats: {}", e))
+        })?;
+        Ok(res)
+    })
+}
+
+/// Struct-of-arrays form of a satellites dump, one entry per state. The states of
+/// satellite `i` are the entries `offsets[i]..offsets[i + 1]`.
+#[derive(Debug, Default)]
+struct SatelliteColumns {
+    sat_id: Vec<u32>,
+    start: Vec<f32>,
+    qs: Vec<u32>,
+    offsets: Vec<u64>,
+}
+
+impl SatelliteColumns {
+    fn push(&mut self, satellite: Satellite) {
+        for state in satellite.entries {
+            self.sat_id.push(satellite.sat_id);
+            self.start.push(state.start);
+            self.qs.push(state.qs);
+        }
+        self.offsets.push(self.sat_id.len() as u64);
+    }
+}
+
+impl<'de> Deserialize<'de> for SatelliteColumns {
+    fn deserialize<D: Deserializer<'de>>(deserializer: D) -> Result<Self, D::Error> {
+        struct ColumnsVisitor;
+
+        impl<'de> Visitor<'de> for ColumnsVisitor {
+            type Value = SatelliteColumns;
+
+            fn expecting(&self, formatter: &mut fmt::Formatter) -> fmt::Result {
+                formatter.write_str("a sequence of satellites")
+            }
+
+            // satellites are appended one by one, only a single one is held at a time
+            fn visit_seq<A: SeqAccess<'de>>(
+                self,
+                mut seq: A,
+            ) -> Result<SatelliteColumns, A::Error> {
+                let mut columns = SatelliteColumns::default();
+                columns.offsets.push(0);
+                while let Some(satellite) = seq.next_element::<Satellite>()? {
+                    columns.push(satellite);
+                }
+                Ok(columns)
+            }
+        }
+
+        deserializer.deserialize_seq(ColumnsVisitor)
+    }
+}
+
+#[pyfunction]
+pub fn load_sat_stats_arrays(py: Python<'_>, read_path: String) -> PyResult<&PyDict> {
+    let columns = py.allow_threads(|| -> PyResult<SatelliteColumns> {
+        let data = fs::read(read_path)?;
+        rmp_serde::from_slice(&data)
+            .map_err(|e| PyValueError::new_err(format!("Unable to parse satellite stats: {}", e)))
+    })?;
+
+    let dict = PyDict::new(py);
+    dict.set_item("sat_id", columns.sat_id.into_pyarray(py))?;
+    dict.set_item("start", columns.start.into_pyarray(py))?;
+    dict.set_item("qs", columns.qs.into_pyarray(py))?;
+    dict.set_item("offsets", columns.offsets.into_pyarray(py))?;
+    Ok(dict)
 }
 
 #[pyfunction]
-pub fn process_sat_stats(read_path: String, file_path: String) -> PyResult<()> {
+pub fn process_sat_stats(py: Python<'_>, read_path: String, file_path: String) -> PyResult<()> {
+    // the conversion does not touch Python objects, other threads may run meanwhile
+    py.allow_threads(|| convert_sat_stats(read_path, file_path))?;
+    Ok(())
+}
+
+fn convert_sat_stats(read_path: String, file_path: String) -> io::Result<()> {
     let path_buf = Path::new(&file_path);
     let folder = path_buf.parent().unwrap();
 
@@ -59,7 +143,7 @@ pub fn process_sat_stats(read_path: String, file_path: String) -> PyResult<()> {
         .serialize(&mut Serializer::new(&mut buf))
         .unwrap();
     fs::create_dir_all(folder)?;
-    fs::write(path_buf, buf)?;
+    write_atomic(path_buf, &buf)?;
 
     Ok(())
 }
@@ -108,7 +192,10 @@ fn transform_satstats(iter: impl Iterator<Item = Result<Record, Error>>) -> Vec<
 mod tests {
     use stringreader::StringReader;
 
-    use crate::satstats::transform_satstats;
+    use rmp_serde::Serializer;
+    use serde::Serialize;
+
+    use crate::satstats::{transform_satstats, SatelliteColumns};
 
     #[test]
     fn test_transform_satstats() {
@@ -135,4 +222,36 @@ mod tests {
 
         println!("{:?}", routes)
     }
+
+    #[test]
+    fn test_satellite_columns() {
+        let streader = StringReader::new(
+            "sat_id,timestamp,queue_size\n\
+        0,1.005243,1\n\
+        1,1.005246,1\n\
+        0,1.005443,2\n\
+        1,7.005563,0\n\
+        ",
+        );
+        let mut rdr = csv::Reader::from_reader(streader);
+        let satellites = transform_satstats(rdr.deserialize());
+        let counts: Vec<usize> = satellites.iter().map(|s| s.entries.len()).collect();
+
+        let mut buf = Vec::new();
+        satellites
+            .serialize(&mut Serializer::new(&mut buf))
+            .unwrap();
+        let columns: SatelliteColumns = rmp_serde::from_slice(&buf).unwrap();
+
+        assert_eq!(columns.offsets.len(), satellites.len() + 1);
+        for (i, satellite) in satellites.iter().enumerate() {
+            let (lo, hi) = (columns.offsets[i] as usize, columns.offsets[i + 1] as usize);
+            assert_eq!(hi - lo, counts[i]);
+            assert!(columns.sat_id[lo..hi]
+                .iter()
+                .all(|id| *id == satellite.sat_id));
+            assert_eq!(columns.start[lo], 0.0);
+            assert_eq!(columns.qs[hi - 1], satellite.entries[counts[i] - 1].qs);
+        }
+    }
 }